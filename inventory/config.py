@@ -12,9 +12,43 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "inventory_db")
 USERS_PATH = os.getenv("USERS_PATH")
 BROKER_HOST = os.getenv("BROKER_HOST", "localhost")
+# Messages processed in parallel by each broker consumer and messages
+# delivered to it before they are acked
+CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", "4"))
+CONSUMER_PREFETCH_COUNT = int(os.getenv("CONSUMER_PREFETCH_COUNT", "8"))
+# Seconds the broker consumers wait before reconnecting, doubled after
+# every failed attempt up to the max
+CONSUMER_RECONNECT_DELAY = float(os.getenv("CONSUMER_RECONNECT_DELAY", "1"))
+CONSUMER_RECONNECT_MAX_DELAY = float(
+    os.getenv("CONSUMER_RECONNECT_MAX_DELAY", "30")
+)
+# RPC bodies larger than this many bytes are compressed with zstd when
+# the peer accepts it, 0 disables the compression
+RPC_COMPRESSION_THRESHOLD = int(
+    os.getenv("RPC_COMPRESSION_THRESHOLD", "16384")
+)
+# Content type requested for the RPC responses, peers that do not
+# support it answer with JSON
+RPC_CONTENT_TYPE = os.getenv("RPC_CONTENT_TYPE", "application/msgpack")
+# Consecutive RPC failures that open the circuit of a route and seconds
+# until a new call is tried
+RPC_BREAKER_FAILURE_THRESHOLD = int(
+    os.getenv("RPC_BREAKER_FAILURE_THRESHOLD", "5")
+)
+RPC_BREAKER_RESET_TIMEOUT = float(os.getenv("RPC_BREAKER_RESET_TIMEOUT", "30"))
+# Fanout exchange where product and seller changes are published
+CHANGE_EVENTS_EXCHANGE = os.getenv("CHANGE_EVENTS_EXCHANGE", "ccp.changes")
+# Product details cached by the suppliers RPC client, TTLs in seconds
+PRODUCT_CACHE_MAX_SIZE = int(os.getenv("PRODUCT_CACHE_MAX_SIZE", "10000"))
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "3600"))
+PRODUCT_CACHE_NEGATIVE_TTL = float(
+    os.getenv("PRODUCT_CACHE_NEGATIVE_TTL", "30")
+)
 CREATE_DELIVERY_TOPIC = os.getenv(
     "CREATE_DELIVERY_TOPIC", "rpc_create_delivery"
 )
+# Rows upserted per INSERT ... ON CONFLICT statement on stock imports
+STOCK_IMPORT_CHUNK_SIZE = int(os.getenv("STOCK_IMPORT_CHUNK_SIZE", "1000"))
 CORS_ORIGINS = os.getenv(
     "CORS_ORIGINS",
     "http://localhost,"
@@ -25,3 +59,10 @@ CORS_ORIGINS = os.getenv(
 DATABASE_URL = (
     f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
+# Directory where uploads imported in background are spooled, None uses the
+# system temporary directory
+STOCK_IMPORT_SPOOL_DIR = os.getenv("STOCK_IMPORT_SPOOL_DIR")
+# Spool files prefix and seconds without progress after which a background
+# import is considered lost, stale imports are failed on startup
+STOCK_IMPORT_SPOOL_PREFIX = "stock-import-"
+STOCK_IMPORT_STALE_AFTER = float(os.getenv("STOCK_IMPORT_STALE_AFTER", "900"))
@@ -9,7 +9,10 @@ import config
 import schemas
 from database import Base, engine
 from db_dependency import get_db
+from rpc_clients.consumers import ChangeEventsConsumer
+from rpc_clients.degraded import DEGRADED_DATA_HEADER, flag_degraded_data
 from stock.api import stock_router
+from stock.tasks import recover_stale_imports
 from warehouse.api import warehouse_router
 
 app = FastAPI()
@@ -20,7 +23,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[DEGRADED_DATA_HEADER],
 )
+# Flag the responses built with stale products
+app.middleware("http")(flag_degraded_data)
 
 inventory_router = APIRouter(prefix="/inventory")
 inventory_router.include_router(stock_router)
@@ -28,6 +34,10 @@ inventory_router.include_router(warehouse_router)
 
 if "pytest" not in sys.modules:
     Base.metadata.create_all(bind=engine)
+    # Fail the background imports interrupted by a restart
+    recover_stale_imports()
+    # Keep the RPC client caches of this process up to date
+    ChangeEventsConsumer().start()
 
 
 # Rest the database
@@ -0,0 +1,28 @@
+from typing import Dict
+from uuid import UUID
+
+from config import CHANGE_EVENTS_EXCHANGE
+from seedwork.base_consumer import BaseConsumer
+
+from .suppliers_client import product_cache
+
+
+class ChangeEventsConsumer(BaseConsumer):
+    """
+    Evict the cached products changed in the suppliers service.
+    """
+
+    def __init__(self):
+        # Evictions are cheap, a single worker is enough
+        super().__init__(exchange=CHANGE_EVENTS_EXCHANGE, workers=1)
+        # Runs inside the API process and must not keep it alive
+        self.daemon = True
+
+    def on_connected(self):
+        # Changes published while disconnected were missed
+        product_cache.clear()
+
+    def process_payload(self, payload: Dict) -> None:
+        if payload.get("event") == "product.changed":
+            for product_id in payload["product_ids"]:
+                product_cache.invalidate(UUID(product_id))
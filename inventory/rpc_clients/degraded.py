@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, Iterable, Iterator, Optional, Set
+
+from fastapi import Request
+
+from .cache import TTLCache
+
+# Response header with the services whose data was served from the cache
+# because they could not be reached
+DEGRADED_DATA_HEADER = "X-Degraded-Data"
+
+_sources: ContextVar[Optional[Set[str]]] = ContextVar(
+    "degraded_sources", default=None
+)
+
+
+def mark_degraded(source: str):
+    """
+    Flag that the data of a service in the current request may be stale.
+    """
+    sources = _sources.get()
+    if sources is not None:
+        sources.add(source)
+
+
+def stale_fallback(
+    cache: TTLCache, keys: Iterable[Hashable], source: str
+) -> Dict[Hashable, Any]:
+    """
+    Return the last known values of the keys of a service that can not be
+    reached, flagging the data as degraded when there are any.
+    """
+    stale = cache.get_stale_many(keys)
+    if stale:
+        mark_degraded(source)
+    return stale
+
+
+@contextmanager
+def track_degraded() -> Iterator[Set[str]]:
+    """
+    Collect the services flagged as degraded inside the block. The same set
+    is shared with the threads and tasks started from it.
+    """
+    sources = set()
+    token = _sources.set(sources)
+    try:
+        yield sources
+    finally:
+        _sources.reset(token)
+
+
+async def flag_degraded_data(request: Request, call_next):
+    """
+    Middleware adding the degraded data header to the responses built
+    with stale data.
+    """
+    with track_degraded() as sources:
+        response = await call_next(request)
+    if sources:
+        response.headers[DEGRADED_DATA_HEADER] = ", ".join(sorted(sources))
+    return response
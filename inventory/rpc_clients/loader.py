@@ -0,0 +1,46 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List
+
+Fetch = Callable[[List[Hashable]], Dict[Hashable, Any]]
+
+
+class BatchLoader:
+    """
+    Share the fetches in flight between the threads asking for the same
+    keys, so a key is requested once however many threads need it at the
+    same time. Keys missing in the fetch result load as None.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+
+    def load_many(
+        self, keys: List[Hashable], fetch: Fetch
+    ) -> Dict[Hashable, Any]:
+        """
+        Load the keys, fetching only the keys that are not already being
+        fetched by another thread.
+        """
+        with self._lock:
+            futures = {key: self._in_flight.get(key) for key in keys}
+            own = {
+                key: Future() for key, future in futures.items() if not future
+            }
+            self._in_flight.update(own)
+        futures.update(own)
+
+        if own:
+            try:
+                values = fetch(list(own))
+                for key, future in own.items():
+                    future.set_result(values.get(key))
+            except Exception as e:
+                for future in own.values():
+                    future.set_exception(e)
+            finally:
+                with self._lock:
+                    for key in own:
+                        self._in_flight.pop(key, None)
+        return {key: future.result() for key, future in futures.items()}
@@ -1,9 +1,32 @@
-from typing import List
+from typing import Dict, List
 from uuid import UUID as UUUID
 
+from config import (
+    PRODUCT_CACHE_MAX_SIZE,
+    PRODUCT_CACHE_NEGATIVE_TTL,
+    PRODUCT_CACHE_TTL,
+)
 from seedwork.base_rpc_client import BaseRPCClient
 
-from .schemas import ProductSchema
+from .cache import TTLCache
+from .degraded import stale_fallback
+from .loader import BatchLoader
+from .schemas import ManufacturerSchema, ProductSchema
+
+# Products by id shared by every suppliers client of the process, unknown
+# ids are cached as None
+product_cache = TTLCache(
+    maxsize=PRODUCT_CACHE_MAX_SIZE,
+    ttl=PRODUCT_CACHE_TTL,
+    negative_ttl=PRODUCT_CACHE_NEGATIVE_TTL,
+)
+# Cache misses requested at the same time share a single request
+product_loader = BatchLoader()
+# Only the product and manufacturer fields used by this service are
+# requested
+PRODUCT_FIELDS = [
+    field for field in ProductSchema.model_fields if field != "manufacturer"
+] + [f"manufacturer.{field}" for field in ManufacturerSchema.model_fields]
 
 
 class SuppliersClient(BaseRPCClient):
@@ -11,13 +34,46 @@ class SuppliersClient(BaseRPCClient):
     Client to interact with the suppliers service.
     """
 
-    def get_products(self, product_ids: List[UUUID]) -> List[ProductSchema]:
+    def get_products(
+        self, product_ids: List[UUUID], allow_stale: bool = False
+    ) -> List[ProductSchema]:
         """
-        Get user by id.
+        Get products by id, only the products that are not cached are
+        requested to the suppliers service. With ``allow_stale`` the last
+        known products are returned while it is down, the stale cache may
+        not have all of them, so only read paths should allow it.
         """
-        payload = {"product_ids": [str(id) for id in product_ids]}
+        keys = list(dict.fromkeys(UUUID(str(id)) for id in product_ids))
+        cached, missing = product_cache.get_many(keys)
+        if missing:
+            try:
+                cached.update(
+                    product_loader.load_many(missing, self._fetch_products)
+                )
+            except (TimeoutError, ConnectionError):
+                if not allow_stale:
+                    raise
+                # Serve the last known products while suppliers is down
+                stale = stale_fallback(product_cache, missing, "suppliers")
+                if not stale:
+                    raise
+                cached.update(stale)
+        return [cached[key] for key in keys if cached.get(key) is not None]
+
+    def _fetch_products(
+        self, product_ids: List[UUUID]
+    ) -> Dict[UUUID, ProductSchema]:
+        payload = {
+            "product_ids": [str(id) for id in product_ids],
+            "fields": PRODUCT_FIELDS,
+        }
         response = self.call_broker("suppliers.get_products", payload)
-        return [
-            ProductSchema.model_validate(products)
-            for products in response["products"]
-        ]
+        fetched = {
+            product.id: product
+            for product in (
+                ProductSchema.model_validate(products)
+                for products in response["products"]
+            )
+        }
+        product_cache.set_many({id: fetched.get(id) for id in product_ids})
+        return fetched
@@ -0,0 +1,83 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from config import RPC_BREAKER_FAILURE_THRESHOLD, RPC_BREAKER_RESET_TIMEOUT
+
+
+class CircuitOpenError(ConnectionError):
+    """
+    Raised instead of calling a route whose circuit is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of a RPC route, shared by the whole process.
+
+    The circuit opens after ``failure_threshold`` consecutive timeouts or
+    connection errors and calls fail fast until ``reset_timeout`` seconds
+    pass. Then a single trial call is let through, the circuit closes if it
+    succeeds and otherwise stays open for another ``reset_timeout``.
+    """
+
+    _instances: Dict[str, "CircuitBreaker"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = RPC_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = RPC_BREAKER_RESET_TIMEOUT,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.timer = timer
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_route(cls, routing_key: str) -> "CircuitBreaker":
+        """
+        Return the circuit breaker of a routing key.
+        """
+        with cls._instances_lock:
+            breaker = cls._instances.get(routing_key)
+            if breaker is None:
+                breaker = cls._instances[routing_key] = cls(routing_key)
+            return breaker
+
+    @classmethod
+    def reset_all(cls):
+        """
+        Forget the state of every route.
+        """
+        with cls._instances_lock:
+            cls._instances.clear()
+
+    def before_call(self):
+        """
+        Raise a CircuitOpenError if the call must not be made.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return
+            now = self.timer()
+            if now - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"Circuit open for {self.name}")
+            # Let this call through and keep rejecting the others
+            self.opened_at = now
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = self.timer()
@@ -1,21 +1,27 @@
+import os
+import shutil
+import tempfile
 from typing import Annotated, List
 import pandas as pd
 from fastapi import (
     APIRouter,
+    BackgroundTasks,
     Depends,
     Form,
     HTTPException,
+    Response,
     status,
     UploadFile,
     File,
 )
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from io import StringIO
 from uuid import UUID
+from config import STOCK_IMPORT_SPOOL_DIR, STOCK_IMPORT_SPOOL_PREFIX
 from db_dependency import get_db
 from rpc_clients.suppliers_client import SuppliersClient
 
-from . import mappers, schemas, services
+from . import mappers, models, schemas, services, tasks
 
 stock_router = APIRouter(prefix="/stock")
 
@@ -40,7 +46,13 @@ def upload_inventory(
             detail="The warehouse does not exist",
         )
 
-    product = suppliers_client.get_products([request.product_id])
+    try:
+        product = suppliers_client.get_products([request.product_id])
+    except (TimeoutError, ConnectionError):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Timeout error, please try again in a few minutes.",
+        )
     if not product or len(product) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -51,28 +63,17 @@ def upload_inventory(
     failed_records = 0
 
     try:
-
-        existing_stock = services.get_stock(
-            db, request.warehouse_id, request.product_id
+        # Creates the stock or adds the units in a single statement, so
+        # concurrent uploads of the same product do not overwrite each other
+        services.upsert_stock(
+            db,
+            warehouse_id=request.warehouse_id,
+            quantities={request.product_id: request.quantity},
         )
-        if existing_stock:
-            # Actualizar el stock existente
-            services.increase_stock(
-                db,
-                warehouse_id=request.warehouse_id,
-                product_id=request.product_id,
-                quantity=request.quantity,
-            )
-        else:
-            # Crear un nuevo registro de stock
-            services.create_stock(
-                db,
-                warehouse_id=request.warehouse_id,
-                product_id=request.product_id,
-                quantity=request.quantity,
-            )
+        db.commit()
         successful_records = 1
     except Exception:
+        db.rollback()
         failed_records = 1
 
     operation = services.create_operation(
@@ -94,12 +95,19 @@ def upload_inventory(
 async def upload_inventory_csv(
     warehouse_id: Annotated[UUID, Form()],
     inventory_upload: Annotated[UploadFile, File(...)],
+    response: Response,
+    background_tasks: BackgroundTasks,
+    background: Annotated[bool, Form()] = False,
     db: Session = Depends(get_db),
     suppliers_client: SuppliersClient = Depends(SuppliersClient),
 ):
     """
     Carga masiva de inventario desde un archivo CSV.
     El archivo debe contener las columnas: product_id, quantity
+    Con background=true el archivo se procesa en segundo plano y la
+    operación se retorna inmediatamente en estado PENDING. Si el proceso
+    se reinicia durante la carga, la operación queda en FAILED al volver
+    a iniciar y el archivo temporal se elimina.
     """
 
     if not services.get_warehouse(db, warehouse_id):
@@ -114,62 +122,75 @@ async def upload_inventory_csv(
             detail="The file must be a CSV",
         )
 
-    try:
-        contents = await inventory_upload.read()
-        s = StringIO(contents.decode("utf-8"))
-        df = pd.read_csv(s)
-
-        required_columns = ["product_id", "quantity"]
-        if not all(column in df.columns for column in required_columns):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"The CSV file must be contain these columns: {', '.join(required_columns)}",
+    if background:
+        # Spool the upload to disk, the request file is closed as soon as
+        # the response is sent
+        with tempfile.NamedTemporaryFile(
+            dir=STOCK_IMPORT_SPOOL_DIR,
+            prefix=STOCK_IMPORT_SPOOL_PREFIX,
+            suffix=".csv",
+            delete=False,
+        ) as spool_file:
+            await run_in_threadpool(
+                shutil.copyfileobj, inventory_upload.file, spool_file
             )
+            spool_file.seek(0)
+            try:
+                # Reject a wrong header now, not in the background task
+                await run_in_threadpool(
+                    services.check_stock_csv_columns, spool_file
+                )
+            except ValueError as e:
+                spool_file.close()
+                os.remove(spool_file.name)
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=(
+                        "The CSV file is empty"
+                        if isinstance(e, pd.errors.EmptyDataError)
+                        else str(e)
+                    ),
+                )
 
-        inventory_records = df.to_dict("records")
-        processed_records = len(inventory_records)
+        operation = services.create_operation(
+            db,
+            file_name=inventory_upload.filename,
+            warehouse_id=warehouse_id,
+            processed_records=0,
+            successful_records=0,
+            failed_records=0,
+            status=models.OperationStatus.PENDING,
+        )
+        # Named after the operation, so recovering a stale import only
+        # removes its own file
+        file_path = tasks.spool_path(operation.id)
+        os.replace(spool_file.name, file_path)
+        background_tasks.add_task(
+            tasks.run_stock_import, operation.id, file_path
+        )
+        response.status_code = status.HTTP_202_ACCEPTED
+        return mappers.operation_to_schema(operation)
+
+    try:
+        # Parse the spooled upload in bounded batches instead of loading
+        # the whole file in memory
+        processed_records = 0
         successful_records = 0
         failed_records = 0
-
-        for record in inventory_records:
-            try:
-                # Validar que la cantidad sea positiva
-                if record["quantity"] < 0:
-                    failed_records += 1
-                    continue
-
-                # Validar que el producto exista
-                product = suppliers_client.get_products([record["product_id"]])
-                if not product or len(product) == 0:
-                    failed_records += 1
-                    continue
-
-                # Buscar si ya existe el producto en la bodega
-                existing_stock = services.get_stock(
-                    db, warehouse_id, UUID(record["product_id"])
+        batches = await run_in_threadpool(
+            lambda: list(
+                services.import_stock_csv(
+                    db,
+                    warehouse_id=warehouse_id,
+                    csv_file=inventory_upload.file,
+                    suppliers_client=suppliers_client,
                 )
-
-                if existing_stock:
-                    # Actualizar el stock existente
-                    services.increase_stock(
-                        db,
-                        warehouse_id=warehouse_id,
-                        product_id=UUID(record["product_id"]),
-                        quantity=record["quantity"],
-                    )
-                else:
-                    # Crear un nuevo registro de stock
-                    services.create_stock(
-                        db,
-                        warehouse_id=warehouse_id,
-                        product_id=UUID(record["product_id"]),
-                        quantity=record["quantity"],
-                    )
-
-                successful_records += 1
-            except Exception:
-                failed_records += 1
-                continue
+            )
+        )
+        for processed, successful, failed in batches:
+            processed_records += processed
+            successful_records += successful
+            failed_records += failed
 
         # Registrar la operación
         operation = services.create_operation(
@@ -183,6 +204,12 @@ async def upload_inventory_csv(
 
         return mappers.operation_to_schema(operation)
 
+    except (TimeoutError, ConnectionError):
+        # The products can not be checked while suppliers is down
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Timeout error, please try again in a few minutes.",
+        )
     except pd.errors.EmptyDataError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -200,6 +227,50 @@ async def upload_inventory_csv(
         )
 
 
+@stock_router.post(
+    "/reservations",
+    response_model=schemas.StockReservationResponseSchema,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_409_CONFLICT: {
+            "model": schemas.StockReservationResponseSchema,
+            "description": "Some items could not be reserved, none was.",
+        }
+    },
+)
+def reserve_stock(
+    request: schemas.StockReservationSchema,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """
+    Reserve the stock of all the items of an order, or none of them
+    """
+    reserved, items = services.reserve_stock(db, request.items)
+    if not reserved:
+        response.status_code = status.HTTP_409_CONFLICT
+    return schemas.StockReservationResponseSchema(
+        reserved=reserved, items=items
+    )
+
+
+@stock_router.get(
+    "/operations/{operation_id}",
+    response_model=schemas.OperationResponseSchema,
+)
+def get_operation(operation_id: UUID, db: Session = Depends(get_db)):
+    """
+    Consultar el estado y el avance de una operación de carga.
+    """
+    operation = services.get_operation(db, operation_id)
+    if not operation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The operation does not exist",
+        )
+    return mappers.operation_to_schema(operation)
+
+
 @stock_router.get("", response_model=List[schemas.StockResponseSchema])
 def list_stock(
     params: schemas.FilterRequest = Depends(), db: Session = Depends(get_db)
@@ -221,4 +292,10 @@ def list_all_products_stock(db: Session = Depends(get_db)):
     Listar el inventario de productos en la bodega.
     """
     stock = services.get_list_all_products(db)
-    return mappers.stock_product_list_to_schema(stock)
+    try:
+        return mappers.stock_product_list_to_schema(stock)
+    except (TimeoutError, ConnectionError):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Timeout error, please try again in a few minutes.",
+        )
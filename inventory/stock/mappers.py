@@ -31,6 +31,7 @@ def operation_to_schema(
         processed_records=operation.processed_records,
         successful_records=operation.successful_records,
         failed_records=operation.failed_records,
+        status=operation.status.value,
         created_at=operation.created_at,
     )
 
@@ -40,18 +41,24 @@ def stock_product_list_to_schema(
 ) -> list[schemas.StockProductResponseSchema]:
     result: list[schemas.StockProductResponseSchema] = []
     product_ids = [stock.product_id for stock in stock_list]
-    products = SuppliersClient().get_products(product_ids)
+    products = {
+        product.id: product
+        for product in SuppliersClient().get_products(
+            product_ids, allow_stale=True
+        )
+    }
     for stock in stock_list:
-        product = next((p for p in products if p.id == stock.product_id), None)
+        # Unknown, or not cached while suppliers is down
+        product = products.get(stock.product_id)
         schema = schemas.StockProductResponseSchema(
-            product_name=product.name,
-            product_code=product.product_code,
+            product_name=product.name if product else None,
+            product_code=product.product_code if product else None,
             manufacturer_name=(
                 product.manufacturer.manufacturer_name
                 if product and product.manufacturer
                 else None
             ),
-            price=product.price,
+            price=product.price if product else None,
             images=(
                 product.images
                 if product and isinstance(product.images, list)
@@ -20,6 +20,13 @@ class OperationType(enum.Enum):
     UNLOAD = 1
 
 
+class OperationStatus(enum.Enum):
+    PENDING = "PENDING"
+    PROCESSING = "PROCESSING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+
 class Stock(Base):
     __tablename__ = "stocks"
     __table_args__ = (
@@ -53,11 +60,17 @@ class Operation(Base):
     processed_records = Column(Integer, nullable=False, default=0)
     successful_records = Column(Integer, nullable=False, default=0)
     failed_records = Column(Integer, nullable=False, default=0)
+    status = Column(
+        Enum(OperationStatus),
+        nullable=False,
+        default=OperationStatus.COMPLETED,
+    )
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     warehouse = relationship("Warehouse", back_populates="operations")
 
     def __repr__(self):
-        return f"<Operation(id={self.id}, file_name={self.file_name}, operation_type={self.operation_type}, processed_records={self.processed_records}, successful_records={self.successful_records}, failed_records={self.failed_records})>"
+        return f"<Operation(id={self.id}, file_name={self.file_name}, operation_type={self.operation_type}, processed_records={self.processed_records}, successful_records={self.successful_records}, failed_records={self.failed_records}, status={self.status})>"
 
 
 class Delivery(Base):
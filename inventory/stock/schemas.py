@@ -4,7 +4,7 @@ from decimal import Decimal
 import uuid
 from fastapi import HTTPException
 from typing import List, Optional
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 
 
 class DeliveryItemSchema(BaseModel):
@@ -59,17 +59,43 @@ class OperationResponseSchema(BaseModel):
     processed_records: int
     successful_records: int
     failed_records: int
+    status: str
     created_at: datetime.datetime
 
 
 class StockProductResponseSchema(BaseModel):
-    product_name: str
-    product_code: str
-    manufacturer_name: str
-    price: Decimal
+    # Empty when the product is not known
+    product_name: Optional[str] = None
+    product_code: Optional[str] = None
+    manufacturer_name: Optional[str] = None
+    price: Optional[Decimal] = None
     images: List[str]
     product_id: uuid.UUID
     warehouse_id: uuid.UUID
     quantity: int
     warehouse_name: str
     last_updated: datetime.datetime
+
+
+class StockReservationItemSchema(BaseModel):
+    warehouse_id: uuid.UUID
+    product_id: uuid.UUID
+    quantity: int = Field(ge=1)
+
+
+class StockReservationSchema(BaseModel):
+    items: List[StockReservationItemSchema] = Field(min_length=1)
+
+
+class StockReservationResultSchema(BaseModel):
+    warehouse_id: uuid.UUID
+    product_id: uuid.UUID
+    quantity: int
+    reserved: bool
+    remaining: Optional[int] = None
+    error: Optional[str] = None
+
+
+class StockReservationResponseSchema(BaseModel):
+    reserved: bool
+    items: List[StockReservationResultSchema]
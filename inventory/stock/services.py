@@ -1,6 +1,15 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
 from uuid import UUID
+import pandas as pd
+from sqlalchemy import func, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
+from config import STOCK_IMPORT_CHUNK_SIZE
+from rpc_clients.suppliers_client import SuppliersClient
 from warehouse.models import Warehouse
 from . import models, schemas
 
@@ -40,50 +49,241 @@ def get_list_stock(
     return db_stock.all()
 
 
+def _update_quantity(
+    db: Session,
+    warehouse_id: UUID,
+    product_id: UUID,
+    delta: int,
+) -> Optional[models.Stock]:
+    """
+    Add ``delta`` units to a stock in a single statement. Reductions only
+    apply while there are enough units, returns None when no row changed.
+    """
+    statement = (
+        update(models.Stock)
+        .where(
+            models.Stock.warehouse_id == warehouse_id,
+            models.Stock.product_id == product_id,
+        )
+        .values(quantity=models.Stock.quantity + delta, updated_at=func.now())
+        .returning(models.Stock)
+        .execution_options(populate_existing=True)
+    )
+    if delta < 0:
+        statement = statement.where(models.Stock.quantity >= -delta)
+    return db.scalars(statement).first()
+
+
 def increase_stock(
     db: Session, warehouse_id: UUID, product_id: UUID, quantity: int
 ) -> models.Stock:
     """Increase stock units for a product in a warehouse."""
-    db_stock = get_stock(db, warehouse_id, product_id)
-    if db_stock:
-        db_stock.quantity += quantity
-        db.commit()
-        db.refresh(db_stock)
-        return db_stock
-    else:
+    db_stock = _update_quantity(db, warehouse_id, product_id, quantity)
+    if not db_stock:
+        # Nothing was written, the pending work of the caller is kept
         raise ValueError("Stock not found")
+    db.commit()
+    return db_stock
 
 
 def reduce_stock(
     db: Session, warehouse_id: UUID, product_id: UUID, quantity: int
 ) -> models.Stock:
-    """Reduce stock units for a product in a warehouse."""
-    db_stock = get_stock(db, warehouse_id, product_id)
-    if db_stock:
-        if db_stock.quantity >= quantity:
-            db_stock.quantity -= quantity
-            db.commit()
-            db.refresh(db_stock)
-            return db_stock
-        else:
+    """
+    Reduce stock units for a product in a warehouse. The check and the
+    reduction are one conditional update, so concurrent reductions can
+    not take the same units.
+    """
+    db_stock = _update_quantity(db, warehouse_id, product_id, -quantity)
+    if not db_stock:
+        if get_stock(db, warehouse_id, product_id):
             raise ValueError("Not enough stock")
-    else:
         raise ValueError("Stock not found")
+    db.commit()
+    return db_stock
 
 
-def create_stock(
-    db: Session, warehouse_id: UUID, product_id: UUID, quantity: int
-) -> models.Stock:
-    """Create stock for a product in a warehouse."""
-    db_stock = models.Stock(
-        warehouse_id=warehouse_id,
-        product_id=product_id,
-        quantity=quantity,
+def reserve_stock(
+    db: Session, items: List[schemas.StockReservationItemSchema]
+) -> Tuple[bool, List[schemas.StockReservationResultSchema]]:
+    """
+    Reserve all the items of an order in one transaction, or none of them.
+
+    The stock rows are locked in warehouse and product order, so
+    concurrent reservations sharing products wait for each other instead
+    of deadlocking. Returns whether the order was reserved and the result
+    of each item.
+    """
+    requested: Dict[Tuple[UUID, UUID], int] = defaultdict(int)
+    for item in items:
+        requested[(item.warehouse_id, item.product_id)] += item.quantity
+    keys = sorted(requested)
+    stocks = {
+        (stock.warehouse_id, stock.product_id): stock
+        for stock in db.query(models.Stock)
+        .filter(
+            tuple_(models.Stock.warehouse_id, models.Stock.product_id).in_(
+                keys
+            )
+        )
+        .order_by(models.Stock.warehouse_id, models.Stock.product_id)
+        .with_for_update()
+        .populate_existing()
+    }
+    errors = {}
+    for key in keys:
+        if key not in stocks:
+            errors[key] = "Stock not found"
+        elif stocks[key].quantity < requested[key]:
+            errors[key] = "Not enough stock"
+    reserved = not errors
+
+    remaining = {}
+    if reserved:
+        for key in keys:
+            db_stock = _update_quantity(db, *key, -requested[key])
+            remaining[key] = db_stock.quantity
+        db.commit()
+    else:
+        # Release the locks
+        db.rollback()
+
+    results = []
+    for item in items:
+        key = (item.warehouse_id, item.product_id)
+        results.append(
+            schemas.StockReservationResultSchema(
+                warehouse_id=item.warehouse_id,
+                product_id=item.product_id,
+                quantity=item.quantity,
+                reserved=reserved,
+                remaining=remaining.get(key),
+                error=errors.get(key),
+            )
+        )
+    return reserved, results
+
+
+def upsert_stock(
+    db: Session, warehouse_id: UUID, quantities: Dict[UUID, int]
+) -> None:
+    """Add units to many products of a warehouse in a single statement."""
+    dialect_insert = (
+        sqlite.insert
+        if db.get_bind().dialect.name == "sqlite"
+        else postgresql.insert
     )
-    db.add(db_stock)
-    db.commit()
-    db.refresh(db_stock)
-    return db_stock
+    statement = dialect_insert(models.Stock).values(
+        [
+            {
+                "warehouse_id": warehouse_id,
+                "product_id": product_id,
+                "quantity": quantity,
+            }
+            for product_id, quantity in quantities.items()
+        ]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[models.Stock.product_id, models.Stock.warehouse_id],
+        set_={
+            "quantity": models.Stock.quantity + statement.excluded.quantity,
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(statement)
+
+
+def import_stock_records(
+    db: Session,
+    warehouse_id: UUID,
+    records: List[dict],
+    suppliers_client: SuppliersClient,
+    chunk_size: int = STOCK_IMPORT_CHUNK_SIZE,
+) -> Tuple[int, int]:
+    """
+    Load stock records into a warehouse.
+
+    Products are checked with one call to the suppliers service and the
+    stock is upserted in chunks, each chunk in its own savepoint. The
+    caller owns the transaction. Returns the successful and failed
+    record counts.
+    """
+    failed_records = 0
+    valid_records: List[Tuple[UUID, int]] = []
+    for record in records:
+        try:
+            product_id = UUID(str(record["product_id"]))
+            quantity = int(record["quantity"])
+        except (KeyError, TypeError, ValueError):
+            failed_records += 1
+            continue
+        if quantity < 0:
+            failed_records += 1
+            continue
+        valid_records.append((product_id, quantity))
+
+    product_ids = list({product_id for product_id, _ in valid_records})
+    existing_ids = (
+        {product.id for product in suppliers_client.get_products(product_ids)}
+        if product_ids
+        else set()
+    )
+    known_records = [
+        record for record in valid_records if record[0] in existing_ids
+    ]
+    failed_records += len(valid_records) - len(known_records)
+
+    successful_records = 0
+    for start in range(0, len(known_records), chunk_size):
+        chunk = known_records[start : start + chunk_size]
+        quantities: Dict[UUID, int] = defaultdict(int)
+        for product_id, quantity in chunk:
+            quantities[product_id] += quantity
+        try:
+            with db.begin_nested():
+                upsert_stock(db, warehouse_id, quantities)
+            successful_records += len(chunk)
+        except SQLAlchemyError:
+            failed_records += len(chunk)
+    return successful_records, failed_records
+
+
+def check_stock_csv_columns(csv_file: BinaryIO):
+    """
+    Check that the header of a CSV stock file has the required columns,
+    also when the file has no records. The file is left at its start.
+    """
+    required_columns = ["product_id", "quantity"]
+    columns = pd.read_csv(csv_file, nrows=0).columns
+    csv_file.seek(0)
+    if not all(column in columns for column in required_columns):
+        raise ValueError(
+            "The CSV file must be contain these columns: "
+            f"{', '.join(required_columns)}"
+        )
+
+
+def import_stock_csv(
+    db: Session,
+    warehouse_id: UUID,
+    csv_file: BinaryIO,
+    suppliers_client: SuppliersClient,
+) -> Iterator[Tuple[int, int, int]]:
+    """
+    Parse a CSV stock file in batches and load every batch into the
+    warehouse. Yields the processed, successful and failed record counts
+    of each batch.
+    """
+    check_stock_csv_columns(csv_file)
+    for batch in pd.read_csv(csv_file, chunksize=STOCK_IMPORT_CHUNK_SIZE):
+        records = batch.to_dict("records")
+        successful, failed = import_stock_records(
+            db,
+            warehouse_id=warehouse_id,
+            records=records,
+            suppliers_client=suppliers_client,
+        )
+        yield len(records), successful, failed
 
 
 def create_operation(
@@ -93,6 +293,7 @@ def create_operation(
     processed_records: int,
     successful_records: int,
     failed_records: int,
+    status: models.OperationStatus = models.OperationStatus.COMPLETED,
 ) -> models.Operation:
     """Create an operation."""
     db_operation = models.Operation(
@@ -101,6 +302,7 @@ def create_operation(
         processed_records=processed_records,
         successful_records=successful_records,
         failed_records=failed_records,
+        status=status,
     )
     db.add(db_operation)
     db.commit()
@@ -108,6 +310,49 @@ def create_operation(
     return db_operation
 
 
+def fail_stale_operations(db: Session, stale_after: float) -> List[UUID]:
+    """
+    Mark as failed the pending or processing operations without progress
+    in the last ``stale_after`` seconds. Returns the ids of the operations.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=stale_after)
+    failed = [
+        operation_id
+        for (operation_id,) in db.query(models.Operation.id)
+        .filter(
+            models.Operation.status.in_(
+                [
+                    models.OperationStatus.PENDING,
+                    models.OperationStatus.PROCESSING,
+                ]
+            ),
+            func.coalesce(
+                models.Operation.updated_at, models.Operation.created_at
+            )
+            < cutoff,
+        )
+        .with_for_update(skip_locked=True)
+    ]
+    if failed:
+        db.query(models.Operation).filter(
+            models.Operation.id.in_(failed)
+        ).update(
+            {"status": models.OperationStatus.FAILED},
+            synchronize_session=False,
+        )
+    db.commit()
+    return failed
+
+
+def get_operation(db: Session, operation_id: UUID) -> models.Operation:
+    """Get operation by id."""
+    return (
+        db.query(models.Operation)
+        .filter(models.Operation.id == operation_id)
+        .first()
+    )
+
+
 def get_list_all_products(db: Session) -> list[models.Stock]:
     """Get stock list by filter params."""
     db_stock = db.query(models.Stock)
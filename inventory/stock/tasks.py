@@ -0,0 +1,80 @@
+import os
+import tempfile
+from contextlib import suppress
+from uuid import UUID
+
+from config import (
+    STOCK_IMPORT_SPOOL_DIR,
+    STOCK_IMPORT_SPOOL_PREFIX,
+    STOCK_IMPORT_STALE_AFTER,
+)
+from database import SessionLocal
+from rpc_clients.suppliers_client import SuppliersClient
+
+from . import models, services
+
+
+def spool_path(operation_id: UUID) -> str:
+    """
+    Path of the spooled CSV file of a background import.
+    """
+    spool_dir = STOCK_IMPORT_SPOOL_DIR or tempfile.gettempdir()
+    return os.path.join(
+        spool_dir, f"{STOCK_IMPORT_SPOOL_PREFIX}{operation_id}.csv"
+    )
+
+
+def run_stock_import(operation_id: UUID, file_path: str):
+    """
+    Load a spooled CSV stock file in background, updating the operation
+    counters after every batch so the progress can be followed while it
+    runs.
+    """
+    db = SessionLocal()
+    try:
+        operation = services.get_operation(db, operation_id)
+        operation.status = models.OperationStatus.PROCESSING
+        db.commit()
+        try:
+            with open(file_path, "rb") as csv_file:
+                for processed, successful, failed in services.import_stock_csv(
+                    db,
+                    warehouse_id=operation.warehouse_id,
+                    csv_file=csv_file,
+                    suppliers_client=SuppliersClient(),
+                ):
+                    operation.processed_records += processed
+                    operation.successful_records += successful
+                    operation.failed_records += failed
+                    db.commit()
+            operation.status = models.OperationStatus.COMPLETED
+        except Exception as e:
+            print(
+                f"Error importing stock file of operation {operation_id}: {e}"
+            )
+            db.rollback()
+            operation.status = models.OperationStatus.FAILED
+        db.commit()
+    finally:
+        db.close()
+        # Removed already if the import was recovered as stale
+        with suppress(FileNotFoundError):
+            os.remove(file_path)
+
+
+def recover_stale_imports(stale_after: float = STOCK_IMPORT_STALE_AFTER):
+    """
+    Fail the background imports lost by a restarted process and remove
+    their spool files. Only imports without progress for ``stale_after``
+    seconds are touched, so the imports of other running processes go on.
+    """
+    db = SessionLocal()
+    try:
+        failed = services.fail_stale_operations(db, stale_after)
+    finally:
+        db.close()
+    if failed:
+        print(f"Failed {len(failed)} stale stock import operations")
+    for operation_id in failed:
+        with suppress(FileNotFoundError):
+            os.remove(spool_path(operation_id))
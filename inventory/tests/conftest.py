@@ -11,6 +11,8 @@ from sqlalchemy.pool import StaticPool
 from database import Base
 from db_dependency import get_db
 from main import app as init_app
+from rpc_clients.suppliers_client import product_cache
+from seedwork.circuit_breaker import CircuitBreaker
 
 SQLALCHEMY_DATABASE_URL = "sqlite://"
 
@@ -84,3 +86,16 @@ def client(
     with TestClient(app) as client:
         # Set authorixation token
         yield client
+
+
+@pytest.fixture(autouse=True)
+def clear_product_cache():
+    """
+    Start every test case with an empty product cache and closed
+    circuits.
+    """
+    product_cache.clear()
+    CircuitBreaker.reset_all()
+    yield
+    product_cache.clear()
+    CircuitBreaker.reset_all()
@@ -3,8 +3,16 @@ from unittest.mock import MagicMock, patch
 from uuid import uuid4
 from faker import Faker
 
+from rpc_clients.cache import TTLCache
+from rpc_clients.consumers import ChangeEventsConsumer
+from rpc_clients.degraded import track_degraded
 from rpc_clients.schemas import ProductSchema
-from rpc_clients.suppliers_client import SuppliersClient
+from rpc_clients.suppliers_client import (
+    PRODUCT_FIELDS,
+    SuppliersClient,
+    product_cache,
+)
+from seedwork.circuit_breaker import CircuitBreaker, CircuitOpenError
 
 fake = Faker()
 
@@ -44,7 +52,18 @@ class TestSuppliersClient:
         #  correct routing key and payload
         mock_call_broker.assert_called_once_with(
             "suppliers.get_products",
-            {"product_ids": [str(product_id) for product_id in product_ids]},
+            {
+                "product_ids": [str(product_id) for product_id in product_ids],
+                "fields": [
+                    "id",
+                    "images",
+                    "product_code",
+                    "name",
+                    "price",
+                    "manufacturer.id",
+                    "manufacturer.manufacturer_name",
+                ],
+            },
         )
 
     def test_get_products_returns_correct_data(
@@ -139,3 +158,167 @@ class TestSuppliersClient:
 
         result = suppliers_client.get_products([product_id])
         assert len(result) == 0
+
+    def test_get_products_only_requests_products_not_cached(
+        self, suppliers_client: SuppliersClient, mock_call_broker: MagicMock
+    ):
+        """
+        Test that cached and unknown products are not requested again.
+        """
+        cached_id, unknown_id, new_id = uuid4(), uuid4(), uuid4()
+
+        def call_broker(_routing_key, payload):
+            return {
+                "products": [
+                    {
+                        "id": product_id,
+                        "product_code": str(
+                            fake.random_int(min=1000, max=9999)
+                        ),
+                        "name": fake.word(),
+                        "price": fake.random_number(digits=5),
+                        "images": [],
+                        "manufacturer": {
+                            "id": str(uuid4()),
+                            "manufacturer_name": fake.company(),
+                        },
+                    }
+                    for product_id in payload["product_ids"]
+                    if product_id != str(unknown_id)
+                ]
+            }
+
+        mock_call_broker.side_effect = call_broker
+        suppliers_client.get_products([cached_id, unknown_id])
+
+        result = suppliers_client.get_products([new_id, cached_id, unknown_id])
+
+        # Assert the products are returned in the requested order and only
+        #  the new product went over the wire
+        assert [product.id for product in result] == [new_id, cached_id]
+        assert mock_call_broker.call_count == 2
+        mock_call_broker.assert_called_with(
+            "suppliers.get_products",
+            {"product_ids": [str(new_id)], "fields": PRODUCT_FIELDS},
+        )
+
+    def test_get_products_falls_back_to_stale_products(
+        self, suppliers_client: SuppliersClient, mock_call_broker: MagicMock
+    ):
+        """
+        Test that expired products are returned and flagged as degraded
+          when suppliers can not be reached, only if stale products are
+          allowed.
+        """
+        product = ProductSchema(
+            id=uuid4(),
+            images=[],
+            product_code=fake.ean(),
+            name=fake.word(),
+            price=10,
+            manufacturer={"id": uuid4(), "manufacturer_name": fake.company()},
+        )
+        product_cache.set_many({product.id: product})
+        mock_call_broker.side_effect = CircuitOpenError()
+
+        with (
+            patch.object(product_cache, "timer", return_value=float("inf")),
+            track_degraded() as degraded,
+        ):
+            with pytest.raises(CircuitOpenError):
+                suppliers_client.get_products([product.id])
+            assert suppliers_client.get_products(
+                [product.id], allow_stale=True
+            ) == [product]
+            with pytest.raises(CircuitOpenError):
+                suppliers_client.get_products([uuid4()], allow_stale=True)
+
+        assert degraded == {"suppliers"}
+
+
+class TestCircuitBreaker:
+    def test_circuit_opens_after_repeated_failures(self):
+        """
+        Test that the circuit opens after the failure threshold, rejects
+          calls until the reset timeout and then lets one trial call through.
+        """
+        clock = MagicMock(return_value=0)
+        breaker = CircuitBreaker(
+            "route", failure_threshold=2, reset_timeout=30, timer=clock
+        )
+
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        clock.return_value = 30
+        breaker.before_call()
+        # Only the trial call goes through
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        breaker.record_success()
+        breaker.before_call()
+        assert breaker.failures == 0
+
+
+class TestTTLCache:
+    @pytest.fixture
+    def clock(self) -> MagicMock:
+        """
+        Fixture to control the time seen by the cache.
+        """
+        return MagicMock(return_value=0)
+
+    def test_entries_expire_after_their_ttl(self, clock: MagicMock):
+        """
+        Test that found and negative entries expire with their own TTL.
+        """
+        cache = TTLCache(maxsize=10, ttl=60, negative_ttl=5, timer=clock)
+        cache.set_many({"found": 1, "unknown": None})
+
+        clock.return_value = 10
+        assert cache.get_many(["found", "unknown"]) == (
+            {"found": 1},
+            ["unknown"],
+        )
+
+        clock.return_value = 60
+        assert cache.get_many(["found"]) == ({}, ["found"])
+        # Expired values are still available as stale values
+        assert cache.get_stale_many(["found", "unknown"]) == {"found": 1}
+
+    def test_least_recently_used_entries_are_evicted(self, clock: MagicMock):
+        """
+        Test that the cache does not grow beyond its max size.
+        """
+        cache = TTLCache(maxsize=2, ttl=60, negative_ttl=5, timer=clock)
+        cache.set_many({"first": 1, "second": 2})
+        cache.get_many(["first"])
+        cache.set_many({"third": 3})
+
+        assert len(cache) == 2
+        assert cache.get_many(["first", "second", "third"]) == (
+            {"first": 1, "third": 3},
+            ["second"],
+        )
+
+
+class TestChangeEventsConsumer:
+    def test_changed_products_are_evicted(self):
+        """
+        Test that product change events evict only the changed products.
+        """
+        product_id, other_product_id = uuid4(), uuid4()
+        product_cache.set_many({product_id: None, other_product_id: None})
+
+        ChangeEventsConsumer().process_payload(
+            {'event': 'product.changed', 'product_ids': [str(product_id)]}
+        )
+
+        assert product_cache.get_many([product_id, other_product_id]) == (
+            {other_product_id: None},
+            [product_id],
+        )
@@ -1,12 +1,16 @@
 import csv
 import io
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from uuid import UUID
 import pytest
 from faker import Faker
 from fastapi.testclient import TestClient
-from rpc_clients.suppliers_client import SuppliersClient
-from stock.models import Stock
+from db_dependency import get_db
+from rpc_clients.degraded import DEGRADED_DATA_HEADER
+from rpc_clients.schemas import ProductSchema
+from rpc_clients.suppliers_client import SuppliersClient, product_cache
+from stock.models import Operation, Stock
+from tests.conftest import TestingSessionLocal
 from warehouse.models import Warehouse
 
 fake = Faker()
@@ -260,8 +264,8 @@ def test_upload_inventory_csv_success(
     db_session.commit()
     db_session.refresh(dummy_warehouse)
 
-    mock_suppliers_client.get_products.return_value = [
-        {"id": str(fake.uuid4), "name": "Test Product"}
+    mock_suppliers_client.get_products.side_effect = lambda product_ids: [
+        MagicMock(id=product_id) for product_id in product_ids
     ]
     client.app.dependency_overrides[SuppliersClient] = (
         lambda: mock_suppliers_client
@@ -287,6 +291,246 @@ def test_upload_inventory_csv_success(
     assert response.status_code == 201
     response_data = response.json()
     assert response_data["warehouse_id"] == str(dummy_warehouse.id)
+    assert response_data["processed_records"] == 4
+    assert response_data["successful_records"] == 4
+    assert response_data["failed_records"] == 0
+    # The existence of all products is checked with a single call
+    mock_suppliers_client.get_products.assert_called_once()
+
+
+def test_upload_inventory_csv_streams_file_in_batches(
+    client: TestClient,
+    csv_dummy_file: bytes,
+    db_session,
+    mock_suppliers_client,
+) -> None:
+    """
+    Test that the CSV file is parsed and loaded in bounded batches.
+    """
+    # Arrange
+    dummy_warehouse = mock_warehouse_db()
+    db_session.add(dummy_warehouse)
+    db_session.commit()
+    db_session.refresh(dummy_warehouse)
+
+    mock_suppliers_client.get_products.side_effect = lambda product_ids: [
+        MagicMock(id=product_id) for product_id in product_ids
+    ]
+    client.app.dependency_overrides[SuppliersClient] = (
+        lambda: mock_suppliers_client
+    )
+    files = {
+        "inventory_upload": (
+            "test.csv",
+            csv_dummy_file,
+            "application/octet-stream",
+        )
+    }
+    data = {"warehouse_id": str(dummy_warehouse.id)}
+
+    # Act
+    with patch("stock.services.STOCK_IMPORT_CHUNK_SIZE", 3):
+        response = client.post("/inventory/stock/csv", files=files, data=data)
+
+    # Assert
+    assert response.status_code == 201
+    response_data = response.json()
+    assert response_data["processed_records"] == 4
+    assert response_data["successful_records"] == 4
+    assert [
+        len(call.args[0])
+        for call in mock_suppliers_client.get_products.call_args_list
+    ] == [3, 1]
+
+
+def test_upload_inventory_csv_failed_empty_file(
+    client: TestClient, db_session
+) -> None:
+    """
+    Test uploading an empty CSV file.
+    """
+    # Arrange
+    dummy_warehouse = mock_warehouse_db()
+    db_session.add(dummy_warehouse)
+    db_session.commit()
+    db_session.refresh(dummy_warehouse)
+
+    files = {"inventory_upload": ("test.csv", b"", "text/csv")}
+    data = {"warehouse_id": str(dummy_warehouse.id)}
+
+    # Act
+    response = client.post("/inventory/stock/csv", files=files, data=data)
+
+    # Assert
+    assert response.status_code == 400
+    assert response.json()["detail"] == "The CSV file is empty"
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_upload_inventory_csv_failed_wrong_header_without_records(
+    client: TestClient, db_session, background: bool
+) -> None:
+    """
+    Test that the columns are checked also when the CSV file only has a
+    header.
+    """
+    # Arrange
+    dummy_warehouse = mock_warehouse_db()
+    db_session.add(dummy_warehouse)
+    db_session.commit()
+    db_session.refresh(dummy_warehouse)
+
+    files = {"inventory_upload": ("test.csv", b"product,units\n", "text/csv")}
+    data = {
+        "warehouse_id": str(dummy_warehouse.id),
+        "background": str(background).lower(),
+    }
+
+    # Act
+    response = client.post("/inventory/stock/csv", files=files, data=data)
+
+    # Assert
+    assert response.status_code == 400
+    assert "product_id, quantity" in response.json()["detail"]
+    assert db_session.query(Operation).count() == 0
+
+
+def test_upload_inventory_csv_upserts_stock_in_bulk(
+    client: TestClient,
+    db_session,
+    mock_suppliers_client,
+) -> None:
+    """
+    Test that repeated products are added up, existing stock is increased
+    and invalid or unknown products are counted as failed.
+    """
+    # Arrange
+    dummy_warehouse = mock_warehouse_db()
+    db_session.add(dummy_warehouse)
+    db_session.flush()
+    db_session.refresh(dummy_warehouse)
+
+    existing_stock = mock_stock_db(dummy_warehouse)
+    existing_stock.quantity = 10
+    db_session.add(existing_stock)
+    db_session.commit()
+
+    new_product_id = UUID(fake.uuid4())
+    unknown_product_id = UUID(fake.uuid4())
+    mock_suppliers_client.get_products.side_effect = lambda product_ids: [
+        MagicMock(id=product_id)
+        for product_id in product_ids
+        if product_id != unknown_product_id
+    ]
+    client.app.dependency_overrides[SuppliersClient] = (
+        lambda: mock_suppliers_client
+    )
+
+    csv_file = io.StringIO()
+    writer = csv.writer(csv_file)
+    writer.writerow(["product_id", "quantity"])
+    writer.writerow([existing_stock.product_id, 5])
+    writer.writerow([new_product_id, 3])
+    writer.writerow([new_product_id, 4])
+    writer.writerow([unknown_product_id, 1])
+    writer.writerow([new_product_id, -1])
+    writer.writerow(["not-a-uuid", 1])
+    files = {
+        "inventory_upload": (
+            "test.csv",
+            csv_file.getvalue().encode("utf-8"),
+            "application/octet-stream",
+        )
+    }
+    data = {"warehouse_id": str(dummy_warehouse.id)}
+
+    # Act
+    response = client.post("/inventory/stock/csv", files=files, data=data)
+
+    # Assert
+    assert response.status_code == 201
+    response_data = response.json()
+    assert response_data["processed_records"] == 6
+    assert response_data["successful_records"] == 3
+    assert response_data["failed_records"] == 3
+    mock_suppliers_client.get_products.assert_called_once()
+
+    db_session.expire_all()
+    quantities = {
+        stock.product_id: stock.quantity
+        for stock in db_session.query(Stock).all()
+    }
+    assert quantities == {existing_stock.product_id: 15, new_product_id: 7}
+
+
+def test_upload_inventory_csv_in_background(
+    client: TestClient,
+    csv_dummy_file: bytes,
+    db_session,
+    mock_suppliers_client,
+) -> None:
+    """
+    Test that a background upload returns a pending operation right away
+    and its progress can be queried once the file is processed.
+    """
+    # Arrange
+    dummy_warehouse = mock_warehouse_db()
+    db_session.add(dummy_warehouse)
+    db_session.commit()
+    db_session.refresh(dummy_warehouse)
+
+    mock_suppliers_client.get_products.side_effect = lambda product_ids: [
+        MagicMock(id=product_id) for product_id in product_ids
+    ]
+
+    files = {
+        "inventory_upload": (
+            "test.csv",
+            csv_dummy_file,
+            "application/octet-stream",
+        )
+    }
+    data = {"warehouse_id": str(dummy_warehouse.id), "background": "true"}
+
+    # Act
+    with (
+        patch("stock.tasks.SessionLocal", return_value=db_session),
+        patch(
+            "stock.tasks.SuppliersClient", return_value=mock_suppliers_client
+        ),
+    ):
+        response = client.post(
+            "/inventory/stock/csv",
+            files=files,
+            data=data,
+        )
+        operation_id = response.json()["operation_id"]
+        operation_response = client.get(
+            f"/inventory/stock/operations/{operation_id}"
+        )
+
+    # Assert
+    assert response.status_code == 202
+    assert response.json()["status"] == "PENDING"
+    assert response.json()["processed_records"] == 0
+    assert operation_response.status_code == 200
+    operation_data = operation_response.json()
+    assert operation_data["status"] == "COMPLETED"
+    assert operation_data["processed_records"] == 4
+    assert operation_data["successful_records"] == 4
+    assert operation_data["failed_records"] == 0
+
+
+def test_get_operation_failed_not_exist(client: TestClient) -> None:
+    """
+    Test getting an operation that does not exist.
+    """
+    # Act
+    response = client.get(f"/inventory/stock/operations/{fake.uuid4()}")
+
+    # Assert
+    assert response.status_code == 404
+    assert response.json()["detail"] == "The operation does not exist"
 
 
 def test_upload_inventory_csv_failed_warehouse_invalid_format(
@@ -520,3 +764,144 @@ def test_get_stock_failed_with_invalid_product_format(
 
     # Assert
     assert response.status_code == 422
+
+
+def test_list_products_stock_with_stale_products(
+    client: TestClient,
+    db_session,
+) -> None:
+    """
+    Test that the products stock is built from the cached products when
+    suppliers can not be reached and the response is flagged as degraded,
+    the products that are not cached are left empty.
+    """
+    # Arrange
+    dummy_warehouse = mock_warehouse_db()
+    db_session.add(dummy_warehouse)
+    db_session.commit()
+    stock = mock_stock_db(dummy_warehouse)
+    uncached_stock = mock_stock_db(dummy_warehouse)
+    db_session.add_all([stock, uncached_stock])
+    db_session.commit()
+    product = ProductSchema(
+        id=stock.product_id,
+        images=[],
+        product_code=fake.ean(),
+        name=fake.word(),
+        price=10,
+        manufacturer={"id": fake.uuid4(), "manufacturer_name": fake.company()},
+    )
+    product_cache.set_many({product.id: product})
+
+    # Act
+    with (
+        patch.object(product_cache, "timer", return_value=float("inf")),
+        patch.object(
+            SuppliersClient, "call_broker", side_effect=TimeoutError()
+        ),
+    ):
+        response = client.get("/inventory/stock/products")
+
+    # Assert
+    assert response.status_code == 200
+    names = {
+        item["product_id"]: item["product_name"] for item in response.json()
+    }
+    assert names == {
+        str(stock.product_id): product.name,
+        str(uncached_stock.product_id): None,
+    }
+    assert response.headers[DEGRADED_DATA_HEADER] == "suppliers"
+
+
+def test_upload_inventory_does_not_use_stale_products(
+    client: TestClient,
+    db_session,
+) -> None:
+    """
+    Test that stock is not loaded for products checked against the stale
+    cache while suppliers can not be reached.
+    """
+    # Arrange
+    dummy_warehouse = mock_warehouse_db()
+    db_session.add(dummy_warehouse)
+    db_session.commit()
+    dummy_stock = mock_stock_dict(dummy_warehouse)
+    product = ProductSchema(
+        id=dummy_stock["product_id"],
+        images=[],
+        product_code=fake.ean(),
+        name=fake.word(),
+        price=10,
+        manufacturer={"id": fake.uuid4(), "manufacturer_name": fake.company()},
+    )
+    product_cache.set_many({product.id: product})
+    # Use the real client, not the mock left by other tests
+    client.app.dependency_overrides.pop(SuppliersClient, None)
+
+    # Act
+    with (
+        patch.object(product_cache, "timer", return_value=float("inf")),
+        patch.object(
+            SuppliersClient, "call_broker", side_effect=TimeoutError()
+        ),
+    ):
+        response = client.post("/inventory/stock", json=dummy_stock)
+
+    # Assert
+    assert response.status_code == 503
+    assert db_session.query(Stock).count() == 0
+
+
+def test_reserve_stock(client: TestClient, db_session) -> None:
+    dummy_warehouse = mock_warehouse_db()
+    db_session.add(dummy_warehouse)
+    db_session.flush()
+    dummy_stock = mock_stock_db(dummy_warehouse)
+    dummy_stock.quantity = 5
+    db_session.add(dummy_stock)
+    db_session.commit()
+    item = {
+        "warehouse_id": str(dummy_warehouse.id),
+        "product_id": str(dummy_stock.product_id),
+        "quantity": 2,
+    }
+
+    response = client.post(
+        "/inventory/stock/reservations", json={"items": [item]}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["reserved"] is True
+    assert data["items"][0]["remaining"] == 3
+
+
+def test_reserve_stock_failed_not_enough_stock(client: TestClient) -> None:
+    # The failed reservation rolls back, use a session that owns its
+    # transaction
+    session = TestingSessionLocal()
+    client.app.dependency_overrides[get_db] = lambda: session
+    dummy_warehouse = mock_warehouse_db()
+    session.add(dummy_warehouse)
+    session.flush()
+    dummy_stock = mock_stock_db(dummy_warehouse)
+    session.add(dummy_stock)
+    session.commit()
+    item = {
+        "warehouse_id": str(dummy_warehouse.id),
+        "product_id": str(dummy_stock.product_id),
+        "quantity": dummy_stock.quantity + 1,
+    }
+
+    response = client.post(
+        "/inventory/stock/reservations", json={"items": [item]}
+    )
+
+    assert response.status_code == 409
+    data = response.json()
+    assert data["reserved"] is False
+    assert data["items"][0]["error"] == "Not enough stock"
+    session.refresh(dummy_stock)
+    assert dummy_stock.quantity == item["quantity"] - 1
+    session.close()
@@ -0,0 +1,223 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Generator
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.orm import Session
+
+from config import STOCK_IMPORT_SPOOL_PREFIX
+from stock import services, tasks
+from stock.models import Operation, OperationStatus, Stock
+from stock.schemas import StockReservationItemSchema
+from tests.conftest import TestingSessionLocal
+from warehouse.models import Warehouse
+
+
+@pytest.fixture
+def session() -> Generator[Session, Any, None]:
+    """
+    Session whose commits and rollbacks are real, the tables are dropped
+    after each test.
+    """
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def warehouse(session: Session) -> Warehouse:
+    warehouse = Warehouse(
+        name="Test Warehouse",
+        country="Test Country",
+        city="Test City",
+        address="Test Address",
+        phone="1234567890",
+    )
+    session.add(warehouse)
+    session.commit()
+    return warehouse
+
+
+def add_stock(session: Session, warehouse: Warehouse, quantity: int) -> Stock:
+    stock = Stock(
+        warehouse_id=warehouse.id, product_id=uuid4(), quantity=quantity
+    )
+    session.add(stock)
+    session.commit()
+    return stock
+
+
+def test_reduce_stock_only_takes_available_units(
+    session: Session, warehouse: Warehouse
+):
+    stock = add_stock(session, warehouse, 5)
+
+    reduced = services.reduce_stock(session, warehouse.id, stock.product_id, 3)
+    assert reduced.quantity == 2
+
+    with pytest.raises(ValueError, match="Not enough stock"):
+        services.reduce_stock(session, warehouse.id, stock.product_id, 3)
+    with pytest.raises(ValueError, match="Stock not found"):
+        services.reduce_stock(session, warehouse.id, uuid4(), 1)
+    session.refresh(stock)
+    assert stock.quantity == 2
+
+
+def test_increase_stock(session: Session, warehouse: Warehouse):
+    stock = add_stock(session, warehouse, 5)
+
+    increased = services.increase_stock(
+        session, warehouse.id, stock.product_id, 4
+    )
+
+    assert increased.quantity == 9
+    with pytest.raises(ValueError, match="Stock not found"):
+        services.increase_stock(session, warehouse.id, uuid4(), 1)
+
+
+def test_failed_stock_changes_keep_the_pending_work(
+    session: Session, warehouse: Warehouse
+):
+    stock = add_stock(session, warehouse, 1)
+    pending = Stock(warehouse_id=warehouse.id, product_id=uuid4(), quantity=7)
+    session.add(pending)
+
+    with pytest.raises(ValueError, match="Stock not found"):
+        services.increase_stock(session, warehouse.id, uuid4(), 1)
+    with pytest.raises(ValueError, match="Not enough stock"):
+        services.reduce_stock(session, warehouse.id, stock.product_id, 2)
+    session.commit()
+
+    assert services.get_stock(session, warehouse.id, pending.product_id)
+
+
+def test_reserve_stock_reserves_every_item(
+    session: Session, warehouse: Warehouse
+):
+    first = add_stock(session, warehouse, 5)
+    second = add_stock(session, warehouse, 10)
+
+    reserved, results = services.reserve_stock(
+        session,
+        [
+            StockReservationItemSchema(
+                warehouse_id=warehouse.id,
+                product_id=second.product_id,
+                quantity=4,
+            ),
+            StockReservationItemSchema(
+                warehouse_id=warehouse.id,
+                product_id=first.product_id,
+                quantity=5,
+            ),
+        ],
+    )
+
+    assert reserved
+    assert [result.remaining for result in results] == [6, 0]
+    assert all(result.error is None for result in results)
+
+
+def test_reserve_stock_reserves_nothing_when_an_item_fails(
+    session: Session, warehouse: Warehouse
+):
+    stock = add_stock(session, warehouse, 5)
+    unknown_product_id = uuid4()
+
+    reserved, results = services.reserve_stock(
+        session,
+        [
+            StockReservationItemSchema(
+                warehouse_id=warehouse.id,
+                product_id=stock.product_id,
+                quantity=3,
+            ),
+            StockReservationItemSchema(
+                warehouse_id=warehouse.id,
+                product_id=stock.product_id,
+                quantity=3,
+            ),
+            StockReservationItemSchema(
+                warehouse_id=warehouse.id,
+                product_id=unknown_product_id,
+                quantity=1,
+            ),
+        ],
+    )
+
+    assert not reserved
+    assert [result.error for result in results] == [
+        "Not enough stock",
+        "Not enough stock",
+        "Stock not found",
+    ]
+    assert not any(result.reserved for result in results)
+    session.refresh(stock)
+    assert stock.quantity == 5
+
+
+def test_stale_imports_are_failed_and_their_spool_files_removed(
+    session: Session, warehouse: Warehouse, tmp_path
+):
+    """
+    Test that only the imports and spool files without recent progress
+      are cleaned up on startup.
+    """
+    old = datetime.now(timezone.utc) - timedelta(hours=1)
+    stale, running = (
+        Operation(
+            file_name="stock.csv",
+            warehouse_id=warehouse.id,
+            status=OperationStatus.PROCESSING,
+            created_at=created_at,
+        )
+        for created_at in (old, datetime.now(timezone.utc))
+    )
+    session.add_all([stale, running])
+    session.commit()
+    # Both files were uploaded long ago, only the progress of the import
+    # matters
+    stale_file, running_file = (
+        tmp_path / f"{STOCK_IMPORT_SPOOL_PREFIX}{operation.id}.csv"
+        for operation in (stale, running)
+    )
+    for spool_file in (stale_file, running_file):
+        spool_file.write_text("product_id,quantity\n")
+        os.utime(spool_file, (old.timestamp(), old.timestamp()))
+
+    with (
+        patch("stock.tasks.SessionLocal", return_value=TestingSessionLocal()),
+        patch("stock.tasks.STOCK_IMPORT_SPOOL_DIR", str(tmp_path)),
+    ):
+        tasks.recover_stale_imports(stale_after=60)
+
+    session.refresh(stale)
+    session.refresh(running)
+    assert stale.status == OperationStatus.FAILED
+    assert running.status == OperationStatus.PROCESSING
+    assert not stale_file.exists()
+    assert running_file.exists()
+
+
+def test_import_of_a_recovered_operation_ends_without_its_file(
+    session: Session, warehouse: Warehouse, tmp_path
+):
+    """
+    Test that an import whose spool file was removed by the recovery
+      fails without raising.
+    """
+    operation = Operation(
+        file_name="stock.csv",
+        warehouse_id=warehouse.id,
+        status=OperationStatus.PENDING,
+    )
+    session.add(operation)
+    session.commit()
+
+    with patch("stock.tasks.SessionLocal", return_value=TestingSessionLocal()):
+        tasks.run_stock_import(operation.id, str(tmp_path / "removed.csv"))
+
+    session.refresh(operation)
+    assert operation.status == OperationStatus.FAILED
@@ -0,0 +1,54 @@
+import threading
+from typing import Dict, Optional
+from uuid import UUID
+
+from config import CHANGE_EVENTS_EXCHANGE
+from database import SessionLocal
+from seedwork.base_consumer import BaseConsumer
+
+from . import services
+
+
+class CatalogEventsConsumer(BaseConsumer):
+    """
+    Apply the product and seller changes to their views. The whole
+    catalogs are copied again every time the consumer connects, the
+    events received while the sync runs are applied on top of it.
+    """
+
+    def __init__(self):
+        # A single worker applies the events in the order they arrive
+        super().__init__(exchange=CHANGE_EVENTS_EXCHANGE, workers=1)
+        # Runs inside the API process and must not keep it alive
+        self.daemon = True
+        self._sync: Optional[threading.Thread] = None
+
+    def on_connected(self):
+        # Changes published while disconnected were missed. The sync runs
+        # in its own thread, the connection must keep serving heartbeats
+        if self._sync is None or not self._sync.is_alive():
+            self._sync = threading.Thread(target=self.sync, daemon=True)
+            self._sync.start()
+
+    def sync(self):
+        db = SessionLocal()
+        try:
+            services.sync_catalog(db)
+        except Exception as e:
+            print(f"Error syncing the product and seller views: {e}")
+        finally:
+            db.close()
+
+    def process_payload(self, payload: Dict) -> None:
+        db = SessionLocal()
+        try:
+            if payload.get("event") == "product.changed":
+                services.refresh_products(
+                    db, [UUID(id) for id in payload["product_ids"]]
+                )
+            elif payload.get("event") == "seller.changed":
+                services.refresh_sellers(
+                    db, [UUID(id) for id in payload["seller_ids"]]
+                )
+        finally:
+            db.close()
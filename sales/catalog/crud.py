@@ -0,0 +1,97 @@
+from typing import Dict, List
+from uuid import UUID
+
+from sqlalchemy import and_, delete, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from rpc_clients.schemas import ProductSchema, SellerSchema
+
+from .models import ProductView, SellerView
+
+
+def _upsert(db: Session, model: type, rows: List[Dict]):
+    """
+    Insert the rows, replacing the ones whose id already exists with an
+    older or the same version. A late event or a slow read can not
+    overwrite a newer row, rows without version are always replaced.
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(model).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[model.id],
+        set_={
+            **{
+                column: stmt.excluded[column]
+                for column in rows[0]
+                if column != "id"
+            },
+            "synced_at": func.now(),
+        },
+        where=or_(
+            model.updated_at.is_(None),
+            and_(
+                stmt.excluded.updated_at.is_not(None),
+                stmt.excluded.updated_at >= model.updated_at,
+            ),
+        ),
+    )
+    db.execute(stmt)
+
+
+def upsert_products(db: Session, products: List[ProductSchema]):
+    """
+    Store the products in the product view.
+    """
+    _upsert(
+        db,
+        ProductView,
+        [
+            product.model_dump(include=set(ProductSchema.model_fields))
+            for product in products
+        ],
+    )
+
+
+def upsert_sellers(db: Session, sellers: List[SellerSchema]):
+    """
+    Store the sellers in the seller view.
+    """
+    _upsert(
+        db,
+        SellerView,
+        [
+            seller.model_dump(include=set(SellerSchema.model_fields))
+            for seller in sellers
+        ],
+    )
+
+
+def delete_products(db: Session, product_ids: List[UUID]):
+    db.execute(delete(ProductView).where(ProductView.id.in_(product_ids)))
+
+
+def delete_sellers(db: Session, seller_ids: List[UUID]):
+    db.execute(delete(SellerView).where(SellerView.id.in_(seller_ids)))
+
+
+def get_products(db: Session, product_ids: List[UUID]) -> List[ProductView]:
+    """
+    Retrieve the replicated products with the given ids.
+    """
+    if not product_ids:
+        return []
+    return db.query(ProductView).filter(ProductView.id.in_(product_ids)).all()
+
+
+def get_sellers(db: Session, seller_ids: List[UUID]) -> List[SellerView]:
+    """
+    Retrieve the replicated sellers with the given ids.
+    """
+    if not seller_ids:
+        return []
+    return db.query(SellerView).filter(SellerView.id.in_(seller_ids)).all()
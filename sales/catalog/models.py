@@ -0,0 +1,41 @@
+from sqlalchemy import DECIMAL, JSON, UUID, Column, DateTime, String
+from sqlalchemy.sql import func
+
+from database import Base
+
+
+class ProductView(Base):
+    """
+    Copy of the product fields read by sales, replicated from suppliers.
+    """
+
+    __tablename__ = "product_view"
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    product_code = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    price = Column(DECIMAL(precision=20, scale=2), nullable=False)
+    images = Column(JSON, nullable=False, default=list)
+    updated_at = Column(DateTime, nullable=True)
+    synced_at = Column(
+        DateTime, server_default=func.now(), onupdate=func.now()
+    )
+
+
+class SellerView(Base):
+    """
+    Copy of the seller fields read by sales, replicated from users.
+    """
+
+    __tablename__ = "seller_view"
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    full_name = Column(String, nullable=False)
+    email = Column(String, nullable=False)
+    username = Column(String, nullable=False)
+    phone = Column(String, nullable=False)
+    id_type = Column(String, nullable=True)
+    identification = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=True)
+    synced_at = Column(
+        DateTime, server_default=func.now(), onupdate=func.now()
+    )
@@ -0,0 +1,126 @@
+import threading
+from itertools import islice
+from typing import Callable, Dict, Iterable, List
+from uuid import UUID
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from config import CATALOG_PAGE_SIZE
+from rpc_clients.schemas import ProductSchema, SellerSchema
+from rpc_clients.suppliers_client import (
+    AsyncSuppliersClient,
+    SuppliersClient,
+    product_cache,
+)
+from rpc_clients.users_client import (
+    AsyncUsersClient,
+    UsersClient,
+    seller_cache,
+)
+
+from . import crud
+
+
+def _store(db: Session, upsert: Callable[[Session, List], None], rows: List):
+    # Written with their own session, the session of the caller may be
+    # streaming rows from a server-side cursor
+    with Session(bind=db.get_bind()) as writer:
+        upsert(writer, rows)
+        writer.commit()
+
+
+async def _run_db(db: Session, function: Callable, *args):
+    """
+    Run a blocking database call in the thread pool. Products and sellers
+    are usually fetched at the same time for the same request, so the
+    calls sharing a session are serialized.
+    """
+
+    def locked():
+        with db.info.setdefault("catalog_lock", threading.Lock()):
+            return function(db, *args)
+
+    return await run_in_threadpool(locked)
+
+
+async def get_products(
+    db: Session, product_ids: Iterable[UUID]
+) -> Dict[UUID, ProductSchema]:
+    """
+    Get products by id from the product view, the products that are not
+    replicated yet are requested to suppliers and stored.
+    """
+    product_ids = list(set(product_ids))
+    products = {
+        product.id: ProductSchema.model_validate(product)
+        for product in await _run_db(db, crud.get_products, product_ids)
+    }
+    missing = [id for id in product_ids if id not in products]
+    if missing:
+        fetched = await AsyncSuppliersClient().get_products(missing)
+        await _run_db(db, _store, crud.upsert_products, fetched)
+        products.update({product.id: product for product in fetched})
+    return products
+
+
+async def get_sellers(
+    db: Session, seller_ids: Iterable[UUID]
+) -> Dict[UUID, SellerSchema]:
+    """
+    Get sellers by id from the seller view, the sellers that are not
+    replicated yet are requested to users and stored.
+    """
+    seller_ids = list(set(seller_ids))
+    sellers = {
+        seller.id: SellerSchema.model_validate(seller)
+        for seller in await _run_db(db, crud.get_sellers, seller_ids)
+    }
+    missing = [id for id in seller_ids if id not in sellers]
+    if missing:
+        fetched = await AsyncUsersClient().get_sellers(missing)
+        await _run_db(db, _store, crud.upsert_sellers, fetched)
+        sellers.update({seller.id: seller for seller in fetched})
+    return sellers
+
+
+def refresh_products(db: Session, product_ids: List[UUID]):
+    """
+    Replace the replicated products by their current version, the ones
+    that no longer exist are removed.
+    """
+    for product_id in product_ids:
+        product_cache.invalidate(product_id)
+    products = SuppliersClient().get_products(product_ids)
+    found = {product.id for product in products}
+    crud.upsert_products(db, products)
+    crud.delete_products(db, [id for id in product_ids if id not in found])
+    db.commit()
+
+
+def refresh_sellers(db: Session, seller_ids: List[UUID]):
+    """
+    Replace the replicated sellers by their current version, the ones
+    that no longer exist are removed.
+    """
+    for seller_id in seller_ids:
+        seller_cache.invalidate(seller_id)
+    sellers = UsersClient().get_sellers(seller_ids)
+    found = {seller.id for seller in sellers}
+    crud.upsert_sellers(db, sellers)
+    crud.delete_sellers(db, [id for id in seller_ids if id not in found])
+    db.commit()
+
+
+def sync_catalog(db: Session, page_size: int = CATALOG_PAGE_SIZE):
+    """
+    Copy the whole products and sellers catalogs into their views, one
+    page at a time.
+    """
+    for upsert, rows in (
+        (crud.upsert_products, SuppliersClient().get_all_products(page_size)),
+        (crud.upsert_sellers, UsersClient().get_all_sellers(page_size)),
+    ):
+        while page := list(islice(rows, page_size)):
+            upsert(db, page)
+            db.commit()
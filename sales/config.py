@@ -12,6 +12,71 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "sales")
 USERS_PATH = os.getenv("USERS_PATH")
 BROKER_HOST = os.getenv("BROKER_HOST", "localhost")
+# Messages processed in parallel by each broker consumer and messages
+# delivered to it before they are acked
+CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", "4"))
+CONSUMER_PREFETCH_COUNT = int(os.getenv("CONSUMER_PREFETCH_COUNT", "8"))
+# Seconds the broker consumers wait before reconnecting, doubled after
+# every failed attempt up to the max
+CONSUMER_RECONNECT_DELAY = float(os.getenv("CONSUMER_RECONNECT_DELAY", "1"))
+CONSUMER_RECONNECT_MAX_DELAY = float(
+    os.getenv("CONSUMER_RECONNECT_MAX_DELAY", "30")
+)
+# Messages merged into one transaction by the batching consumers and how
+# long they wait for a batch to fill up
+CONSUMER_BATCH_SIZE = int(os.getenv("CONSUMER_BATCH_SIZE", "50"))
+CONSUMER_BATCH_WINDOW_MS = float(os.getenv("CONSUMER_BATCH_WINDOW_MS", "5"))
+# Times a batch consumer publishes again a message whose processing
+# failed on a transient error, and seconds before the first retry, doubled
+# on every retry
+CONSUMER_MAX_RETRIES = int(os.getenv("CONSUMER_MAX_RETRIES", "5"))
+CONSUMER_RETRY_DELAY = float(os.getenv("CONSUMER_RETRY_DELAY", "1"))
+# RPC bodies larger than this many bytes are compressed with zstd when
+# the peer accepts it, 0 disables the compression
+RPC_COMPRESSION_THRESHOLD = int(
+    os.getenv("RPC_COMPRESSION_THRESHOLD", "16384")
+)
+# Content type requested for the RPC responses, peers that do not
+# support it answer with JSON
+RPC_CONTENT_TYPE = os.getenv("RPC_CONTENT_TYPE", "application/msgpack")
+# Consecutive RPC failures that open the circuit of a route and seconds
+# until a new call is tried
+RPC_BREAKER_FAILURE_THRESHOLD = int(
+    os.getenv("RPC_BREAKER_FAILURE_THRESHOLD", "5")
+)
+RPC_BREAKER_RESET_TIMEOUT = float(
+    os.getenv("RPC_BREAKER_RESET_TIMEOUT", "30")
+)
+# Fanout exchange where product and seller changes are published
+CHANGE_EVENTS_EXCHANGE = os.getenv("CHANGE_EVENTS_EXCHANGE", "ccp.changes")
+# Product details cached by the suppliers RPC client, TTLs in seconds
+PRODUCT_CACHE_MAX_SIZE = int(os.getenv("PRODUCT_CACHE_MAX_SIZE", "10000"))
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "3600"))
+PRODUCT_CACHE_NEGATIVE_TTL = float(
+    os.getenv("PRODUCT_CACHE_NEGATIVE_TTL", "30")
+)
+# Seller details cached by the users RPC client, TTLs in seconds
+SELLER_CACHE_MAX_SIZE = int(os.getenv("SELLER_CACHE_MAX_SIZE", "10000"))
+SELLER_CACHE_TTL = float(os.getenv("SELLER_CACHE_TTL", "3600"))
+SELLER_CACHE_NEGATIVE_TTL = float(
+    os.getenv("SELLER_CACHE_NEGATIVE_TTL", "30")
+)
+# Delivery addresses of the sales cached in memory, TTLs in seconds
+ADDRESS_CACHE_MAX_SIZE = int(os.getenv("ADDRESS_CACHE_MAX_SIZE", "10000"))
+ADDRESS_CACHE_TTL = float(os.getenv("ADDRESS_CACHE_TTL", "3600"))
+ADDRESS_CACHE_NEGATIVE_TTL = float(
+    os.getenv("ADDRESS_CACHE_NEGATIVE_TTL", "30")
+)
+# Products and sellers requested per page when listing the whole catalog
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "500"))
+# Order numbers reserved at once by each process, it is also the
+# increment of the order number sequence, which must be altered when it
+# changes
+ORDER_NUMBER_BLOCK_SIZE = int(os.getenv("ORDER_NUMBER_BLOCK_SIZE", "100"))
+# Orders accepted by a single request of the batch intake endpoint
+SALES_BATCH_MAX_SIZE = int(os.getenv("SALES_BATCH_MAX_SIZE", "1000"))
+# Sales read and enriched per batch while streaming the CSV export
+SALES_EXPORT_BATCH_SIZE = int(os.getenv("SALES_EXPORT_BATCH_SIZE", "500"))
 CORS_ORIGINS = os.getenv(
     "CORS_ORIGINS",
     "http://localhost,"
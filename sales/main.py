@@ -7,10 +7,14 @@ from sqlalchemy.orm import Session
 
 import config
 import schemas
+from catalog.consumers import CatalogEventsConsumer
 from database import Base, SessionLocal, engine
 from db_dependency import get_db
 from plans.api import plans_router
-from sales.api import sales_router
+from rpc_clients.consumers import ChangeEventsConsumer
+from rpc_clients.degraded import DEGRADED_DATA_HEADER, flag_degraded_data
+from sales.api import NEXT_CURSOR_HEADER, sales_router
+from sales.order_numbers import order_numbers
 from sales.seed_data import seed_sales
 
 app = FastAPI()
@@ -22,7 +26,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, DEGRADED_DATA_HEADER],
 )
+# Flag the responses built with stale products or sellers
+app.middleware("http")(flag_degraded_data)
 
 prefix_router = APIRouter(prefix="/api/v1/sales")
 # Include the users router
@@ -42,6 +49,11 @@ if "pytest" not in sys.modules:
     Base.metadata.create_all(bind=engine)
     # Seeding the database with initial data
     seed_database()
+    # Keep the RPC client caches of this process up to date
+    ChangeEventsConsumer().start()
+    # Keep the product and seller views up to date, they are synced again
+    # every time the consumer connects to the broker
+    CatalogEventsConsumer().start()
 
 
 # Reset the database
@@ -50,6 +62,8 @@ def reset(db: Session = Depends(get_db)):
     Base.metadata.drop_all(bind=db.get_bind())
     Base.metadata.create_all(bind=db.get_bind())
     db.commit()
+    # The sequence starts again, the blocks reserved before are in use
+    order_numbers.reset()
     seed_database(db)
     return schemas.DeleteResponse()
 
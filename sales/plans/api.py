@@ -2,6 +2,7 @@ import uuid
 from typing import Dict, List
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.encoders import jsonable_encoder
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
@@ -24,7 +25,7 @@ plans_router = APIRouter(prefix="/plans")
         }
     },
 )
-def create_plan(
+async def create_plan(
     payload: Dict,
     db: Session = Depends(get_db),
 ) -> schemas.SalesPlanDetailSchema:
@@ -32,9 +33,14 @@ def create_plan(
     Create a new sales plan.
     """
     try:
-        payload = schemas.CreateSalesPlanSchema.model_validate(payload)
-        plans = services.create_sales_plan(db, payload)
-        return mappers.plan_to_schema(plans)
+        # Validators call other services, keep them off the event loop
+        payload = await run_in_threadpool(
+            schemas.CreateSalesPlanSchema.model_validate, payload
+        )
+        plans = await run_in_threadpool(
+            services.create_sales_plan, db, payload
+        )
+        return await mappers.plan_to_schema(db, plans)
     except ValidationError as e:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -57,14 +63,14 @@ def create_plan(
         }
     },
 )
-def list_plans(
+async def list_plans(
     db: Session = Depends(get_db),
 ) -> List[schemas.SalesPlanDetailSchema]:
     """
     List all sales plans.
     """
-    plans = services.get_all_sales_plans(db)
-    return mappers.plans_to_schema(plans)
+    plans = await run_in_threadpool(services.get_all_sales_plans, db)
+    return await mappers.plans_to_schema(db, plans)
 
 
 @plans_router.get(
@@ -78,17 +84,17 @@ def list_plans(
         }
     },
 )
-def get_plan(
+async def get_plan(
     plan_id: uuid.UUID,
     db: Session = Depends(get_db),
 ) -> schemas.SalesPlanDetailSchema:
     """
     Get a sales plan by ID.
     """
-    plan = services.get_sales_plan(db, plan_id)
+    plan = await run_in_threadpool(services.get_sales_plan, db, plan_id)
     if not plan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sales plan not found",
         )
-    return mappers.plan_to_schema(plan)
+    return await mappers.plan_to_schema(db, plan)
@@ -1,7 +1,7 @@
 import uuid
 from typing import List
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from . import models
 
@@ -22,16 +22,16 @@ def create_sales_plan(
             )
         )
     db.commit()
-    db.refresh(payload)
-    return payload
+    return get_sales_plan(db, payload.id)
 
 
 def get_all_sales_plans(db: Session) -> List[models.SalesPlan]:
     """
-    Get all sales plans.
+    Get all sales plans with their sellers.
     """
     return (
         db.query(models.SalesPlan)
+        .options(selectinload(models.SalesPlan.sellers))
         .order_by(models.SalesPlan.created_at.desc())
         .all()
     )
@@ -39,10 +39,11 @@ def get_all_sales_plans(db: Session) -> List[models.SalesPlan]:
 
 def get_sales_plan(db: Session, plan_id: uuid.UUID) -> models.SalesPlan:
     """
-    Get a sales plan by ID.
+    Get a sales plan by ID with its sellers.
     """
     return (
         db.query(models.SalesPlan)
+        .options(selectinload(models.SalesPlan.sellers))
         .filter(models.SalesPlan.id == plan_id)
         .first()
     )
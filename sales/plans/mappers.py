@@ -1,7 +1,9 @@
+import asyncio
 from typing import Dict
 
-from rpc_clients.suppliers_client import SuppliersClient
-from rpc_clients.users_client import UsersClient
+from sqlalchemy.orm import Session
+
+from catalog import services as catalog
 
 from .models import SalesPlan
 from .schemas import SalesPlanDetailSchema
@@ -25,23 +27,32 @@ def _plan_to_schema(
     )
 
 
-def plan_to_schema(sales_plan: SalesPlan) -> SalesPlanDetailSchema:
+async def plan_to_schema(
+    db: Session, sales_plan: SalesPlan
+) -> SalesPlanDetailSchema:
     """
     Convert a SalesPlan object to a SalesPlanDetailSchema object.
     """
-    sellers = UsersClient().get_sellers(
-        [seller.seller_id for seller in sales_plan.sellers]
+    sellers, products = await asyncio.gather(
+        catalog.get_sellers(
+            db, [seller.seller_id for seller in sales_plan.sellers]
+        ),
+        catalog.get_products(db, [sales_plan.product_id]),
     )
-    product = SuppliersClient().get_product(sales_plan.product_id)
+    if sales_plan.product_id not in products:
+        raise ValueError("Product not found.")
 
     return _plan_to_schema(
         sales_plan=sales_plan,
-        sellers={s.id: s for s in sellers},
-        products={product.id: product},
+        sellers=sellers,
+        products=products,
     )
 
 
-def plans_to_schema(plans: list[SalesPlan]) -> list[SalesPlanDetailSchema]:
+async def plans_to_schema(
+    db: Session,
+    plans: list[SalesPlan],
+) -> list[SalesPlanDetailSchema]:
     """
     Convert a list of SalesPlan objects to a list
       of SalesPlanDetailSchema objects.
@@ -52,9 +63,11 @@ def plans_to_schema(plans: list[SalesPlan]) -> list[SalesPlanDetailSchema]:
     }
     # Get all product IDs from the plans
     product_ids = {plan.product_id for plan in plans}
-    # Fetch sellers and products in bulk
-    sellers = {u.id: u for u in UsersClient().get_sellers(seller_ids)}
-    products = {p.id: p for p in SuppliersClient().get_products(product_ids)}
+    # Read sellers and products from their local views, at the same time
+    sellers, products = await asyncio.gather(
+        catalog.get_sellers(db, seller_ids),
+        catalog.get_products(db, product_ids),
+    )
     result = []
     for plan in plans:
         result.append(
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Tuple
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with a time to live per entry and a
+    bounded size, evicting the least recently used entries first.
+
+    Entries stored with a ``None`` value are negative entries, they
+    remember that a key does not exist and expire after ``negative_ttl``.
+    Expired values are kept until they are replaced or evicted, so they can
+    still be served when fresh values can not be fetched.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        negative_ttl: float,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timer = timer
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(
+        self, keys: Iterable[Hashable]
+    ) -> Tuple[Dict[Hashable, Any], List[Hashable]]:
+        """
+        Return the cached values of the keys and the keys that are not
+        cached or are expired.
+        """
+        found = {}
+        missing = []
+        now = self.timer()
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None or entry[0] <= now:
+                    if entry is not None and entry[1] is None:
+                        del self._data[key]
+                    missing.append(key)
+                    continue
+                self._data.move_to_end(key)
+                found[key] = entry[1]
+        return found, missing
+
+    def get_stale_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """
+        Return the cached values of the keys even if they are expired.
+        """
+        with self._lock:
+            return {
+                key: self._data[key][1]
+                for key in keys
+                if key in self._data and self._data[key][1] is not None
+            }
+
+    def set_many(self, items: Dict[Hashable, Any]):
+        """
+        Store the values, a ``None`` value is stored as a negative entry.
+        """
+        now = self.timer()
+        with self._lock:
+            for key, value in items.items():
+                ttl = self.ttl if value is not None else self.negative_ttl
+                self._data[key] = (now + ttl, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """
+        Remove a key from the cache.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+Fetch = Callable[[List[Hashable]], Dict[Hashable, Any]]
+AsyncFetch = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+
+class BatchLoader:
+    """
+    Share the fetches in flight between the threads asking for the same
+    keys, so a key is requested once however many threads need it at the
+    same time. Keys missing in the fetch result load as None.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+
+    def load_many(
+        self, keys: List[Hashable], fetch: Fetch
+    ) -> Dict[Hashable, Any]:
+        """
+        Load the keys, fetching only the keys that are not already being
+        fetched by another thread.
+        """
+        with self._lock:
+            futures = {key: self._in_flight.get(key) for key in keys}
+            own = {
+                key: Future() for key, future in futures.items() if not future
+            }
+            self._in_flight.update(own)
+        futures.update(own)
+
+        if own:
+            try:
+                values = fetch(list(own))
+                for key, future in own.items():
+                    future.set_result(values.get(key))
+            except Exception as e:
+                for future in own.values():
+                    future.set_exception(e)
+            finally:
+                with self._lock:
+                    for key in own:
+                        self._in_flight.pop(key, None)
+        return {key: future.result() for key, future in futures.items()}
+
+
+class AsyncBatchLoader:
+    """
+    Coalesce the keys requested during the same event loop tick into a
+    single fetch, and share the fetches in flight between the coroutines
+    asking for the same keys. Keys missing in the fetch result load as
+    None.
+    """
+
+    def __init__(self):
+        self._loops = weakref.WeakKeyDictionary()
+
+    def _state(self, loop: asyncio.AbstractEventLoop) -> Dict:
+        state = self._loops.get(loop)
+        if state is None:
+            state = self._loops[loop] = {
+                "pending": {},
+                "in_flight": {},
+                "fetch": None,
+            }
+        return state
+
+    async def load_many(
+        self, keys: List[Hashable], fetch: AsyncFetch
+    ) -> Dict[Hashable, Any]:
+        """
+        Load the keys, the keys that are not already being fetched are
+        requested together with the rest of keys of this tick.
+        """
+        loop = asyncio.get_running_loop()
+        state = self._state(loop)
+        futures = {}
+        for key in keys:
+            future = state["in_flight"].get(key) or state["pending"].get(key)
+            if future is None:
+                future = state["pending"][key] = loop.create_future()
+            futures[key] = future
+        if state["pending"] and state["fetch"] is None:
+            state["fetch"] = fetch
+            loop.call_soon(self._dispatch, loop)
+        # Shielded, a cancelled caller must not cancel the shared fetches
+        values = await asyncio.gather(
+            *(asyncio.shield(future) for future in futures.values())
+        )
+        return dict(zip(futures, values))
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop):
+        state = self._state(loop)
+        batch, state["pending"] = state["pending"], {}
+        fetch, state["fetch"] = state["fetch"], None
+        state["in_flight"].update(batch)
+        loop.create_task(self._fetch(state, batch, fetch))
+
+    async def _fetch(self, state: Dict, batch: Dict, fetch: AsyncFetch):
+        try:
+            values = await fetch(list(batch))
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(values.get(key))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for key in batch:
+                state["in_flight"].pop(key, None)
@@ -26,4 +26,5 @@ class ProductSchema(BaseModel):
     product_code: str
     name: str
     price: Decimal
+    updated_at: Optional[datetime.datetime] = None
     model_config = ConfigDict(from_attributes=True)
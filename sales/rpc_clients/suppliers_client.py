@@ -1,10 +1,61 @@
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional
 from uuid import UUID as UUUID
 
+from config import (
+    CATALOG_PAGE_SIZE,
+    PRODUCT_CACHE_MAX_SIZE,
+    PRODUCT_CACHE_NEGATIVE_TTL,
+    PRODUCT_CACHE_TTL,
+)
+from seedwork.base_async_rpc_client import AsyncBaseRPCClient
 from seedwork.base_rpc_client import BaseRPCClient
 
+from .cache import TTLCache
+from .degraded import stale_fallback
+from .loader import AsyncBatchLoader, BatchLoader
 from .schemas import ProductSchema
 
+# Products by id shared by every suppliers client of the process, unknown
+# ids are cached as None
+product_cache = TTLCache(
+    maxsize=PRODUCT_CACHE_MAX_SIZE,
+    ttl=PRODUCT_CACHE_TTL,
+    negative_ttl=PRODUCT_CACHE_NEGATIVE_TTL,
+)
+# Cache misses requested at the same time share a single request
+product_loader = BatchLoader()
+async_product_loader = AsyncBatchLoader()
+# Only the product fields used by this service are requested
+PRODUCT_FIELDS = list(ProductSchema.model_fields)
+
+
+def _get_products_payload(product_ids: Optional[List[UUUID]]) -> Dict:
+    return {
+        "product_ids": (
+            [str(id) for id in product_ids] if product_ids else None
+        ),
+        "fields": PRODUCT_FIELDS,
+    }
+
+
+def _parse_products(response: Dict) -> List[ProductSchema]:
+    return [
+        ProductSchema.model_validate(products)
+        for products in response["products"]
+    ]
+
+
+def _product_keys(product_ids: List[UUUID]) -> List[UUUID]:
+    return list(dict.fromkeys(UUUID(str(id)) for id in product_ids))
+
+
+def _cache_products(
+    missing: List[UUUID], products: List[ProductSchema]
+) -> Dict[UUUID, ProductSchema]:
+    fetched = {product.id: product for product in products}
+    product_cache.set_many({id: fetched.get(id) for id in missing})
+    return fetched
+
 
 class SuppliersClient(BaseRPCClient):
     """
@@ -12,21 +63,45 @@ class SuppliersClient(BaseRPCClient):
     """
 
     def get_products(
-        self, product_ids: Optional[List[UUUID]]
+        self, product_ids: Optional[List[UUUID]], allow_stale: bool = True
     ) -> List[ProductSchema]:
         """
-        Get user by id.
+        Get products by id, only the products that are not cached are
+        requested to the suppliers service. Unless ``allow_stale`` is
+        false, the last known products are returned while it is down.
         """
-        payload = {
-            "product_ids": (
-                [str(id) for id in product_ids] if product_ids else None
+        if product_ids is None:
+            payload = _get_products_payload(None)
+            response = self.call_broker("suppliers.get_products", payload)
+            products = _parse_products(response)
+            product_cache.set_many(
+                {product.id: product for product in products}
             )
-        }
+            return products
+
+        keys = _product_keys(product_ids)
+        cached, missing = product_cache.get_many(keys)
+        if missing:
+            try:
+                cached.update(
+                    product_loader.load_many(missing, self._fetch_products)
+                )
+            except (TimeoutError, ConnectionError):
+                if not allow_stale:
+                    raise
+                # Serve the last known products while suppliers is down
+                stale = stale_fallback(product_cache, missing, "suppliers")
+                if not stale:
+                    raise
+                cached.update(stale)
+        return [cached[key] for key in keys if cached.get(key) is not None]
+
+    def _fetch_products(
+        self, product_ids: List[UUUID]
+    ) -> Dict[UUUID, ProductSchema]:
+        payload = _get_products_payload(product_ids)
         response = self.call_broker("suppliers.get_products", payload)
-        return [
-            ProductSchema.model_validate(products)
-            for products in response["products"]
-        ]
+        return _cache_products(product_ids, _parse_products(response))
 
     def get_product(self, product_id: UUUID) -> ProductSchema:
         """
@@ -37,8 +112,78 @@ class SuppliersClient(BaseRPCClient):
             raise ValueError("Product not found.")
         return product[0]
 
-    def get_all_products(self) -> List[ProductSchema]:
+    def get_all_products(
+        self, page_size: int = CATALOG_PAGE_SIZE
+    ) -> Iterator[ProductSchema]:
         """
-        Get all products.
+        Iterate over all the products. They are requested page by page, so
+        the whole catalog is neither sent in one message nor held in memory.
         """
-        return self.get_products(None)
+        payload = {"limit": page_size, "fields": PRODUCT_FIELDS}
+        while True:
+            response = self.call_broker("suppliers.list_products", payload)
+            products = _parse_products(response)
+            product_cache.set_many(
+                {product.id: product for product in products}
+            )
+            yield from products
+            if response["next_cursor"] is None:
+                return
+            payload = {**payload, "cursor": response["next_cursor"]}
+
+
+class AsyncSuppliersClient(AsyncBaseRPCClient):
+    """
+    Asyncio client to interact with the suppliers service.
+    """
+
+    async def get_products(
+        self, product_ids: Optional[List[UUUID]]
+    ) -> List[ProductSchema]:
+        """
+        Get products by id, only the products that are not cached are
+        requested to the suppliers service.
+        """
+        if product_ids is None:
+            payload = _get_products_payload(None)
+            response = await self.call_broker(
+                "suppliers.get_products", payload
+            )
+            products = _parse_products(response)
+            product_cache.set_many(
+                {product.id: product for product in products}
+            )
+            return products
+
+        keys = _product_keys(product_ids)
+        cached, missing = product_cache.get_many(keys)
+        if missing:
+            try:
+                cached.update(
+                    await async_product_loader.load_many(
+                        missing, self._fetch_products
+                    )
+                )
+            except (TimeoutError, ConnectionError):
+                # Serve the last known products while suppliers is down
+                stale = stale_fallback(product_cache, missing, "suppliers")
+                if not stale:
+                    raise
+                cached.update(stale)
+        return [cached[key] for key in keys if cached.get(key) is not None]
+
+    async def _fetch_products(
+        self, product_ids: List[UUUID]
+    ) -> Dict[UUUID, ProductSchema]:
+        payload = _get_products_payload(product_ids)
+        response = await self.call_broker("suppliers.get_products", payload)
+        return _cache_products(product_ids, _parse_products(response))
+
+    async def get_product(self, product_id: UUUID) -> ProductSchema:
+        """
+        Get a product by id.
+        """
+        product = await self.get_products([product_id])
+        if not product:
+            raise ValueError("Product not found.")
+        return product[0]
@@ -1,10 +1,60 @@
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional
 from uuid import UUID as UUUID
 
+from config import (
+    CATALOG_PAGE_SIZE,
+    SELLER_CACHE_MAX_SIZE,
+    SELLER_CACHE_NEGATIVE_TTL,
+    SELLER_CACHE_TTL,
+)
+from seedwork.base_async_rpc_client import AsyncBaseRPCClient
 from seedwork.base_rpc_client import BaseRPCClient
 
+from .cache import TTLCache
+from .degraded import stale_fallback
+from .loader import AsyncBatchLoader, BatchLoader
 from .schemas import SellerSchema
 
+# Sellers by id shared by every users client of the process, unknown ids
+# are cached as None
+seller_cache = TTLCache(
+    maxsize=SELLER_CACHE_MAX_SIZE,
+    ttl=SELLER_CACHE_TTL,
+    negative_ttl=SELLER_CACHE_NEGATIVE_TTL,
+)
+# Cache misses requested at the same time share a single request
+seller_loader = BatchLoader()
+async_seller_loader = AsyncBatchLoader()
+# Only the seller fields used by this service are requested
+SELLER_FIELDS = list(SellerSchema.model_fields)
+
+
+def _get_sellers_payload(seller_ids: Optional[List[UUUID]]) -> Dict:
+    return {
+        "seller_ids": (
+            [str(id) for id in seller_ids] if seller_ids else None
+        ),
+        "fields": SELLER_FIELDS,
+    }
+
+
+def _parse_sellers(response: Dict) -> List[SellerSchema]:
+    return [
+        SellerSchema.model_validate(seller) for seller in response["sellers"]
+    ]
+
+
+def _seller_keys(seller_ids: List[UUUID]) -> List[UUUID]:
+    return list(dict.fromkeys(UUUID(str(id)) for id in seller_ids))
+
+
+def _cache_sellers(
+    missing: List[UUUID], sellers: List[SellerSchema]
+) -> Dict[UUUID, SellerSchema]:
+    fetched = {seller.id: seller for seller in sellers}
+    seller_cache.set_many({id: fetched.get(id) for id in missing})
+    return fetched
+
 
 class UsersClient(BaseRPCClient):
     """
@@ -12,24 +62,120 @@ class UsersClient(BaseRPCClient):
     """
 
     def get_sellers(
-        self, seller_ids: Optional[List[UUUID]]
+        self, seller_ids: Optional[List[UUUID]], allow_stale: bool = True
     ) -> List[SellerSchema]:
         """
-        Get user by id.
+        Get sellers by id, only the sellers that are not cached are
+        requested to the users service. Unless ``allow_stale`` is false,
+        the last known sellers are returned while it is down.
         """
-        payload = {
-            "seller_ids": (
-                [str(id) for id in seller_ids] if seller_ids else None
-            )
-        }
+        if seller_ids is None:
+            payload = _get_sellers_payload(None)
+            response = self.call_broker("users.get_sellers", payload)
+            sellers = _parse_sellers(response)
+            seller_cache.set_many({seller.id: seller for seller in sellers})
+            return sellers
+
+        keys = _seller_keys(seller_ids)
+        cached, missing = seller_cache.get_many(keys)
+        if missing:
+            try:
+                cached.update(
+                    seller_loader.load_many(missing, self._fetch_sellers)
+                )
+            except (TimeoutError, ConnectionError):
+                if not allow_stale:
+                    raise
+                # Serve the last known sellers while users is down
+                stale = stale_fallback(seller_cache, missing, "users")
+                if not stale:
+                    raise
+                cached.update(stale)
+        return [cached[key] for key in keys if cached.get(key) is not None]
+
+    def _fetch_sellers(
+        self, seller_ids: List[UUUID]
+    ) -> Dict[UUUID, SellerSchema]:
+        payload = _get_sellers_payload(seller_ids)
         response = self.call_broker("users.get_sellers", payload)
-        return [
-            SellerSchema.model_validate(seller)
-            for seller in response["sellers"]
-        ]
+        return _cache_sellers(seller_ids, _parse_sellers(response))
+
+    def search_sellers(self, name: str) -> List[SellerSchema]:
+        """
+        Get the sellers whose full name contains the given text.
+        """
+        response = self.call_broker("users.search_sellers", {"name": name})
+        sellers = _parse_sellers(response)
+        seller_cache.set_many({seller.id: seller for seller in sellers})
+        return sellers
+
+    def get_all_sellers(
+        self, page_size: int = CATALOG_PAGE_SIZE
+    ) -> Iterator[SellerSchema]:
+        """
+        Iterate over all the sellers, requested page by page.
+        """
+        payload = {"limit": page_size, "fields": SELLER_FIELDS}
+        while True:
+            response = self.call_broker("users.list_sellers", payload)
+            sellers = _parse_sellers(response)
+            seller_cache.set_many({seller.id: seller for seller in sellers})
+            yield from sellers
+            if response["next_cursor"] is None:
+                return
+            payload = {**payload, "cursor": response["next_cursor"]}
+
+
+class AsyncUsersClient(AsyncBaseRPCClient):
+    """
+    Asyncio client to interact with the users service.
+    """
+
+    async def get_sellers(
+        self, seller_ids: Optional[List[UUUID]]
+    ) -> List[SellerSchema]:
+        """
+        Get sellers by id, only the sellers that are not cached are
+        requested to the users service.
+        """
+        if seller_ids is None:
+            payload = _get_sellers_payload(None)
+            response = await self.call_broker("users.get_sellers", payload)
+            sellers = _parse_sellers(response)
+            seller_cache.set_many({seller.id: seller for seller in sellers})
+            return sellers
+
+        keys = _seller_keys(seller_ids)
+        cached, missing = seller_cache.get_many(keys)
+        if missing:
+            try:
+                cached.update(
+                    await async_seller_loader.load_many(
+                        missing, self._fetch_sellers
+                    )
+                )
+            except (TimeoutError, ConnectionError):
+                # Serve the last known sellers while users is down
+                stale = stale_fallback(seller_cache, missing, "users")
+                if not stale:
+                    raise
+                cached.update(stale)
+        return [cached[key] for key in keys if cached.get(key) is not None]
+
+    async def _fetch_sellers(
+        self, seller_ids: List[UUUID]
+    ) -> Dict[UUUID, SellerSchema]:
+        payload = _get_sellers_payload(seller_ids)
+        response = await self.call_broker("users.get_sellers", payload)
+        return _cache_sellers(seller_ids, _parse_sellers(response))
 
-    def get_all_sellers(self) -> List[SellerSchema]:
+    async def search_sellers(self, name: str) -> List[SellerSchema]:
         """
-        Get all sellers.
+        Get the sellers whose full name contains the given text.
         """
-        return self.get_sellers(None)
+        response = await self.call_broker(
+            "users.search_sellers", {"name": name}
+        )
+        sellers = _parse_sellers(response)
+        seller_cache.set_many({seller.id: seller for seller in sellers})
+        return sellers
@@ -1,19 +1,59 @@
 import csv
 import datetime
 from io import StringIO
-from typing import Annotated, List
+from typing import Annotated, AsyncIterator, Dict, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+from catalog import services as catalog
+from config import SALES_BATCH_MAX_SIZE, SALES_EXPORT_BATCH_SIZE
 from db_dependency import get_db
+from rpc_clients.users_client import AsyncUsersClient
 
 from . import mappers, schemas, services
 
 sales_router = APIRouter(prefix="/sales", tags=["Sales"])
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+EXPORT_HEADER = [
+    "Sale ID",
+    "Order Number",
+    "Seller ID",
+    "Seller Name",
+    "Total Value",
+    "Currency",
+    "Sale At",
+]
+
+
+async def _resolve_seller_name(
+    filter_query: schemas.ListSalesQueryParamsSchema,
+) -> Optional[schemas.ListSalesQueryParamsSchema]:
+    """
+    Replace the seller_name filter by the ids of the matching sellers, so
+    only their sales are loaded. Returns None when no seller matches.
+    """
+    if not filter_query.seller_name:
+        return filter_query
+    sellers = await AsyncUsersClient().search_sellers(
+        filter_query.seller_name
+    )
+    seller_ids = [seller.id for seller in sellers]
+    if filter_query.seller_id:
+        seller_ids = [
+            seller_id
+            for seller_id in seller_ids
+            if seller_id in filter_query.seller_id
+        ]
+    if not seller_ids:
+        return None
+    return filter_query.model_copy(update={"seller_id": seller_ids})
+
 
 @sales_router.get(
     "/",
@@ -21,27 +61,40 @@ sales_router = APIRouter(prefix="/sales", tags=["Sales"])
     status_code=status.HTTP_200_OK,
     responses={
         status.HTTP_200_OK: {
-            "description": "List of all sales.",
-        }
+            "description": "Page of sales, the cursor of the next page is "
+            "returned in the X-Next-Cursor header.",
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Invalid cursor.",
+        },
     },
 )
-def list_sales(
-    filter_query: Annotated[schemas.ListSalesQueryParamsSchema, Query()],
+async def list_sales(
+    filter_query: Annotated[schemas.ListSalesPageQueryParamsSchema, Query()],
+    http_response: Response,
     db: Session = Depends(get_db),
 ) -> List[schemas.SaleDetailSchema]:
     """
-    List all sales.
+    List sales, newest first, one page at a time. Pages have 50 sales
+    unless a limit is given, every sale is no longer listed at once, use
+    the CSV export to get all of them.
     """
-    sales = services.get_all_sales(db, filter_query)
-    response = mappers.sales_to_schema(sales)
-    if filter_query.seller_name:
-        response = [
-            sale
-            for sale in response
-            if filter_query.seller_name.lower()
-            in sale.seller.full_name.lower()
-        ]
-    return response
+    filter_query = await _resolve_seller_name(filter_query)
+    if filter_query is None:
+        return []
+
+    try:
+        sales, next_cursor = await run_in_threadpool(
+            services.get_sales_page, db, filter_query
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    if next_cursor:
+        http_response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return await mappers.sales_to_schema(db, sales)
 
 
 @sales_router.get(
@@ -54,71 +107,120 @@ def list_sales(
         }
     },
 )
-def export_sales_as_csv(
+async def export_sales_as_csv(
     filter_query: Annotated[schemas.ListSalesQueryParamsSchema, Query()],
     db: Session = Depends(get_db),
 ) -> StreamingResponse:
     """
     Export all sales as a CSV file.
     """
-    # Retrieve all sales from the database
-    sales_objects = services.get_all_sales(db, filter_query)
-    sales = mappers.sales_to_schema(sales_objects)
-
-    # Create a CSV writer
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(
-        [
-            "Sale ID",
-            "Order Number",
-            "Seller ID",
-            "Seller Name",
-            "Total Value",
-            "Currency",
-            "Sale At",
-        ]
-    )
-
-    # Write sales data to the CSV
-    for sale in sales:
-        writer.writerow(
-            [
-                str(sale.id),
-                sale.order_number,
-                str(sale.seller.id),
-                sale.seller.full_name,
-                sale.total_value,
-                sale.currency,
-                sale.created_at.isoformat(),
-            ]
-        )
-
-    # Reset the pointer of the StringIO object
-    output.seek(0)
+    seller_filter = filter_query.seller_id
+    filter_query = await _resolve_seller_name(filter_query)
 
     # Return the CSV as a streaming response
     date_now = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    seller = (
-        [
-            sale.seller
-            for sale in sales
-            if sale.seller.id == filter_query.seller_id[0]
-        ]
-        if filter_query.seller_id
-        else []
+    # The catalog reads the seller view in the thread pool
+    sellers = (
+        await catalog.get_sellers(db, seller_filter[:1])
+        if seller_filter
+        else {}
     )
-    for_seller = f"_{seller[0].full_name}" if seller else ""
+    seller = next(iter(sellers.values()), None)
+    for_seller = f"_{seller.full_name}" if seller else ""
     file_name = f"{date_now}{for_seller}_sales.csv"
     # Clean file name
     file_name = file_name.replace(" ", "_").lower()
     return StreamingResponse(
-        output,
+        _export_sales_csv(db, filter_query),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={file_name}"},
     )
 
 
+async def _export_sales_csv(
+    db: Session, filter_query: Optional[schemas.ListSalesQueryParamsSchema]
+) -> AsyncIterator[str]:
+    """
+    Yield the CSV export batch by batch, each batch of sales is read from
+    the database and enriched with a single lookup of the seller view.
+    """
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_HEADER)
+    yield output.getvalue()
+    if filter_query is None:
+        return
+
+    try:
+        batches = services.iter_sales_batches(
+            db, filter_query, SALES_EXPORT_BATCH_SIZE
+        )
+        while sales := await run_in_threadpool(next, batches, None):
+            # Like the batch, the seller view is read in the thread pool
+            sellers = await catalog.get_sellers(
+                db, {sale.seller_id for sale in sales}
+            )
+
+            output.seek(0)
+            output.truncate()
+            for sale in sales:
+                seller = sellers.get(sale.seller_id)
+                writer.writerow(
+                    [
+                        str(sale.id),
+                        sale.order_number,
+                        str(sale.seller_id),
+                        seller.full_name if seller else "",
+                        sale.total_value,
+                        sale.currency,
+                        sale.created_at.isoformat(),
+                    ]
+                )
+            yield output.getvalue()
+    finally:
+        # The request session is already released when the body streams
+        db.close()
+
+
+@sales_router.post(
+    "/batch",
+    response_model=List[schemas.CreateSaleResultSchema],
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "Result of each order, in the order they were "
+            "sent. Rejected orders have an error and no sale.",
+        },
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {
+            "description": "Too many orders in the batch.",
+        },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "description": "Sellers or products could not be validated.",
+        },
+    },
+)
+async def create_sales_batch(
+    payload: List[Dict],
+    db: Session = Depends(get_db),
+) -> List[schemas.CreateSaleResultSchema]:
+    """
+    Create a batch of sales in a single transaction.
+    """
+    if len(payload) > SALES_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A batch can have at most {SALES_BATCH_MAX_SIZE} orders.",
+        )
+    try:
+        # The lookups call other services, keep them off the event loop
+        return await run_in_threadpool(services.create_sales, db, payload)
+    except (TimeoutError, ConnectionError):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Timeout error, please try again in a few minutes.",
+        )
+
+
 @sales_router.get(
     "/{sale_id}",
     response_model=schemas.SaleDetailSchema,
@@ -129,16 +231,16 @@ def export_sales_as_csv(
         }
     },
 )
-def get_sale(
+async def get_sale(
     sale_id: UUID, db: Session = Depends(get_db)
 ) -> schemas.SaleDetailSchema:
     """
     Retrieve a specific sale by ID.
     """
-    sale = services.get_sale_by_id(db, sale_id)
+    sale = await run_in_threadpool(services.get_sale_by_id, db, sale_id)
     if not sale:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sale not found.",
         )
-    return mappers.sale_to_schema(sale)
+    return await mappers.sale_to_schema(db, sale)
@@ -0,0 +1,39 @@
+from typing import Dict, List
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import SessionLocal
+from seedwork.base_batch_consumer import BaseBatchConsumer
+
+from .services import create_sales
+
+
+class CreateSaleConsumer(BaseBatchConsumer):
+    """
+    Consumer for creating sales. Batches failing because a service or the
+    database is unavailable are retried, orders should carry an
+    ``idempotency_key`` so a retried order is not created twice.
+    """
+
+    retry_on = (TimeoutError, ConnectionError, SQLAlchemyError)
+
+    def __init__(self):
+        super().__init__(queue="sales.create_sale")
+
+    def process_batch(self, payloads: List[Dict]) -> List[Dict]:
+        """
+        Consume a batch of orders and create their sales in a single
+        transaction, every order gets its own result.
+
+        Args:
+            payloads (List[Dict]): The incoming orders.
+        """
+        db = SessionLocal()
+        try:
+            results = create_sales(db, payloads)
+        finally:
+            db.close()
+        return [
+            result.model_dump(mode="json", exclude_none=True)
+            for result in results
+        ]
@@ -1,40 +1,82 @@
-from typing import List
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
 from uuid import UUID
 
-from sqlalchemy import func
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, func, insert, or_
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
 
-from .models import Sale
+from .models import Address, Sale, SaleItem
 from .schemas import ListSalesQueryParamsSchema
 
 
-def get_all_sales(
-    db: Session, filters: ListSalesQueryParamsSchema
+def _filter_sales(qs: Query, filters: ListSalesQueryParamsSchema) -> Query:
+    if filters.seller_id:
+        qs = qs.filter(Sale.seller_id.in_(filters.seller_id))
+    if filters.start_date:
+        qs = qs.filter(func.date(Sale.created_at) >= filters.start_date)
+    if filters.end_date:
+        qs = qs.filter(func.date(Sale.created_at) <= filters.end_date)
+    if filters.order_number:
+        qs = qs.filter(Sale.order_number == filters.order_number)
+    return qs
+
+
+def iter_sales_batches(
+    db: Session, filters: ListSalesQueryParamsSchema, batch_size: int
+) -> Iterator[List[Sale]]:
+    """
+    Iterate the sales in batches, newest first, without their items. The
+    rows are fetched from a server-side cursor batch by batch instead of
+    loading the whole result.
+
+    Args:
+        db (Session): The database session.
+        filters (ListSalesQueryParamsSchema): The filters to apply.
+        batch_size (int): The number of sales of each batch.
+
+    Returns:
+        Iterator[List[Sale]]: The batches of Sale objects.
+    """
+    qs = db.query(Sale).order_by(Sale.created_at.desc(), Sale.id.desc())
+    rows = iter(_filter_sales(qs, filters).yield_per(batch_size))
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+def get_sales_page(
+    db: Session,
+    filters: ListSalesQueryParamsSchema,
+    limit: int,
+    after: Optional[Tuple[datetime, UUID]] = None,
 ) -> List[Sale]:
     """
-    Retrieve all sales from the database, ordered by the oldest first.
+    Retrieve a page of sales, ordered by the newest first.
 
     Args:
         db (Session): The database session.
+        filters (ListSalesQueryParamsSchema): The filters to apply.
+        limit (int): The maximum number of sales to return.
+        after (Optional[Tuple[datetime, UUID]]): The created_at and id of
+          the last sale of the previous page.
 
     Returns:
         List[Sale]: A list of Sale objects.
     """
     qs = (
         db.query(Sale)
-        .options(joinedload(Sale.items))
-        .order_by(Sale.created_at.desc())
+        .options(selectinload(Sale.items))
+        .order_by(Sale.created_at.desc(), Sale.id.desc())
     )
-    if filters.seller_id:
-        qs = qs.filter(Sale.seller_id.in_(filters.seller_id))
-    if filters.start_date:
-        qs = qs.filter(func.date(Sale.created_at) >= filters.start_date)
-    if filters.end_date:
-        qs = qs.filter(func.date(Sale.created_at) <= filters.end_date)
-    if filters.order_number:
-        qs = qs.filter(Sale.order_number == filters.order_number)
-
-    return qs.all()
+    if after:
+        created_at, sale_id = after
+        qs = qs.filter(
+            or_(
+                Sale.created_at < created_at,
+                and_(Sale.created_at == created_at, Sale.id < sale_id),
+            )
+        )
+    return _filter_sales(qs, filters).limit(limit).all()
 
 
 def get_sale_by_id(db: Session, sale_id: UUID) -> Sale:
@@ -54,3 +96,73 @@ def get_sale_by_id(db: Session, sale_id: UUID) -> Sale:
         .filter(Sale.id == sale_id)
         .first()
     )
+
+
+def get_addresses(db: Session, address_ids: List[UUID]) -> List[Address]:
+    """
+    Retrieve the addresses with the given ids.
+
+    Args:
+        db (Session): The database session.
+        address_ids (List[UUID]): The ids of the addresses.
+
+    Returns:
+        List[Address]: The Address objects found.
+    """
+    if not address_ids:
+        return []
+    return db.query(Address).filter(Address.id.in_(address_ids)).all()
+
+
+def get_last_order_number(db: Session) -> int:
+    """
+    Return the highest order number in use, 0 when there are no sales.
+
+    Args:
+        db (Session): The database session.
+
+    Returns:
+        int: The highest order number.
+    """
+    return db.query(func.max(Sale.order_number)).scalar() or 0
+
+
+def get_sales_by_idempotency_keys(db: Session, keys: List[str]) -> List[Sale]:
+    """
+    Retrieve the sales created for the given idempotency keys.
+
+    Args:
+        db (Session): The database session.
+        keys (List[str]): The idempotency keys of the orders.
+
+    Returns:
+        List[Sale]: The sales found.
+    """
+    if not keys:
+        return []
+    return db.query(Sale).filter(Sale.idempotency_key.in_(keys)).all()
+
+
+def insert_sales(
+    db: Session,
+    sales: List[Dict],
+    items: List[Dict],
+    addresses: Optional[List[Dict]] = None,
+):
+    """
+    Insert the sales, their items and their new addresses with one
+    multi-row insert per table, without committing.
+
+    Args:
+        db (Session): The database session.
+        sales (List[Dict]): The column values of each sale.
+        items (List[Dict]): The column values of each sale item.
+        addresses (List[Dict], optional): The column values of the
+          addresses created with the sales.
+    """
+    if addresses:
+        db.execute(insert(Address), addresses)
+    if sales:
+        db.execute(insert(Sale), sales)
+    if items:
+        db.execute(insert(SaleItem), items)
@@ -1,22 +1,49 @@
-from typing import Dict, List
+import asyncio
+from typing import Dict, List, Optional, Set
 from uuid import UUID
 
-import faker
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
 
+from catalog import services as catalog
 from rpc_clients.schemas import ProductSchema, SellerSchema
-from rpc_clients.suppliers_client import SuppliersClient
-from rpc_clients.users_client import UsersClient
 
-from .models import Sale
+from . import services
+from .models import Sale, SaleItem
 from .schemas import AddressSchema, SaleDetailSchema, SaleItemSchema
 
-fake = faker.Faker()
+
+def _item_product(
+    item: SaleItem, products: Dict[UUID, ProductSchema]
+) -> Optional[ProductSchema]:
+    """
+    Product of a sale item, from its snapshot when it has one.
+    """
+    if item.product_code is None:
+        return products.get(item.product_id)
+    return ProductSchema(
+        id=item.product_id,
+        product_code=item.product_code,
+        name=item.product_name,
+        price=item.unit_price,
+        images=[item.product_image] if item.product_image else [],
+    )
+
+
+def _unsnapshotted_product_ids(sales: List[Sale]) -> Set[UUID]:
+    return {
+        item.product_id
+        for sale in sales
+        for item in sale.items
+        if item.product_code is None
+    }
 
 
 def _sale_to_schema(
     sale: Sale,
     sellers: Dict[UUID, SellerSchema],
     products: Dict[UUID, ProductSchema],
+    addresses: Dict[UUID, AddressSchema],
 ) -> SaleDetailSchema:
     """
     Map a Sale model to a SaleDetailSchema.
@@ -26,14 +53,7 @@ def _sale_to_schema(
         id=sale.id,
         seller=sellers.get(sale.seller_id),
         order_number=sale.order_number,
-        address=AddressSchema(
-            id=sale.address_id,
-            street=fake.street_address(),
-            city=fake.city(),
-            state=fake.state(),
-            country=fake.country(),
-            postal_code=fake.postalcode(),
-        ),
+        address=addresses.get(sale.address_id),
         total_value=sale.total_value,
         currency=sale.currency,
         created_at=sale.created_at,
@@ -41,7 +61,7 @@ def _sale_to_schema(
         items=[
             SaleItemSchema(
                 id=item.id,
-                product=products.get(item.product_id),
+                product=_item_product(item, products),
                 quantity=item.quantity,
                 unit_price=item.unit_price,
                 total_value=item.total_value,
@@ -53,42 +73,41 @@ def _sale_to_schema(
     )
 
 
-def sale_to_schema(sale: Sale) -> SaleDetailSchema:
+async def sale_to_schema(db: Session, sale: Sale) -> SaleDetailSchema:
     """
     Map a Sale model to a SaleDetailSchema.
     """
-    sellers = UsersClient().get_sellers(
-        [sale.seller_id],
-    )
-    products = SuppliersClient().get_products(
-        [item.product_id for item in sale.items],
+    sellers, products = await asyncio.gather(
+        catalog.get_sellers(db, [sale.seller_id]),
+        catalog.get_products(db, _unsnapshotted_product_ids([sale])),
     )
-    sellers = {seller.id: seller for seller in sellers}
-    products = {product.id: product for product in products}
-    return _sale_to_schema(
-        sale,
-        sellers,
-        products,
+    addresses = await run_in_threadpool(
+        services.get_addresses, db, [sale.address_id]
     )
+    return _sale_to_schema(sale, sellers, products, addresses)
 
 
-def sales_to_schema(sales: List[Sale]) -> List[SaleDetailSchema]:
+async def sales_to_schema(
+    db: Session, sales: List[Sale]
+) -> List[SaleDetailSchema]:
     """
-    Map a list of Sale models to a list of SaleDetailSchema.
+    Map a list of Sale models to a list of SaleDetailSchema. Sellers and
+    the products of items without snapshot are read from their local
+    views, and the addresses of the whole list with a single query.
     """
-    sellers = UsersClient().get_sellers(
-        list({sale.seller_id for sale in sales}),
+    sellers, products = await asyncio.gather(
+        catalog.get_sellers(db, {sale.seller_id for sale in sales}),
+        catalog.get_products(db, _unsnapshotted_product_ids(sales)),
     )
-    products = SuppliersClient().get_products(
-        list({item.product_id for sale in sales for item in sale.items}),
+    addresses = await run_in_threadpool(
+        services.get_addresses, db, {sale.address_id for sale in sales}
     )
-    sellers = {seller.id: seller for seller in sellers}
-    products = {product.id: product for product in products}
     return [
         _sale_to_schema(
             sale,
             sellers,
             products,
+            addresses,
         )
         for sale in sales
     ]
@@ -13,19 +13,39 @@ from sqlalchemy import (
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
+from config import ORDER_NUMBER_BLOCK_SIZE
 from database import Base
 
+# Each value of the sequence reserves the next block of order numbers
+ORDER_NUMBER_SEQUENCE = Sequence(
+    "sales_order_number_seq",
+    increment=ORDER_NUMBER_BLOCK_SIZE,
+    metadata=Base.metadata,
+)
+
+
+class Address(Base):
+    __tablename__ = "addresses"
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    street = Column(String, nullable=False)
+    city = Column(String, nullable=False)
+    state = Column(String, nullable=False)
+    postal_code = Column(String, nullable=False)
+    country = Column(String, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(
+        DateTime, server_default=func.now(), onupdate=func.now()
+    )
+
 
 class Sale(Base):
     __tablename__ = "sales"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     seller_id = Column(UUID(as_uuid=True), nullable=False)
-    order_number = Column(
-        Integer,
-        unique=True,
-        nullable=False,
-        autoincrement=True,
-    )
+    # Assigned from ORDER_NUMBER_SEQUENCE blocks, unique but with gaps
+    order_number = Column(Integer, unique=True, nullable=False)
+    # Given by the client, an order delivered twice creates a single sale
+    idempotency_key = Column(String, unique=True, nullable=True)
     address_id = Column(UUID(as_uuid=True), nullable=False)
     total_value = Column(DECIMAL(precision=20, scale=2), nullable=False)
     currency = Column(String(3), nullable=False)
@@ -46,6 +66,11 @@ class SaleItem(Base):
         UUID(as_uuid=True), ForeignKey("sales.id"), nullable=False
     )
     product_id = Column(UUID(as_uuid=True), nullable=False)
+    # Product as it was when the sale was made, empty on the items sold
+    # before it was kept
+    product_code = Column(String, nullable=True)
+    product_name = Column(String, nullable=True)
+    product_image = Column(String, nullable=True)
     quantity = Column(Integer, nullable=False)
     unit_price = Column(DECIMAL(precision=20, scale=2), nullable=False)
     total_value = Column(DECIMAL(precision=20, scale=2), nullable=False)
@@ -0,0 +1,97 @@
+import os
+import threading
+from collections import deque
+from typing import Deque, List
+
+from sqlalchemy import Sequence, func, select
+from sqlalchemy.orm import Session
+
+from config import ORDER_NUMBER_BLOCK_SIZE
+
+from . import crud
+from .models import ORDER_NUMBER_SEQUENCE
+
+
+class OrderNumberAllocator:
+    """
+    Assign order numbers from blocks reserved on a database sequence.
+
+    The sequence increments by ``block_size``, so each of its values
+    reserves the next ``block_size`` numbers for this process and the
+    numbers are assigned without a round trip per order. The blocks a
+    batch needs are reserved with a single query. Numbers left in the
+    blocks of a process that stops are skipped, so order numbers are
+    unique but not consecutive.
+
+    The blocks of other processes are not known, after the sequence is
+    restarted they can hold numbers that are assigned again. The unique
+    order number makes those sales fail instead of sharing a number, and
+    the reserved blocks are dropped with ``reset`` before retrying.
+    """
+
+    def __init__(
+        self,
+        sequence: Sequence = ORDER_NUMBER_SEQUENCE,
+        block_size: int = ORDER_NUMBER_BLOCK_SIZE,
+    ):
+        self.sequence = sequence
+        self.block_size = block_size
+        self._blocks: Deque[range] = deque()
+        self._reserved_up_to = 0
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def allocate(self, db: Session, count: int) -> List[int]:
+        """
+        Return ``count`` unused order numbers.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # Blocks reserved before a fork would be used twice
+                self._blocks.clear()
+                self._pid = os.getpid()
+            available = sum(len(block) for block in self._blocks)
+            if available < count:
+                blocks = -(-(count - available) // self.block_size)
+                self._blocks.extend(
+                    range(start, start + self.block_size)
+                    for start in self._reserve(db, blocks)
+                )
+            numbers = []
+            while len(numbers) < count:
+                block = self._blocks.popleft()
+                taken = block[: count - len(numbers)]
+                numbers.extend(taken)
+                if len(taken) < len(block):
+                    self._blocks.appendleft(block[len(taken) :])
+            return numbers
+
+    def reset(self):
+        """
+        Drop the reserved blocks, the next numbers come from new blocks.
+        """
+        with self._lock:
+            self._blocks.clear()
+            self._reserved_up_to = 0
+
+    def _reserve(self, db: Session, blocks: int) -> List[int]:
+        """
+        Reserve blocks of numbers and return their first numbers.
+        """
+        if db.get_bind().dialect.supports_sequences:
+            return list(
+                db.scalars(
+                    select(self.sequence.next_value()).select_from(
+                        func.generate_series(1, blocks)
+                    )
+                )
+            )
+        # Without sequences, as in SQLite, continue after the highest
+        # number in use or reserved by this process
+        start = max(crud.get_last_order_number(db), self._reserved_up_to) + 1
+        self._reserved_up_to = start + blocks * self.block_size - 1
+        return [start + i * self.block_size for i in range(blocks)]
+
+
+# Shared by every request and consumer of the process
+order_numbers = OrderNumberAllocator()
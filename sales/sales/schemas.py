@@ -1,9 +1,9 @@
 from datetime import date, datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 from rpc_clients.schemas import ProductSchema, SellerSchema
 
@@ -35,7 +35,8 @@ class SaleDetailSchema(BaseModel):
     id: UUID
     seller: SellerSchema
     order_number: int
-    address: AddressSchema
+    # None for sales whose address is not stored
+    address: Optional[AddressSchema]
     total_value: Decimal
     currency: str
     created_at: datetime
@@ -53,3 +54,55 @@ class ListSalesQueryParamsSchema(BaseModel):
     end_date: Optional[date] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class ListSalesPageQueryParamsSchema(ListSalesQueryParamsSchema):
+    limit: int = Field(default=50, ge=1, le=500)
+    cursor: Optional[str] = None
+
+
+class CreateSaleItemSchema(BaseModel):
+    product_id: UUID
+    quantity: int = Field(ge=1)
+
+
+class CreateAddressSchema(BaseModel):
+    street: str = Field(min_length=1)
+    city: str = Field(min_length=1)
+    state: str = Field(min_length=1)
+    postal_code: str = Field(min_length=1)
+    country: str = Field(min_length=1)
+
+
+class CreateSaleSchema(BaseModel):
+    """
+    Order to create, delivered either to an existing address or to a new
+    one created with the sale. Orders sent again with the same
+    ``idempotency_key`` return the sale already created.
+    """
+
+    seller_id: UUID
+    idempotency_key: Optional[str] = Field(
+        default=None, min_length=1, max_length=255
+    )
+    address_id: Optional[UUID] = None
+    address: Optional[CreateAddressSchema] = None
+    currency: str = Field(default="USD", pattern="^[A-Z]{3}$")
+    items: List[CreateSaleItemSchema] = Field(min_length=1)
+
+    @model_validator(mode="after")
+    def check_address(self) -> "CreateSaleSchema":
+        if (self.address_id is None) == (self.address is None):
+            raise ValueError("Either address_id or address must be given.")
+        return self
+
+
+class CreateSaleResultSchema(BaseModel):
+    """
+    Result of one order of a batch, either the created sale or the error
+    that rejected the order.
+    """
+
+    sale_id: Optional[UUID] = None
+    order_number: Optional[int] = None
+    error: Optional[str | List[Dict[str, Any]]] = None
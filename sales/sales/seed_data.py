@@ -1,4 +1,5 @@
 import uuid
+from itertools import islice
 
 from sqlalchemy import func
 from sqlalchemy.orm import Session
@@ -6,7 +7,34 @@ from sqlalchemy.orm import Session
 from rpc_clients.suppliers_client import SuppliersClient
 from rpc_clients.users_client import UsersClient
 
-from .models import Sale, SaleItem
+from .models import Address, Sale, SaleItem
+from .order_numbers import order_numbers
+from .services import product_snapshot
+
+# Delivery addresses given to the seeded sales
+SEED_ADDRESSES = [
+    {
+        "street": "Carrera 7 # 40-62",
+        "city": "Bogotá",
+        "state": "Cundinamarca",
+        "postal_code": "110231",
+        "country": "Colombia",
+    },
+    {
+        "street": "Calle 10 # 43E-31",
+        "city": "Medellín",
+        "state": "Antioquia",
+        "postal_code": "050021",
+        "country": "Colombia",
+    },
+    {
+        "street": "Avenida 6N # 23-45",
+        "city": "Cali",
+        "state": "Valle del Cauca",
+        "postal_code": "760045",
+        "country": "Colombia",
+    },
+]
 
 
 def seed_sales(db: Session):
@@ -20,13 +48,17 @@ def seed_sales(db: Session):
         return
     # Bring all sellers
     sellers = UsersClient().get_all_sellers()
-    # Bring all products
-    products = SuppliersClient().get_all_products()[:3]
+    # Bring the first products
+    products = list(islice(SuppliersClient().get_all_products(), 3))
 
     total = sum(
         [product.price * (i + 1) for i, product in enumerate(products)]
     )
 
+    addresses = [Address(id=uuid.uuid4(), **data) for data in SEED_ADDRESSES]
+    db.add_all(addresses)
+    db.commit()
+
     # Create one sale for each seller with two items
     for i, seller in enumerate(sellers):
         # Create sale
@@ -34,10 +66,10 @@ def seed_sales(db: Session):
         sale = Sale(
             id=sale_uuid,
             seller_id=seller.id,
-            address_id=uuid.uuid4(),
+            address_id=addresses[i % len(addresses)].id,
             total_value=total,
             currency="USD",
-            order_number=i + 1,
+            order_number=order_numbers.allocate(db, 1)[0],
         )
         db.add(sale)
         db.commit()
@@ -47,7 +79,7 @@ def seed_sales(db: Session):
             item = SaleItem(
                 id=uuid.uuid4(),
                 sale_id=sale.id,
-                product_id=product.id,
+                **product_snapshot(product),
                 quantity=i + 1,
                 unit_price=product.price,
                 total_value=(i + 1) * product.price,
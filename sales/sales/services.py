@@ -1,24 +1,98 @@
-from typing import List
+import base64
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from uuid import UUID
 
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from config import (
+    ADDRESS_CACHE_MAX_SIZE,
+    ADDRESS_CACHE_NEGATIVE_TTL,
+    ADDRESS_CACHE_TTL,
+)
+from rpc_clients.cache import TTLCache
+from rpc_clients.schemas import ProductSchema
+from rpc_clients.suppliers_client import SuppliersClient
+from rpc_clients.users_client import UsersClient
+
 from . import crud, models, schemas
+from .order_numbers import order_numbers
+
+# Delivery addresses by id shared by the whole process, unknown ids are
+# cached as None
+address_cache = TTLCache(
+    maxsize=ADDRESS_CACHE_MAX_SIZE,
+    ttl=ADDRESS_CACHE_TTL,
+    negative_ttl=ADDRESS_CACHE_NEGATIVE_TTL,
+)
 
 
-def get_all_sales(
-    db: Session, filters: schemas.ListSalesQueryParamsSchema
-) -> List[models.Sale]:
+def iter_sales_batches(
+    db: Session,
+    filters: schemas.ListSalesQueryParamsSchema,
+    batch_size: int,
+) -> Iterator[List[models.Sale]]:
     """
-    Retrieve all sales from the database.
+    Iterate the sales in batches, newest first.
 
     Args:
         db (Session): The database session.
+        filters (ListSalesQueryParamsSchema): The filters to apply.
+        batch_size (int): The number of sales of each batch.
 
     Returns:
-        List[Sale]: A list of Sale objects.
+        Iterator[List[Sale]]: The batches of Sale objects.
     """
-    return crud.get_all_sales(db, filters)
+    return crud.iter_sales_batches(db, filters, batch_size)
+
+
+def encode_sales_cursor(sale: models.Sale) -> str:
+    """
+    Encode the position of a sale as an opaque pagination cursor.
+    """
+    position = f"{sale.created_at.isoformat()}|{sale.id}"
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_sales_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    Decode a pagination cursor, raises ValueError if it is not valid.
+    """
+    try:
+        created_at, sale_id = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        )
+        return datetime.fromisoformat(created_at), UUID(sale_id)
+    except Exception:
+        raise ValueError("Invalid cursor.")
+
+
+def get_sales_page(
+    db: Session, filters: schemas.ListSalesPageQueryParamsSchema
+) -> Tuple[List[models.Sale], Optional[str]]:
+    """
+    Retrieve a page of sales and the cursor of the next page.
+
+    Args:
+        db (Session): The database session.
+        filters (ListSalesPageQueryParamsSchema): The filters, limit and
+          cursor of the page.
+
+    Returns:
+        Tuple[List[Sale], Optional[str]]: The sales of the page and the
+          cursor of the next page, None if it is the last page.
+    """
+    after = decode_sales_cursor(filters.cursor) if filters.cursor else None
+    # One extra sale tells if there is a next page
+    sales = crud.get_sales_page(db, filters, filters.limit + 1, after)
+    if len(sales) <= filters.limit:
+        return sales, None
+    sales = sales[: filters.limit]
+    return sales, encode_sales_cursor(sales[-1])
 
 
 def get_sale_by_id(db: Session, sale_id: UUID) -> models.Sale:
@@ -33,3 +107,222 @@ def get_sale_by_id(db: Session, sale_id: UUID) -> models.Sale:
         Sale: The Sale object if found, otherwise None.
     """
     return crud.get_sale_by_id(db, sale_id)
+
+
+def get_addresses(
+    db: Session, address_ids: Iterable[UUID]
+) -> Dict[UUID, schemas.AddressSchema]:
+    """
+    Get the delivery addresses by id, only the addresses that are not
+    cached are read, all of them with a single query.
+
+    Args:
+        db (Session): The database session.
+        address_ids (Iterable[UUID]): The ids of the addresses.
+
+    Returns:
+        Dict[UUID, AddressSchema]: The addresses found by id.
+    """
+    cached, missing = address_cache.get_many(set(address_ids))
+    if missing:
+        found = {
+            address.id: schemas.AddressSchema.model_validate(address)
+            for address in crud.get_addresses(db, missing)
+        }
+        address_cache.set_many({id: found.get(id) for id in missing})
+        cached.update(found)
+    return {id: address for id, address in cached.items() if address}
+
+
+def product_snapshot(product: ProductSchema) -> Dict:
+    """
+    Sale item fields keeping the product as it is when the sale is made.
+    """
+    return {
+        "product_id": product.id,
+        "product_code": product.product_code,
+        "product_name": product.name,
+        "product_image": product.images[0] if product.images else None,
+    }
+
+
+def _order_error(
+    order: schemas.CreateSaleSchema,
+    seller_ids: Set[UUID],
+    address_ids: Set[UUID],
+    products: Dict[UUID, ProductSchema],
+) -> Optional[str]:
+    if order.seller_id not in seller_ids:
+        return "Seller not found."
+    if order.address_id is not None and order.address_id not in address_ids:
+        return "Address not found."
+    for item in order.items:
+        if item.product_id not in products:
+            return f"Product {item.product_id} not found."
+    return None
+
+
+def _repeated_orders(
+    db: Session,
+    orders: Dict[int, schemas.CreateSaleSchema],
+    results: List[Optional[schemas.CreateSaleResultSchema]],
+) -> Dict[int, int]:
+    """
+    Remove from ``orders`` the orders whose idempotency key was already
+    used. Orders created before get the existing sale as result, and the
+    index of the first order of the batch with the same key is returned
+    for the repeated ones.
+    """
+    created = {
+        sale.idempotency_key: sale
+        for sale in crud.get_sales_by_idempotency_keys(
+            db,
+            list(
+                {
+                    order.idempotency_key
+                    for order in orders.values()
+                    if order.idempotency_key
+                }
+            ),
+        )
+    }
+    first_with_key, repeated = {}, {}
+    for index, order in list(orders.items()):
+        key = order.idempotency_key
+        if key is None:
+            continue
+        if key in created:
+            results[index] = schemas.CreateSaleResultSchema(
+                sale_id=created[key].id,
+                order_number=created[key].order_number,
+            )
+            del orders[index]
+        elif key in first_with_key:
+            repeated[index] = first_with_key[key]
+            del orders[index]
+        else:
+            first_with_key[key] = index
+    return repeated
+
+
+def create_sales(
+    db: Session, payloads: List[Dict]
+) -> List[schemas.CreateSaleResultSchema]:
+    """
+    Create a batch of sales in one transaction. The sellers, addresses and
+    products of the whole batch are looked up once, and the sales, their
+    items and their new addresses are written with multi-row inserts.
+    Prices must be current, so the lookups fail while a service is down
+    instead of using the last known values. An order whose idempotency
+    key was already used is not created again.
+
+    Args:
+        db (Session): The database session.
+        payloads (List[Dict]): The orders to create.
+
+    Returns:
+        List[CreateSaleResultSchema]: The result of each order, in the
+          order they were given.
+    """
+    results: List[Optional[schemas.CreateSaleResultSchema]] = [None] * len(
+        payloads
+    )
+    orders: Dict[int, schemas.CreateSaleSchema] = {}
+    for index, payload in enumerate(payloads):
+        try:
+            orders[index] = schemas.CreateSaleSchema.model_validate(payload)
+        except ValidationError as e:
+            results[index] = schemas.CreateSaleResultSchema(
+                error=e.errors(include_context=False)
+            )
+    repeated = _repeated_orders(db, orders, results) if orders else {}
+    if not orders:
+        return results
+
+    seller_ids = {
+        seller.id
+        for seller in UsersClient().get_sellers(
+            list({order.seller_id for order in orders.values()}),
+            allow_stale=False,
+        )
+    }
+    address_ids = set(
+        get_addresses(
+            db,
+            {
+                order.address_id
+                for order in orders.values()
+                if order.address_id is not None
+            },
+        )
+    )
+    products = {
+        product.id: product
+        for product in SuppliersClient().get_products(
+            list(
+                {
+                    item.product_id
+                    for order in orders.values()
+                    for item in order.items
+                }
+            ),
+            allow_stale=False,
+        )
+    }
+
+    accepted = {}
+    for index, order in orders.items():
+        error = _order_error(order, seller_ids, address_ids, products)
+        if error:
+            results[index] = schemas.CreateSaleResultSchema(error=error)
+        else:
+            accepted[index] = order
+
+    sales, items, addresses = [], [], []
+    numbers = order_numbers.allocate(db, len(accepted))
+    for (index, order), order_number in zip(accepted.items(), numbers):
+        sale_id = uuid.uuid4()
+        address_id = order.address_id
+        if order.address is not None:
+            address_id = uuid.uuid4()
+            addresses.append({"id": address_id, **order.address.model_dump()})
+        total_value = Decimal(0)
+        for item in order.items:
+            product = products[item.product_id]
+            total_value += product.price * item.quantity
+            items.append(
+                {
+                    "id": uuid.uuid4(),
+                    "sale_id": sale_id,
+                    **product_snapshot(product),
+                    "quantity": item.quantity,
+                    "unit_price": product.price,
+                    "total_value": product.price * item.quantity,
+                }
+            )
+        sales.append(
+            {
+                "id": sale_id,
+                "seller_id": order.seller_id,
+                "order_number": order_number,
+                "idempotency_key": order.idempotency_key,
+                "address_id": address_id,
+                "total_value": total_value,
+                "currency": order.currency,
+            }
+        )
+        results[index] = schemas.CreateSaleResultSchema(
+            sale_id=sale_id, order_number=order_number
+        )
+    try:
+        crud.insert_sales(db, sales, items, addresses)
+        db.commit()
+    except IntegrityError:
+        # The numbers of blocks reserved before the sequence restarted can
+        # be in use, new blocks are reserved when the batch is retried
+        db.rollback()
+        order_numbers.reset()
+        raise
+    for index, first in repeated.items():
+        results[index] = results[first]
+    return results
@@ -0,0 +1,146 @@
+import asyncio
+import uuid
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+import aio_pika
+from aio_pika.abc import (
+    AbstractChannel,
+    AbstractIncomingMessage,
+    AbstractQueue,
+    AbstractRobustConnection,
+)
+
+from config import BROKER_HOST, RPC_CONTENT_TYPE
+from seedwork.circuit_breaker import CircuitBreaker
+from seedwork.deadline import deadline_headers, remaining_timeout
+from seedwork.serialization import (
+    JSON_CONTENT_TYPE,
+    accept_headers,
+    decode,
+    encode,
+)
+
+
+class AsyncRPCTransport:
+    """
+    Asyncio RPC transport shared by every async RPC client running on the
+    same event loop.
+
+    It keeps one robust connection and reply queue open and resolves the
+    awaiting calls by correlation id, so concurrent calls do not block
+    each other nor a worker thread.
+    """
+
+    _instances = weakref.WeakKeyDictionary()
+
+    def __init__(self, host: str = BROKER_HOST):
+        self.host = host
+        self.connection: Optional[AbstractRobustConnection] = None
+        self.channel: Optional[AbstractChannel] = None
+        self.callback_queue: Optional[AbstractQueue] = None
+        self._lock = asyncio.Lock()
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def instance(cls) -> "AsyncRPCTransport":
+        """
+        Return the transport bound to the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        transport = cls._instances.get(loop)
+        if transport is None:
+            transport = cls._instances[loop] = cls()
+        return transport
+
+    async def _ensure_connected(self):
+        async with self._lock:
+            if self.connection and not self.connection.is_closed:
+                return
+            self.connection = await aio_pika.connect_robust(host=self.host)
+            self.channel = await self.connection.channel()
+            self.callback_queue = await self.channel.declare_queue(
+                exclusive=True
+            )
+            await self.callback_queue.consume(self.on_response, no_ack=True)
+
+    async def on_response(self, message: AbstractIncomingMessage):
+        future = self._pending.pop(message.correlation_id, None)
+        if future and not future.done():
+            future.set_result(
+                (message.body, message.content_type, message.content_encoding)
+            )
+
+    async def call(
+        self,
+        routing_key: str,
+        body: bytes,
+        timeout: float,
+        content_type: str = JSON_CONTENT_TYPE,
+        headers: Optional[Dict] = None,
+    ) -> Tuple[bytes, Optional[str], Optional[str]]:
+        """
+        Publish a request and await the response with the same
+        correlation id. The broker discards the request if it is not
+        consumed before the timeout.
+        """
+        await self._ensure_connected()
+        corr_id = str(uuid.uuid4())
+        future = asyncio.get_running_loop().create_future()
+        self._pending[corr_id] = future
+        try:
+            await self.channel.default_exchange.publish(
+                aio_pika.Message(
+                    body=body,
+                    correlation_id=corr_id,
+                    reply_to=self.callback_queue.name,
+                    content_type=content_type,
+                    headers=headers,
+                    expiration=timeout,
+                ),
+                routing_key=routing_key,
+            )
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("Timeout on RPC call")
+        finally:
+            self._pending.pop(corr_id, None)
+
+
+class AsyncBaseRPCClient:
+
+    def __init__(
+        self, timeout: int = 30, content_type: str = RPC_CONTENT_TYPE
+    ):
+        self.timeout = timeout
+        self.content_type = content_type
+
+    async def call_broker(
+        self, routing_key: str, payload: Dict | List
+    ) -> Dict:
+        # Calls made while processing a message share its deadline
+        timeout = remaining_timeout(self.timeout)
+        if timeout <= 0:
+            raise TimeoutError("Deadline exceeded before the RPC call")
+        breaker = CircuitBreaker.for_route(routing_key)
+        breaker.before_call()
+        body, _ = encode(payload)
+        try:
+            (
+                response,
+                content_type,
+                content_encoding,
+            ) = await AsyncRPCTransport.instance().call(
+                routing_key,
+                body,
+                timeout=timeout,
+                headers={
+                    **accept_headers(self.content_type),
+                    **deadline_headers(timeout),
+                },
+            )
+        except (TimeoutError, ConnectionError):
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return decode(response, content_type, content_encoding)
@@ -1,30 +1,105 @@
-import json
-import time
+import threading
 import uuid
-from typing import Dict, List
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
+from typing import Dict, List, Optional, Tuple
 
 import pika
+from pika.exceptions import AMQPError
 
-from config import BROKER_HOST
+from config import BROKER_HOST, RPC_CONTENT_TYPE
+from seedwork.circuit_breaker import CircuitBreaker
+from seedwork.deadline import deadline_headers, remaining_timeout
+from seedwork.serialization import (
+    JSON_CONTENT_TYPE,
+    accept_headers,
+    decode,
+    encode,
+)
 
 
-class BaseRPCClient:
+class RPCTransport:
+    """
+    Process-wide RPC transport shared by every RPC client.
 
-    def __init__(self, timeout: int = 30):
-        self.connection = pika.BlockingConnection(
-            pika.ConnectionParameters(host=BROKER_HOST)
-        )
-        self.channel = self.connection.channel()
-        result = self.channel.queue_declare(queue="", exclusive=True)
-        self.callback_queue = result.method.queue
-        self.channel.basic_consume(
-            queue=self.callback_queue,
-            on_message_callback=self.on_response,
-            auto_ack=True,
-        )
-        self.response = None
-        self.corr_id = None
-        self.timeout = timeout
+    A single connection and exclusive reply queue are kept open by a
+    background I/O thread. Calls from any thread are published through
+    that thread and their responses are routed back by correlation id,
+    so many calls can be in flight at the same time. If the connection
+    drops, pending calls fail and the next call reconnects.
+
+    Calls resolve to the response body with its content type and
+    encoding, decoding it is up to the client.
+    """
+
+    _instance: Optional["RPCTransport"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, host: str = BROKER_HOST):
+        self.host = host
+        self.connection: Optional[pika.BlockingConnection] = None
+        self.channel = None
+        self.callback_queue: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+
+    @classmethod
+    def instance(cls) -> "RPCTransport":
+        """
+        Return the transport shared by the whole process.
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def _connect(self, ready: Future):
+        try:
+            self.connection = pika.BlockingConnection(
+                pika.ConnectionParameters(host=self.host)
+            )
+            self.channel = self.connection.channel()
+            result = self.channel.queue_declare(queue="", exclusive=True)
+            self.callback_queue = result.method.queue
+            self.channel.basic_consume(
+                queue=self.callback_queue,
+                on_message_callback=self.on_response,
+                auto_ack=True,
+            )
+        except Exception as e:
+            ready.set_exception(e)
+            return
+        ready.set_result(True)
+        self._run()
+
+    def _run(self):
+        try:
+            while self.connection.is_open:
+                self.connection.process_data_events(time_limit=1)
+        except AMQPError as e:
+            print(f"RPC transport connection lost: {e}")
+        finally:
+            self._fail_pending(ConnectionError("RPC connection lost"))
+
+    def _ensure_connected(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            ready = Future()
+            self._thread = threading.Thread(
+                target=self._connect, args=(ready,), daemon=True
+            )
+            self._thread.start()
+            ready.result()
+
+    def _fail_pending(self, error: Exception):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
 
     def on_response(
         self,
@@ -33,25 +108,110 @@ class BaseRPCClient:
         props: pika.BasicProperties,
         body: bytes,
     ):
-        if self.corr_id == props.correlation_id:
-            self.response = body
+        with self._lock:
+            future = self._pending.pop(props.correlation_id, None)
+        if future and not future.done():
+            future.set_result(
+                (body, props.content_type, props.content_encoding)
+            )
+
+    def _publish(
+        self,
+        routing_key: str,
+        corr_id: str,
+        body: bytes,
+        content_type: str,
+        headers: Optional[Dict],
+        expiration: str,
+    ):
+        try:
+            self.channel.basic_publish(
+                exchange="",
+                routing_key=routing_key,
+                properties=pika.BasicProperties(
+                    reply_to=self.callback_queue,
+                    correlation_id=corr_id,
+                    content_type=content_type,
+                    headers=headers,
+                    expiration=expiration,
+                ),
+                body=body,
+            )
+        except Exception as e:
+            with self._lock:
+                future = self._pending.pop(corr_id, None)
+            if future and not future.done():
+                future.set_exception(e)
+
+    def call(
+        self,
+        routing_key: str,
+        body: bytes,
+        timeout: float,
+        content_type: str = JSON_CONTENT_TYPE,
+        headers: Optional[Dict] = None,
+    ) -> Tuple[bytes, Optional[str], Optional[str]]:
+        """
+        Publish a request and wait for the response with the same
+        correlation id. The broker discards the request if it is not
+        consumed before the timeout.
+        """
+        self._ensure_connected()
+        corr_id = str(uuid.uuid4())
+        future = Future()
+        with self._lock:
+            self._pending[corr_id] = future
+        try:
+            self.connection.add_callback_threadsafe(
+                partial(
+                    self._publish,
+                    routing_key,
+                    corr_id,
+                    body,
+                    content_type,
+                    headers,
+                    str(max(1, int(timeout * 1000))),
+                )
+            )
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise TimeoutError("Timeout on RPC call")
+        finally:
+            with self._lock:
+                self._pending.pop(corr_id, None)
+
+
+class BaseRPCClient:
+
+    def __init__(
+        self, timeout: int = 30, content_type: str = RPC_CONTENT_TYPE
+    ):
+        self.transport = RPCTransport.instance()
+        self.timeout = timeout
+        self.content_type = content_type
 
     def call_broker(self, routing_key: str, payload: Dict | List) -> Dict:
-        self.corr_id = str(uuid.uuid4())
-        self.channel.basic_publish(
-            exchange="",
-            routing_key=routing_key,
-            properties=pika.BasicProperties(
-                reply_to=self.callback_queue,
-                correlation_id=self.corr_id,
-            ),
-            body=json.dumps(payload),
-        )
-        start_at = time.time()
-        while self.response is None:
-            if time.time() - start_at > self.timeout:
-                self.connection.close()
-                raise TimeoutError("Timeout on RPC call")
-            self.connection.process_data_events(time_limit=self.timeout)
-        self.connection.close()
-        return json.loads(self.response)
+        # Calls made while processing a message share its deadline
+        timeout = remaining_timeout(self.timeout)
+        if timeout <= 0:
+            raise TimeoutError("Deadline exceeded before the RPC call")
+        breaker = CircuitBreaker.for_route(routing_key)
+        breaker.before_call()
+        # Requests stay JSON so any consumer can read them, the response
+        # uses the requested content type if the consumer supports it
+        body, _ = encode(payload)
+        try:
+            response, content_type, content_encoding = self.transport.call(
+                routing_key,
+                body,
+                timeout=timeout,
+                headers={
+                    **accept_headers(self.content_type),
+                    **deadline_headers(timeout),
+                },
+            )
+        except (TimeoutError, ConnectionError):
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return decode(response, content_type, content_encoding)
@@ -1,5 +1,7 @@
 import threading
 
+from sales.consumers import CreateSaleConsumer
+
 
 def run_thread(threaded_class: type[threading.Thread], num_errors=0):
     try:
@@ -15,4 +17,4 @@ def start_threads(threaded_classes: list):
         run_thread(threaded_class)
 
 
-start_threads([])
+start_threads([CreateSaleConsumer])
@@ -0,0 +1,187 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.orm import Session
+
+from catalog import crud, services
+from catalog.consumers import CatalogEventsConsumer
+from catalog.models import ProductView, SellerView
+from tests.conftest import generate_fake_products, generate_fake_sellers
+
+
+@pytest.mark.skip_mock_suppliers
+@pytest.mark.skip_mock_users
+def test_replicated_products_and_sellers_are_read_locally(
+    db_session: Session,
+):
+    """
+    Test that the products and sellers in the views are not requested to
+      their services.
+    """
+    products = generate_fake_products([uuid4(), uuid4()])
+    sellers = generate_fake_sellers([uuid4()])
+    crud.upsert_products(db_session, products)
+    crud.upsert_sellers(db_session, sellers)
+    db_session.commit()
+
+    with (
+        mock.patch(
+            "rpc_clients.suppliers_client.AsyncSuppliersClient.get_products",
+            autospec=True,
+        ) as mock_get_products,
+        mock.patch(
+            "rpc_clients.users_client.AsyncUsersClient.get_sellers",
+            autospec=True,
+        ) as mock_get_sellers,
+    ):
+        found_products = asyncio.run(
+            services.get_products(
+                db_session, [product.id for product in products]
+            )
+        )
+        found_sellers = asyncio.run(
+            services.get_sellers(db_session, [sellers[0].id])
+        )
+
+    assert found_products == {product.id: product for product in products}
+    assert found_sellers == {sellers[0].id: sellers[0]}
+    mock_get_products.assert_not_called()
+    mock_get_sellers.assert_not_called()
+
+
+@pytest.mark.skip_mock_suppliers
+def test_missing_products_are_requested_and_stored(db_session: Session):
+    """
+    Test that only the products missing from the view are requested, and
+      that they are stored for the next reads.
+    """
+    stored, missing = generate_fake_products([uuid4(), uuid4()])
+    crud.upsert_products(db_session, [stored])
+    db_session.commit()
+
+    with mock.patch(
+        "rpc_clients.suppliers_client.AsyncSuppliersClient.get_products",
+        return_value=[missing],
+        autospec=True,
+    ) as mock_get_products:
+        products = asyncio.run(
+            services.get_products(db_session, [stored.id, missing.id])
+        )
+
+    assert products == {stored.id: stored, missing.id: missing}
+    mock_get_products.assert_called_once_with(mock.ANY, [missing.id])
+    assert db_session.get(ProductView, missing.id).name == missing.name
+
+
+@pytest.mark.skip_mock_users
+def test_refresh_sellers_updates_and_removes_sellers(db_session: Session):
+    """
+    Test that a seller change replaces the replicated seller, and removes
+      it when it no longer exists.
+    """
+    seller, removed = generate_fake_sellers([uuid4(), uuid4()])
+    crud.upsert_sellers(db_session, [seller, removed])
+    db_session.commit()
+    changed = seller.model_copy(update={"full_name": "New Name"})
+
+    with mock.patch(
+        "rpc_clients.users_client.UsersClient.get_sellers",
+        return_value=[changed],
+        autospec=True,
+    ):
+        services.refresh_sellers(db_session, [seller.id, removed.id])
+
+    db_session.expire_all()
+    assert db_session.get(SellerView, seller.id).full_name == "New Name"
+    assert db_session.get(SellerView, removed.id) is None
+
+
+def test_older_products_do_not_replace_newer_ones(db_session: Session):
+    """
+    Test that a product read before its last change does not overwrite
+      the replicated product, and that a newer one does.
+    """
+    (product,) = generate_fake_products([uuid4()])
+    updated_at = datetime(2024, 1, 1, 12)
+    stored = product.model_copy(update={"updated_at": updated_at})
+    crud.upsert_products(db_session, [stored])
+    db_session.commit()
+
+    older = stored.model_copy(
+        update={"name": "Old Name", "updated_at": updated_at - timedelta(1)}
+    )
+    crud.upsert_products(db_session, [older])
+    db_session.commit()
+    db_session.expire_all()
+    assert db_session.get(ProductView, product.id).name == stored.name
+
+    newer = stored.model_copy(
+        update={"name": "New Name", "updated_at": updated_at + timedelta(1)}
+    )
+    crud.upsert_products(db_session, [newer])
+    db_session.commit()
+    db_session.expire_all()
+    assert db_session.get(ProductView, product.id).name == "New Name"
+
+
+def test_sync_catalog_copies_every_page(db_session: Session):
+    """
+    Test that the bootstrap sync stores the whole catalogs page by page.
+    """
+    services.sync_catalog(db_session, page_size=2)
+
+    assert db_session.query(ProductView).count() == 5
+    assert db_session.query(SellerView).count() == 5
+
+
+def test_catalog_events_refresh_the_changed_entries():
+    """
+    Test that the change events refresh the products and sellers they
+      name.
+    """
+    product_id, seller_id = uuid4(), uuid4()
+    consumer = CatalogEventsConsumer()
+
+    with (
+        mock.patch("catalog.consumers.SessionLocal") as mock_session,
+        mock.patch(
+            "catalog.services.refresh_products"
+        ) as mock_refresh_products,
+        mock.patch(
+            "catalog.services.refresh_sellers"
+        ) as mock_refresh_sellers,
+    ):
+        consumer.process_payload(
+            {"event": "product.changed", "product_ids": [str(product_id)]}
+        )
+        consumer.process_payload(
+            {"event": "seller.changed", "seller_ids": [str(seller_id)]}
+        )
+
+    db = mock_session.return_value
+    mock_refresh_products.assert_called_once_with(db, [product_id])
+    mock_refresh_sellers.assert_called_once_with(db, [seller_id])
+    assert db.close.call_count == 2
+
+
+def test_catalog_is_synced_again_on_reconnect():
+    """
+    Test that every connection to the broker syncs the catalogs, the
+      changes published while disconnected were missed.
+    """
+    consumer = CatalogEventsConsumer()
+
+    with (
+        mock.patch("catalog.consumers.SessionLocal") as mock_session,
+        mock.patch("catalog.services.sync_catalog") as mock_sync_catalog,
+    ):
+        for _ in range(2):
+            consumer.on_connected()
+            consumer._sync.join(timeout=5)
+
+    db = mock_session.return_value
+    assert mock_sync_catalog.call_args_list == [mock.call(db)] * 2
+    assert db.close.call_count == 2
@@ -16,6 +16,10 @@ from database import Base
 from db_dependency import get_db
 from main import app as init_app
 from rpc_clients.schemas import ProductSchema, SellerSchema
+from rpc_clients.suppliers_client import product_cache
+from rpc_clients.users_client import seller_cache
+from sales.services import address_cache
+from seedwork.circuit_breaker import CircuitBreaker
 
 SQLALCHEMY_DATABASE_URL = "sqlite://"
 
@@ -150,15 +154,30 @@ def mock_users_rpc_client(request):
         yield  # Skip the fixture
         return
 
-    def get_sellers(_self, seller_ids):
+    def get_sellers(_self, seller_ids, allow_stale=True):
         if seller_ids is None:
             seller_ids = [uuid.uuid4() for _ in range(5)]
         return generate_fake_sellers(seller_ids)
 
-    with mock.patch(
-        "rpc_clients.users_client.UsersClient.get_sellers",
-        side_effect=get_sellers,
-        autospec=True,
+    def get_all_sellers(_self, page_size=None):
+        return iter(get_sellers(_self, None))
+
+    with (
+        mock.patch(
+            "rpc_clients.users_client.UsersClient.get_all_sellers",
+            side_effect=get_all_sellers,
+            autospec=True,
+        ),
+        mock.patch(
+            "rpc_clients.users_client.UsersClient.get_sellers",
+            side_effect=get_sellers,
+            autospec=True,
+        ),
+        mock.patch(
+            "rpc_clients.users_client.AsyncUsersClient.get_sellers",
+            side_effect=get_sellers,
+            autospec=True,
+        ),
     ):
         yield
 
@@ -172,15 +191,30 @@ def mock_suppliers_rpc_client(request):
         yield  # Skip the fixture
         return
 
-    def get_products(_self, product_ids):
+    def get_products(_self, product_ids, allow_stale=True):
         if product_ids is None:
             product_ids = [uuid.uuid4() for _ in range(5)]
         return generate_fake_products(product_ids)
 
-    with mock.patch(
-        "rpc_clients.suppliers_client.SuppliersClient.get_products",
-        side_effect=get_products,
-        autospec=True,
+    def get_all_products(_self, page_size=None):
+        return iter(get_products(_self, None))
+
+    with (
+        mock.patch(
+            "rpc_clients.suppliers_client.SuppliersClient.get_all_products",
+            side_effect=get_all_products,
+            autospec=True,
+        ),
+        mock.patch(
+            "rpc_clients.suppliers_client.SuppliersClient.get_products",
+            side_effect=get_products,
+            autospec=True,
+        ),
+        mock.patch(
+            "rpc_clients.suppliers_client.AsyncSuppliersClient.get_products",
+            side_effect=get_products,
+            autospec=True,
+        ),
     ):
         yield
 
@@ -203,3 +237,20 @@ def mock_rabbitmq_client(request):
         # Mock the connection.channel() to return the mock channel
         mock_connection.channel.return_value = mock_channel
         yield mock_channel
+
+
+@pytest.fixture(autouse=True)
+def clear_rpc_caches():
+    """
+    Start every test case with empty product, seller and address caches and
+    closed circuits.
+    """
+    product_cache.clear()
+    seller_cache.clear()
+    address_cache.clear()
+    CircuitBreaker.reset_all()
+    yield
+    product_cache.clear()
+    seller_cache.clear()
+    address_cache.clear()
+    CircuitBreaker.reset_all()
@@ -1,6 +1,8 @@
+import asyncio
 import uuid
 
 import faker
+from sqlalchemy.orm import Session
 
 from plans import mappers
 from plans.models import SalesPlan, SellerInPlan
@@ -9,7 +11,7 @@ from plans.schemas import SalesPlanDetailSchema
 fake = faker.Faker()
 
 
-def test_plan_to_schema():
+def test_plan_to_schema(db_session: Session):
     """
     Test the plan_to_schema function.
     """
@@ -36,7 +38,7 @@ def test_plan_to_schema():
     )
 
     # Call the function to test
-    result = mappers.plan_to_schema(sales_plan)
+    result = asyncio.run(mappers.plan_to_schema(db_session, sales_plan))
 
     # Assert the result is of type SalesPlanDetailSchema
     assert isinstance(result, SalesPlanDetailSchema)
@@ -0,0 +1,105 @@
+import json
+from unittest import mock
+from uuid import uuid4
+
+import pika
+from sqlalchemy.orm import Session
+
+from sales.consumers import CreateSaleConsumer
+from sales.models import Address, Sale
+from seedwork.base_batch_consumer import RETRIES_HEADER
+
+
+def add_address(db_session: Session) -> Address:
+    address = Address(
+        id=uuid4(),
+        street="Carrera 7 # 40-62",
+        city="Bogotá",
+        state="Cundinamarca",
+        postal_code="110231",
+        country="Colombia",
+    )
+    db_session.add(address)
+    db_session.commit()
+    return address
+
+
+def test_create_sale_consumer_creates_the_batch(db_session: Session):
+    """
+    Test that a batch of orders is created in one transaction and each
+      message gets the result of its order.
+    """
+    address = add_address(db_session)
+    order = {
+        "seller_id": str(uuid4()),
+        "address_id": str(address.id),
+        "items": [{"product_id": str(uuid4()), "quantity": 1}],
+    }
+
+    with (
+        mock.patch("sales.consumers.SessionLocal", return_value=db_session),
+        mock.patch.object(db_session, "commit") as mock_commit,
+    ):
+        results = CreateSaleConsumer().process_batch(
+            [order, {"seller_id": "not-an-id"}, order]
+        )
+
+    created, invalid, second = results
+    assert set(created) == {"sale_id", "order_number"}
+    assert "error" in invalid
+    assert second["order_number"] == created["order_number"] + 1
+    mock_commit.assert_called_once()
+    assert db_session.query(Sale).count() == 2
+
+
+def test_repeated_orders_create_a_single_sale(db_session: Session):
+    """
+    Test that an order delivered again with the same idempotency key gets
+      the sale already created.
+    """
+    address = add_address(db_session)
+    order = {
+        "seller_id": str(uuid4()),
+        "idempotency_key": "order-1",
+        "address_id": str(address.id),
+        "items": [{"product_id": str(uuid4()), "quantity": 1}],
+    }
+
+    with mock.patch("sales.consumers.SessionLocal", return_value=db_session):
+        first, repeated = CreateSaleConsumer().process_batch([order, order])
+        (redelivered,) = CreateSaleConsumer().process_batch([order])
+
+    assert first == repeated == redelivered
+    assert db_session.query(Sale).count() == 1
+
+
+def test_unavailable_services_retry_the_batch():
+    """
+    Test that the orders of a batch failing because a service is down are
+      published again instead of being answered with the error.
+    """
+    consumer = CreateSaleConsumer()
+    consumer.connection = mock.MagicMock()
+    channel = mock.MagicMock()
+    body = json.dumps({"seller_id": str(uuid4())})
+    batch = [
+        (
+            channel,
+            mock.MagicMock(delivery_tag=1, routing_key="sales.create_sale"),
+            pika.BasicProperties(reply_to="reply-queue"),
+            body,
+        )
+    ]
+
+    with mock.patch("sales.consumers.create_sales", side_effect=TimeoutError):
+        consumer.reply_batch(batch, consumer.handle_batch(batch))
+
+    channel.basic_publish.assert_not_called()
+    delay, retry = consumer.connection.call_later.call_args.args
+    assert delay == consumer.retry_delay
+    retry()
+    publish = channel.basic_publish.call_args.kwargs
+    assert publish["routing_key"] == "sales.create_sale"
+    assert publish["properties"].headers == {RETRIES_HEADER: 1}
+    assert publish["body"] == body
+    channel.basic_ack.assert_called_once_with(delivery_tag=1)
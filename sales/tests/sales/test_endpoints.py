@@ -1,15 +1,19 @@
+import asyncio
 import csv
 from typing import Callable, List
 from unittest import mock
-from uuid import uuid4
+from uuid import UUID, uuid4
 
 import pytest
 from faker import Faker
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
-from sales.models import Sale, SaleItem
-from tests.conftest import generate_fake_sellers
+from catalog import crud as catalog_crud
+from rpc_clients.suppliers_client import product_cache
+from sales import crud
+from sales.models import Address, Sale, SaleItem
+from tests.conftest import generate_fake_products, generate_fake_sellers
 
 fake = Faker()
 
@@ -86,6 +90,41 @@ def test_list_sales_with_data(client: TestClient, seed_sales):
         assert len(data[i]["items"]) == 2  # Verify items are included
 
 
+def test_list_sales_with_addresses(
+    client: TestClient, db_session: Session, seed_sales
+):
+    """
+    Test that the stored addresses of the sales are returned, and that
+    they are read once and then served from the cache.
+    """
+    with_address, without_address = seed_sales(2, items_per_sale=1)
+    address = Address(
+        id=with_address.address_id,
+        street=fake.street_address(),
+        city=fake.city(),
+        state=fake.state(),
+        postal_code=fake.postcode(),
+        country=fake.country(),
+    )
+    db_session.add(address)
+    db_session.commit()
+
+    with mock.patch(
+        "sales.crud.get_addresses", wraps=crud.get_addresses
+    ) as mock_get_addresses:
+        first = client.get("/api/v1/sales/sales/")
+        second = client.get("/api/v1/sales/sales/")
+
+    addresses = {sale["id"]: sale["address"] for sale in first.json()}
+    assert addresses == {
+        sale["id"]: sale["address"] for sale in second.json()
+    }
+    assert addresses[str(with_address.id)]["street"] == address.street
+    assert addresses[str(with_address.id)]["city"] == address.city
+    assert addresses[str(without_address.id)] is None
+    mock_get_addresses.assert_called_once()
+
+
 def test_list_sales_empty_database(client: TestClient):
     """
     Test the list sales endpoint when the database is empty.
@@ -97,6 +136,54 @@ def test_list_sales_empty_database(client: TestClient):
     assert len(data) == 0
 
 
+@pytest.mark.skip_mock_users
+def test_list_sales_paginated_with_cursor(client: TestClient, seed_sales):
+    """
+    Test walking through the sales pages with the next cursor, only the
+    sellers of the current page are requested.
+    """
+    sales = seed_sales(5, items_per_sale=1)
+    sales.sort(key=lambda sale: (sale.created_at, sale.id), reverse=True)
+
+    with mock.patch(
+        "rpc_clients.users_client.AsyncUsersClient.get_sellers",
+        side_effect=lambda _self, seller_ids: generate_fake_sellers(
+            seller_ids
+        ),
+        autospec=True,
+    ) as mock_get_sellers:
+        first_page = client.get("/api/v1/sales/sales/?limit=2")
+        second_page = client.get(
+            "/api/v1/sales/sales/?limit=2&cursor="
+            + first_page.headers["X-Next-Cursor"]
+        )
+        last_page = client.get(
+            "/api/v1/sales/sales/?limit=2&cursor="
+            + second_page.headers["X-Next-Cursor"]
+        )
+
+    assert [sale["id"] for sale in first_page.json()] == [
+        str(sale.id) for sale in sales[:2]
+    ]
+    assert [sale["id"] for sale in second_page.json()] == [
+        str(sale.id) for sale in sales[2:4]
+    ]
+    assert [sale["id"] for sale in last_page.json()] == [str(sales[4].id)]
+    assert "X-Next-Cursor" not in last_page.headers
+    assert [
+        len(call.args[1]) for call in mock_get_sellers.call_args_list
+    ] == [2, 2, 1]
+
+
+def test_list_sales_with_invalid_cursor(client: TestClient):
+    """
+    Test the list sales endpoint with a cursor that cannot be decoded.
+    """
+    response = client.get("/api/v1/sales/sales/?cursor=invalid")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor."
+
+
 def test_filter_sales_by_order_number(client: TestClient, seed_sales):
     """
     Test filtering sales by order number.
@@ -169,19 +256,28 @@ def test_filter_sales_by_date_range(client: TestClient, seed_sales):
         assert response_sale["id"] == str(sale.id)
 
 
+@pytest.mark.skip_mock_users
 @pytest.mark.skip_mock_users
 def test_filter_sales_by_seller_name(client: TestClient, seed_sales):
     """
-    Test filtering sales by seller name.
+    Test filtering sales by seller name, the matching sellers are resolved
+    before querying the sales.
     """
     sells = seed_sales(3, items_per_sale=2)  # Seed 3 sales
 
     sellers = generate_fake_sellers([sale.seller_id for sale in sells])
 
-    with mock.patch(
-        "rpc_clients.users_client.UsersClient.get_sellers",
-        return_value=sellers,
-        autospec=True,
+    with (
+        mock.patch(
+            "rpc_clients.users_client.AsyncUsersClient.search_sellers",
+            return_value=[sellers[0]],
+            autospec=True,
+        ) as mock_search_sellers,
+        mock.patch(
+            "rpc_clients.users_client.AsyncUsersClient.get_sellers",
+            return_value=[sellers[0]],
+            autospec=True,
+        ),
     ):
         response = client.get(
             f"/api/v1/sales/sales/?seller_name={sellers[0].full_name}"
@@ -190,7 +286,38 @@ def test_filter_sales_by_seller_name(client: TestClient, seed_sales):
 
     data = response.json()
     assert len(data) == 1
+    assert data[0]["id"] == str(sells[0].id)
     assert data[0]["seller"]["full_name"] == sellers[0].full_name
+    mock_search_sellers.assert_called_once_with(
+        mock.ANY, sellers[0].full_name
+    )
+
+
+@pytest.mark.skip_mock_users
+def test_filter_sales_by_seller_name_without_matches(
+    client: TestClient, seed_sales
+):
+    """
+    Test that no sale is loaded when no seller matches the name.
+    """
+    seed_sales(2, items_per_sale=1)
+
+    with (
+        mock.patch(
+            "rpc_clients.users_client.AsyncUsersClient.search_sellers",
+            return_value=[],
+            autospec=True,
+        ),
+        mock.patch(
+            "rpc_clients.users_client.AsyncUsersClient.get_sellers",
+            autospec=True,
+        ) as mock_get_sellers,
+    ):
+        response = client.get("/api/v1/sales/sales/?seller_name=nobody")
+
+    assert response.status_code == 200
+    assert response.json() == []
+    mock_get_sellers.assert_not_called()
 
 
 def test_get_sale_exists(client: TestClient, seed_sales):
@@ -326,3 +453,217 @@ def test_export_sales_as_csv_with_filters(client: TestClient, seed_sales):
     # Ensure no extra rows in the CSV
     with pytest.raises(StopIteration):
         next(csv_reader)
+
+
+@pytest.mark.skip_mock_users
+def test_export_sales_as_csv_in_batches(client: TestClient, seed_sales):
+    """
+    Test that the export is written batch by batch with one sellers
+    lookup per batch.
+    """
+    sales = seed_sales(5, items_per_sale=1)
+
+    with (
+        mock.patch("sales.api.SALES_EXPORT_BATCH_SIZE", 2),
+        mock.patch(
+            "rpc_clients.users_client.AsyncUsersClient.get_sellers",
+            side_effect=lambda _self, seller_ids: generate_fake_sellers(
+                seller_ids
+            ),
+            autospec=True,
+        ) as mock_get_sellers,
+    ):
+        response = client.get("/api/v1/sales/sales/export/")
+
+    assert response.status_code == 200
+    rows = list(csv.reader(response.content.decode("utf-8").splitlines()))
+    assert len(rows) == len(sales) + 1
+    assert [
+        len(call.args[1]) for call in mock_get_sellers.call_args_list
+    ] == [2, 2, 1]
+
+
+def test_export_sales_as_csv_reads_off_the_event_loop(
+    client: TestClient, seed_sales
+):
+    """
+    Test that the seller view is read in the thread pool for the file name
+    and for every batch, not on the event loop.
+    """
+    sales = seed_sales(3, items_per_sale=1)
+    queried_on_loop = []
+
+    def get_sellers(db, seller_ids):
+        try:
+            asyncio.get_running_loop()
+            queried_on_loop.append(seller_ids)
+        except RuntimeError:
+            pass
+        return []
+
+    with (
+        mock.patch("sales.api.SALES_EXPORT_BATCH_SIZE", 2),
+        mock.patch.object(
+            catalog_crud, "get_sellers", side_effect=get_sellers
+        ) as mock_get_sellers,
+    ):
+        response = client.get(
+            f"/api/v1/sales/sales/export/?seller_id={sales[0].seller_id}"
+        )
+
+    assert response.status_code == 200
+    assert mock_get_sellers.call_count == 2
+    assert queried_on_loop == []
+
+
+@pytest.fixture
+def address(db_session: Session) -> Address:
+    """
+    Fixture to store a delivery address.
+    """
+    address = Address(
+        id=uuid4(),
+        street=fake.street_address(),
+        city=fake.city(),
+        state=fake.state(),
+        postal_code=fake.postcode(),
+        country=fake.country(),
+    )
+    db_session.add(address)
+    db_session.commit()
+    return address
+
+
+@pytest.mark.skip_mock_suppliers
+def test_create_sales_batch(
+    client: TestClient, db_session: Session, address: Address
+):
+    """
+    Test that the valid orders of a batch are created with their product
+    snapshot, and that every rejected order gets its own error.
+    """
+    product, unknown_product_id = (
+        generate_fake_products([uuid4()])[0],
+        uuid4(),
+    )
+    order = {
+        "seller_id": str(uuid4()),
+        "address_id": str(address.id),
+        "items": [{"product_id": str(product.id), "quantity": 3}],
+    }
+
+    with mock.patch(
+        "rpc_clients.suppliers_client.SuppliersClient.get_products",
+        return_value=[product],
+        autospec=True,
+    ) as mock_get_products:
+        response = client.post(
+            "/api/v1/sales/sales/batch",
+            json=[
+                order,
+                {**order, "items": [{"product_id": str(product.id)}]},
+                {**order, "address_id": str(uuid4())},
+                {
+                    **order,
+                    "items": [
+                        {"product_id": str(unknown_product_id), "quantity": 1}
+                    ],
+                },
+                order,
+            ],
+        )
+
+    assert response.status_code == 200
+    created, invalid, no_address, no_product, second = response.json()
+    assert invalid["sale_id"] is None
+    assert invalid["error"][0]["loc"] == ["items", 0, "quantity"]
+    assert no_address["error"] == "Address not found."
+    assert no_product["error"] == f"Product {unknown_product_id} not found."
+    assert second["order_number"] == created["order_number"] + 1
+    mock_get_products.assert_called_once()
+
+    sale = db_session.get(Sale, UUID(created["sale_id"]))
+    assert sale.total_value == product.price * 3
+    assert sale.items[0].product_code == product.product_code
+    assert sale.items[0].product_name == product.name
+    assert sale.items[0].unit_price == product.price
+    assert db_session.query(Sale).count() == 2
+
+
+def test_create_sales_batch_with_a_new_address(
+    client: TestClient, db_session: Session
+):
+    """
+    Test that an order can bring its delivery address, which is created
+      with the sale.
+    """
+    new_address = {
+        "street": fake.street_address(),
+        "city": fake.city(),
+        "state": fake.state(),
+        "postal_code": fake.postcode(),
+        "country": fake.country(),
+    }
+    order = {
+        "seller_id": str(uuid4()),
+        "items": [{"product_id": str(uuid4()), "quantity": 1}],
+    }
+
+    response = client.post(
+        "/api/v1/sales/sales/batch",
+        json=[
+            {**order, "address": new_address},
+            order,
+            {**order, "address": new_address, "address_id": str(uuid4())},
+        ],
+    )
+
+    assert response.status_code == 200
+    created, no_address, both = response.json()
+    sale = db_session.get(Sale, UUID(created["sale_id"]))
+    address = db_session.get(Address, sale.address_id)
+    assert address.street == new_address["street"]
+    assert address.country == new_address["country"]
+    assert no_address["sale_id"] is None and both["sale_id"] is None
+    assert db_session.query(Address).count() == 1
+
+
+@pytest.mark.skip_mock_suppliers
+def test_create_sales_batch_does_not_use_stale_products(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch, address: Address
+):
+    """
+    Test that the batch is rejected while suppliers is down instead of
+      pricing the orders with the last known products.
+    """
+    product = generate_fake_products([uuid4()])[0]
+    monkeypatch.setattr(product_cache, "timer", lambda: 0)
+    product_cache.set_many({product.id: product})
+    monkeypatch.setattr(product_cache, "timer", lambda: 10**6)
+
+    with mock.patch(
+        "rpc_clients.suppliers_client.SuppliersClient.call_broker",
+        side_effect=TimeoutError(),
+    ):
+        response = client.post(
+            "/api/v1/sales/sales/batch",
+            json=[
+                {
+                    "seller_id": str(uuid4()),
+                    "address_id": str(address.id),
+                    "items": [{"product_id": str(product.id), "quantity": 1}],
+                }
+            ],
+        )
+
+    assert response.status_code == 503
+
+
+def test_create_sales_batch_too_large(client: TestClient):
+    """
+    Test that batches over the maximum size are rejected.
+    """
+    with mock.patch("sales.api.SALES_BATCH_MAX_SIZE", 1):
+        response = client.post("/api/v1/sales/sales/batch", json=[{}, {}])
+
+    assert response.status_code == 413
@@ -1,6 +1,11 @@
+import asyncio
 import uuid
+from decimal import Decimal
+from unittest import mock
 
 import faker
+import pytest
+from sqlalchemy.orm import Session
 
 from sales import mappers
 from sales.models import Sale, SaleItem
@@ -9,7 +14,7 @@ from sales.schemas import SaleDetailSchema
 fake = faker.Faker()
 
 
-def test_sale_to_schema():
+def test_sale_to_schema(db_session: Session):
     """
     Test the sale_to_schema function.
     """
@@ -46,7 +51,7 @@ def test_sale_to_schema():
     )
 
     # Call the function to test
-    result = mappers.sale_to_schema(sale)
+    result = asyncio.run(mappers.sale_to_schema(db_session, sale))
 
     # Assert the result is of type SaleDetailSchema
     assert isinstance(result, SaleDetailSchema)
@@ -61,3 +66,50 @@ def test_sale_to_schema():
         assert item.quantity == sale.items[i].quantity
         assert item.unit_price == sale.items[i].unit_price
         assert item.total_value == sale.items[i].total_value
+
+
+@pytest.mark.skip_mock_suppliers
+def test_sale_to_schema_reads_the_product_snapshot(db_session: Session):
+    """
+    Test that the products of the sale items are taken from their snapshot
+      without looking them up.
+    """
+    sale_id = uuid.uuid4()
+    item = SaleItem(
+        id=uuid.uuid4(),
+        sale_id=sale_id,
+        product_id=uuid.uuid4(),
+        product_code="P001",
+        product_name="Product",
+        product_image="https://example.com/product.png",
+        quantity=2,
+        unit_price=Decimal("10.50"),
+        total_value=Decimal("21.00"),
+        created_at=fake.date_time(),
+        updated_at=fake.date_time(),
+    )
+    sale = Sale(
+        id=sale_id,
+        seller_id=uuid.uuid4(),
+        order_number=fake.random_int(min=1000, max=9999),
+        address_id=uuid.uuid4(),
+        total_value=Decimal("21.00"),
+        currency="USD",
+        created_at=fake.date_time(),
+        updated_at=fake.date_time(),
+        items=[item],
+    )
+
+    with mock.patch(
+        "rpc_clients.suppliers_client.AsyncSuppliersClient.get_products",
+        autospec=True,
+    ) as mock_get_products:
+        result = asyncio.run(mappers.sale_to_schema(db_session, sale))
+
+    mock_get_products.assert_not_called()
+    product = result.items[0].product
+    assert product.id == item.product_id
+    assert product.product_code == "P001"
+    assert product.name == "Product"
+    assert product.price == Decimal("10.50")
+    assert product.images == ["https://example.com/product.png"]
@@ -0,0 +1,99 @@
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from sales import services
+from sales.order_numbers import OrderNumberAllocator, order_numbers
+from tests.sales.test_consumers import add_address
+
+
+def test_numbers_are_taken_from_reserved_blocks(db_session: Session):
+    """
+    Test that the blocks a batch needs are reserved at once and the rest
+      of a block is used by the next batches.
+    """
+    allocator = OrderNumberAllocator(block_size=10)
+
+    with mock.patch.object(
+        allocator, "_reserve", wraps=allocator._reserve
+    ) as mock_reserve:
+        first = allocator.allocate(db_session, 25)
+        second = allocator.allocate(db_session, 5)
+        third = allocator.allocate(db_session, 1)
+
+    assert first == list(range(1, 26))
+    assert second == list(range(26, 31))
+    assert third == [31]
+    assert [call.args[1] for call in mock_reserve.call_args_list] == [3, 1]
+
+
+def test_blocks_come_from_the_sequence():
+    """
+    Test that each value of the sequence is the start of a block.
+    """
+    db = mock.MagicMock()
+    db.get_bind.return_value.dialect.supports_sequences = True
+    db.scalars.return_value = [101, 301]
+    allocator = OrderNumberAllocator(block_size=100)
+
+    numbers = allocator.allocate(db, 150)
+
+    assert numbers == list(range(101, 201)) + list(range(301, 351))
+    db.scalars.assert_called_once()
+
+
+def test_blocks_are_not_shared_with_forked_processes(db_session: Session):
+    """
+    Test that a forked process reserves its own blocks.
+    """
+    allocator = OrderNumberAllocator(block_size=10)
+    assert allocator.allocate(db_session, 1) == [1]
+
+    with mock.patch("sales.order_numbers.os.getpid", return_value=-1):
+        assert allocator.allocate(db_session, 1) == [11]
+
+
+def test_reset_drops_the_reserved_blocks(db_session: Session):
+    """
+    Test that the numbers after a reset come from new blocks.
+    """
+    allocator = OrderNumberAllocator(block_size=10)
+    assert allocator.allocate(db_session, 1) == [1]
+
+    allocator.reset()
+
+    # Nothing was stored, the new block starts again from the first number
+    assert allocator.allocate(db_session, 1) == [1]
+
+
+def test_used_order_numbers_fail_and_reset_the_blocks(db_session: Session):
+    """
+    Test that a sale given a number already in use fails instead of
+      sharing it, and that the blocks holding it are dropped.
+    """
+    # The failed batch only rolls back its savepoint of the test transaction
+    db = Session(
+        bind=db_session.connection(), join_transaction_mode="create_savepoint"
+    )
+    address = add_address(db)
+    order = {
+        "seller_id": str(uuid4()),
+        "address_id": str(address.id),
+        "items": [{"product_id": str(uuid4()), "quantity": 1}],
+    }
+    (created,) = services.create_sales(db, [order])
+
+    with (
+        mock.patch.object(
+            order_numbers, "allocate", return_value=[created.order_number]
+        ),
+        mock.patch.object(order_numbers, "reset") as mock_reset,
+        pytest.raises(IntegrityError),
+    ):
+        services.create_sales(db, [order])
+
+    mock_reset.assert_called_once()
+    db.close()
@@ -1,12 +1,42 @@
-from unittest.mock import MagicMock
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock
 from uuid import uuid4
 
+import pika
 import pytest
 from faker import Faker
 
+from config import CATALOG_PAGE_SIZE, RPC_BREAKER_FAILURE_THRESHOLD
+from rpc_clients.cache import TTLCache
+from rpc_clients.consumers import ChangeEventsConsumer
+from rpc_clients.degraded import track_degraded
+from rpc_clients.loader import AsyncBatchLoader, BatchLoader
 from rpc_clients.schemas import ProductSchema, SellerSchema
-from rpc_clients.suppliers_client import SuppliersClient
-from rpc_clients.users_client import UsersClient
+from rpc_clients.suppliers_client import (
+    PRODUCT_FIELDS,
+    AsyncSuppliersClient,
+    SuppliersClient,
+    product_cache,
+)
+from rpc_clients.users_client import (
+    SELLER_FIELDS,
+    AsyncUsersClient,
+    UsersClient,
+    seller_cache,
+)
+from seedwork.base_async_rpc_client import AsyncRPCTransport
+from seedwork.base_rpc_client import BaseRPCClient, RPCTransport
+from seedwork.circuit_breaker import CircuitOpenError
+from seedwork.deadline import deadline_scope, message_deadline
+from seedwork.serialization import (
+    MSGPACK_CONTENT_TYPE,
+    decode,
+    encode,
+    negotiate,
+)
 
 fake = Faker()
 
@@ -44,7 +74,12 @@ class TestSuppliersClient:
         #  correct routing key and payload
         mock_call_broker.assert_called_once_with(
             "suppliers.get_products",
-            {"product_ids": [str(product_id) for product_id in product_ids]},
+            {
+                "product_ids": [
+                    str(product_id) for product_id in product_ids
+                ],
+                "fields": PRODUCT_FIELDS,
+            },
         )
 
     def test_get_products_returns_correct_data(
@@ -128,20 +163,90 @@ class TestSuppliersClient:
         with pytest.raises(ValueError, match="Product not found."):
             suppliers_client.get_product(product_id)
 
-    def test_get_all_products_calls_broker_with_correct_routing_key(
+    def test_get_all_products_follows_the_pages(
         self, suppliers_client: SuppliersClient, mock_call_broker: MagicMock
     ):
         """
-        Test that get_all_products calls call_broker with the
-          correct routing key and payload.
+        Test that get_all_products requests the catalog page by page and
+          yields the products of every page.
         """
-        suppliers_client.get_all_products()
+        product_ids = [uuid4() for _ in range(3)]
+        pages = [product_ids[:2], product_ids[2:]]
+
+        def call_broker(_routing_key, payload):
+            page = pages[1] if payload.get("cursor") else pages[0]
+            return {
+                "products": [
+                    {
+                        "id": str(product_id),
+                        "product_code": fake.ean(),
+                        "name": fake.word(),
+                        "price": 10.0,
+                        "images": [],
+                    }
+                    for product_id in page
+                ],
+                "next_cursor": str(page[-1]) if page is pages[0] else None,
+            }
+
+        mock_call_broker.side_effect = call_broker
+
+        products = suppliers_client.get_all_products(page_size=2)
+        mock_call_broker.assert_not_called()
+
+        assert [product.id for product in products] == product_ids
+        assert mock_call_broker.call_args_list[0].args == (
+            "suppliers.list_products",
+            {"limit": 2, "fields": PRODUCT_FIELDS},
+        )
+        assert mock_call_broker.call_args_list[1].args == (
+            "suppliers.list_products",
+            {
+                "limit": 2,
+                "fields": PRODUCT_FIELDS,
+                "cursor": str(pages[0][-1]),
+            },
+        )
 
-        # Assert call_broker was called with the
-        #  correct routing key and payload
-        mock_call_broker.assert_called_once_with(
+    def test_get_products_only_requests_products_not_cached(
+        self, suppliers_client: SuppliersClient, mock_call_broker: MagicMock
+    ):
+        """
+        Test that cached and unknown products are not requested again.
+        """
+        cached_id, unknown_id, new_id = uuid4(), uuid4(), uuid4()
+
+        def call_broker(_routing_key, payload):
+            return {
+                "products": [
+                    {
+                        "id": product_id,
+                        "product_code": str(
+                            fake.random_int(min=1000, max=9999)
+                        ),
+                        "name": fake.word(),
+                        "price": fake.random_number(digits=5),
+                        "images": [],
+                    }
+                    for product_id in payload["product_ids"]
+                    if product_id != str(unknown_id)
+                ]
+            }
+
+        mock_call_broker.side_effect = call_broker
+        suppliers_client.get_products([cached_id, unknown_id])
+
+        result = suppliers_client.get_products(
+            [new_id, cached_id, unknown_id]
+        )
+
+        # Assert the products are returned in the requested order and only
+        #  the new product went over the wire
+        assert [product.id for product in result] == [new_id, cached_id]
+        assert mock_call_broker.call_count == 2
+        mock_call_broker.assert_called_with(
             "suppliers.get_products",
-            {"product_ids": None},
+            {"product_ids": [str(new_id)], "fields": PRODUCT_FIELDS},
         )
 
 
@@ -177,7 +282,10 @@ class TestUsersClient:
         #  correct routing key and payload
         mock_call_broker.assert_called_once_with(
             "users.get_sellers",
-            {"seller_ids": [str(seller_id) for seller_id in seller_ids]},
+            {
+                "seller_ids": [str(seller_id) for seller_id in seller_ids],
+                "fields": SELLER_FIELDS,
+            },
         )
 
     def test_get_sellers_returns_correct_data(
@@ -257,11 +365,495 @@ class TestUsersClient:
         Test that get_all_sellers calls call_broker with the
           correct routing key and payload.
         """
-        users_client.get_all_sellers()
+        mock_call_broker.return_value = {"sellers": [], "next_cursor": None}
+
+        assert list(users_client.get_all_sellers()) == []
 
         # Assert call_broker was called with the
         #  correct routing key and payload
         mock_call_broker.assert_called_once_with(
+            "users.list_sellers",
+            {"limit": CATALOG_PAGE_SIZE, "fields": SELLER_FIELDS},
+        )
+
+
+class TestRPCTransport:
+    @pytest.fixture
+    def transport(self) -> RPCTransport:
+        """
+        Fixture to create a transport with a fake open connection.
+        """
+        transport = RPCTransport()
+        transport.callback_queue = "reply-queue"
+        transport.connection = MagicMock()
+        transport.connection.add_callback_threadsafe.side_effect = (
+            lambda callback: callback()
+        )
+        transport.channel = MagicMock()
+        transport._ensure_connected = MagicMock()
+        return transport
+
+    def test_clients_share_the_process_transport(self):
+        """
+        Test that every client uses the same transport instance.
+        """
+        assert SuppliersClient().transport is UsersClient().transport
+        assert BaseRPCClient().transport is RPCTransport.instance()
+
+    def test_responses_are_routed_by_correlation_id(
+        self, transport: RPCTransport
+    ):
+        """
+        Test that concurrent calls receive their own responses even when
+          the replies arrive out of order.
+        """
+        published = []
+        transport.channel.basic_publish.side_effect = (
+            lambda **kwargs: published.append(kwargs)
+        )
+        results = {}
+
+        def call(body):
+            results[body] = transport.call("queue", body, timeout=5)
+
+        threads = [
+            threading.Thread(target=call, args=(body,))
+            for body in ("first", "second")
+        ]
+        for thread in threads:
+            thread.start()
+        while len(published) < 2:
+            time.sleep(0.01)
+
+        for message in reversed(published):
+            assert message["properties"].reply_to == "reply-queue"
+            transport.on_response(
+                None, None, message["properties"], message["body"] * 2
+            )
+        for thread in threads:
+            thread.join()
+
+        assert {body: result[0] for body, result in results.items()} == {
+            "first": "firstfirst",
+            "second": "secondsecond",
+        }
+        assert transport._pending == {}
+
+    def test_call_raises_timeout_error(self, transport: RPCTransport):
+        """
+        Test that a call without response raises a TimeoutError.
+        """
+        with pytest.raises(TimeoutError, match="Timeout on RPC call"):
+            transport.call("queue", "body", timeout=0.01)
+        assert transport._pending == {}
+
+    def test_pending_calls_fail_when_connection_is_lost(
+        self, transport: RPCTransport
+    ):
+        """
+        Test that in-flight calls fail fast when the connection drops.
+        """
+        transport.channel.basic_publish.side_effect = (
+            lambda **kwargs: transport._fail_pending(ConnectionError())
+        )
+        with pytest.raises(ConnectionError):
+            transport.call("queue", "body", timeout=5)
+
+    def test_call_broker_negotiates_compact_responses(
+        self, transport: RPCTransport
+    ):
+        """
+        Test that requests are JSON asking for msgpack and compressed
+          msgpack responses are decoded.
+        """
+        payload = {"products": [{"name": fake.text()} for _ in range(200)]}
+        body, content_encoding = encode(
+            payload, MSGPACK_CONTENT_TYPE, compress=True
+        )
+        assert content_encoding == "zstd"
+        transport.channel.basic_publish.side_effect = (
+            lambda **kwargs: transport.on_response(
+                None,
+                None,
+                pika.BasicProperties(
+                    correlation_id=kwargs["properties"].correlation_id,
+                    content_type=MSGPACK_CONTENT_TYPE,
+                    content_encoding=content_encoding,
+                ),
+                body,
+            )
+        )
+        client = BaseRPCClient()
+        client.transport = transport
+
+        assert client.call_broker("queue", {"product_ids": None}) == payload
+        request = transport.channel.basic_publish.call_args.kwargs
+        assert json.loads(request["body"]) == {"product_ids": None}
+        assert request["properties"].content_type == "application/json"
+        assert negotiate(request["properties"].headers) == (
+            MSGPACK_CONTENT_TYPE,
+            True,
+        )
+
+    def test_call_broker_propagates_the_deadline(
+        self, transport: RPCTransport
+    ):
+        """
+        Test that calls send their deadline, nested calls only wait for the
+          remaining time and calls past the deadline are not sent.
+        """
+        transport.channel.basic_publish.side_effect = (
+            lambda **kwargs: transport.on_response(
+                None,
+                None,
+                pika.BasicProperties(
+                    correlation_id=kwargs["properties"].correlation_id
+                ),
+                b"{}",
+            )
+        )
+        client = BaseRPCClient(timeout=30)
+        client.transport = transport
+
+        with deadline_scope(time.time() + 5):
+            client.call_broker("queue", {})
+        properties = transport.channel.basic_publish.call_args.kwargs[
+            "properties"
+        ]
+        assert 0 < int(properties.expiration) <= 5000
+        assert message_deadline(properties.headers) == pytest.approx(
+            time.time() + 5, abs=1
+        )
+
+        with deadline_scope(time.time() - 1):
+            with pytest.raises(TimeoutError, match="Deadline exceeded"):
+                client.call_broker("queue", {})
+        assert transport.channel.basic_publish.call_count == 1
+
+    def test_call_broker_fails_fast_while_the_circuit_is_open(
+        self, transport: RPCTransport
+    ):
+        """
+        Test that the calls to a route stop being sent after consecutive
+          timeouts.
+        """
+        client = BaseRPCClient(timeout=0.01)
+        client.transport = transport
+
+        for _ in range(RPC_BREAKER_FAILURE_THRESHOLD):
+            with pytest.raises(TimeoutError):
+                client.call_broker("queue", {})
+        with pytest.raises(CircuitOpenError):
+            client.call_broker("queue", {})
+        assert (
+            transport.channel.basic_publish.call_count
+            == RPC_BREAKER_FAILURE_THRESHOLD
+        )
+
+    def test_small_and_legacy_responses_are_not_compressed(self):
+        """
+        Test that only large responses to callers accepting zstd are
+          compressed.
+        """
+        payload = {"products": [{"name": fake.text()} for _ in range(200)]}
+        assert encode({"products": []}, compress=True)[1] is None
+        assert encode(payload)[1] is None
+        assert negotiate(None) == ("application/json", False)
+        body, content_encoding = encode(payload, compress=True)
+        assert decode(body, "application/json", content_encoding) == payload
+
+
+@pytest.mark.skip_mock_suppliers
+@pytest.mark.skip_mock_users
+class TestAsyncClients:
+    def test_get_products_and_sellers_run_concurrently(self):
+        """
+        Test that the async clients can be awaited together and build
+          the same payloads as the blocking clients.
+        """
+        product_id, seller_id = uuid4(), uuid4()
+        suppliers_client = AsyncSuppliersClient()
+        suppliers_client.call_broker = AsyncMock(
+            return_value={
+                "products": [
+                    {
+                        "id": str(product_id),
+                        "product_code": "P001",
+                        "name": fake.word(),
+                        "price": 10,
+                        "images": [],
+                    }
+                ]
+            }
+        )
+        users_client = AsyncUsersClient()
+        users_client.call_broker = AsyncMock(return_value={"sellers": []})
+
+        async def fan_out():
+            return await asyncio.gather(
+                suppliers_client.get_products([product_id]),
+                users_client.get_sellers([seller_id]),
+            )
+
+        products, sellers = asyncio.run(fan_out())
+
+        assert products[0].id == product_id
+        assert sellers == []
+        suppliers_client.call_broker.assert_awaited_once_with(
+            "suppliers.get_products",
+            {"product_ids": [str(product_id)], "fields": PRODUCT_FIELDS},
+        )
+        users_client.call_broker.assert_awaited_once_with(
             "users.get_sellers",
-            {"seller_ids": None},
+            {"seller_ids": [str(seller_id)], "fields": SELLER_FIELDS},
+        )
+
+    def test_get_sellers_serves_stale_sellers_when_users_is_down(
+        self, monkeypatch: pytest.MonkeyPatch
+    ):
+        """
+        Test that the last known sellers are returned and flagged as
+          degraded when the users service does not answer.
+        """
+        seller = SellerSchema(
+            id=uuid4(),
+            full_name=fake.name(),
+            email=fake.email(),
+            username=fake.user_name(),
+            phone=fake.phone_number(),
+            id_type="ID",
+            identification="123456",
+            created_at=fake.date_time(),
+            updated_at=fake.date_time(),
+        )
+        monkeypatch.setattr(seller_cache, "timer", lambda: 0)
+        seller_cache.set_many({seller.id: seller})
+        monkeypatch.setattr(seller_cache, "timer", lambda: 10**6)
+        client = AsyncUsersClient(timeout=0.01)
+        client.call_broker = AsyncMock(side_effect=TimeoutError())
+
+        async def get_sellers():
+            with track_degraded() as sources:
+                return await client.get_sellers([seller.id]), sources
+
+        sellers, sources = asyncio.run(get_sellers())
+
+        assert sellers == [seller]
+        assert sources == {"users"}
+        client.call_broker.assert_awaited_once()
+
+    def test_transport_routes_responses_by_correlation_id(self):
+        """
+        Test that the async transport resolves the awaiting call that
+          matches the correlation id of the response.
+        """
+
+        async def route():
+            transport = AsyncRPCTransport()
+            loop = asyncio.get_running_loop()
+            first, second = loop.create_future(), loop.create_future()
+            transport._pending = {"first": first, "second": second}
+            await transport.on_response(
+                MagicMock(
+                    correlation_id="second",
+                    body=b"2",
+                    content_type=MSGPACK_CONTENT_TYPE,
+                    content_encoding=None,
+                )
+            )
+            return first, second, transport
+
+        first, second, transport = asyncio.run(route())
+        assert not first.done()
+        assert second.result() == (b"2", MSGPACK_CONTENT_TYPE, None)
+        assert list(transport._pending) == ["first"]
+
+
+class TestTTLCache:
+    @pytest.fixture
+    def clock(self) -> MagicMock:
+        """
+        Fixture to control the time seen by the cache.
+        """
+        return MagicMock(return_value=0)
+
+    def test_entries_expire_after_their_ttl(self, clock: MagicMock):
+        """
+        Test that found and negative entries expire with their own TTL.
+        """
+        cache = TTLCache(maxsize=10, ttl=60, negative_ttl=5, timer=clock)
+        cache.set_many({"found": 1, "unknown": None})
+
+        clock.return_value = 10
+        assert cache.get_many(["found", "unknown"]) == (
+            {"found": 1},
+            ["unknown"],
+        )
+
+        clock.return_value = 60
+        assert cache.get_many(["found"]) == ({}, ["found"])
+
+    def test_least_recently_used_entries_are_evicted(self, clock: MagicMock):
+        """
+        Test that the cache does not grow beyond its max size.
+        """
+        cache = TTLCache(maxsize=2, ttl=60, negative_ttl=5, timer=clock)
+        cache.set_many({"first": 1, "second": 2})
+        cache.get_many(["first"])
+        cache.set_many({"third": 3})
+
+        assert len(cache) == 2
+        assert cache.get_many(["first", "second", "third"]) == (
+            {"first": 1, "third": 3},
+            ["second"],
+        )
+
+
+class TestChangeEventsConsumer:
+    def test_changed_products_and_sellers_are_evicted(self):
+        """
+        Test that change events evict only the changed entries.
+        """
+        product_id, other_product_id, seller_id = uuid4(), uuid4(), uuid4()
+        product_cache.set_many({product_id: None, other_product_id: None})
+        seller_cache.set_many({seller_id: None})
+        consumer = ChangeEventsConsumer()
+
+        consumer.process_payload(
+            {"event": "product.changed", "product_ids": [str(product_id)]}
+        )
+        consumer.process_payload(
+            {"event": "seller.changed", "seller_ids": [str(seller_id)]}
+        )
+
+        assert product_cache.get_many([product_id, other_product_id]) == (
+            {other_product_id: None},
+            [product_id],
+        )
+        assert seller_cache.get_many([seller_id]) == ({}, [seller_id])
+
+    def test_events_are_acked_without_reply(self):
+        """
+        Test that events published to the exchange are not answered.
+        """
+        channel = MagicMock()
+        consumer = ChangeEventsConsumer()
+
+        consumer.callback(
+            channel,
+            MagicMock(delivery_tag=1),
+            pika.BasicProperties(),
+            b'{"event": "product.changed", "product_ids": []}',
         )
+
+        channel.basic_publish.assert_not_called()
+        channel.basic_ack.assert_called_once_with(delivery_tag=1)
+
+    def test_caches_are_cleared_on_reconnect(self):
+        """
+        Test that reconnecting clears the caches, the changes published
+        while disconnected were missed.
+        """
+        product_id, seller_id = uuid4(), uuid4()
+        product_cache.set_many({product_id: None})
+        seller_cache.set_many({seller_id: None})
+
+        ChangeEventsConsumer().on_connected()
+
+        assert product_cache.get_many([product_id]) == ({}, [product_id])
+        assert seller_cache.get_many([seller_id]) == ({}, [seller_id])
+
+
+class TestBatchLoader:
+    def test_concurrent_threads_share_the_fetch_in_flight(self):
+        """
+        Test that a key being fetched by a thread is not fetched again by
+          another thread asking for it at the same time.
+        """
+        loader = BatchLoader()
+        fetch_started, release_fetch = threading.Event(), threading.Event()
+        fetched = []
+
+        def fetch(keys):
+            fetched.append(keys)
+            fetch_started.set()
+            release_fetch.wait(timeout=5)
+            return {key: key.upper() for key in keys if key != "unknown"}
+
+        results = {}
+        first = threading.Thread(
+            target=lambda: results.update(
+                first=loader.load_many(["a", "b"], fetch)
+            )
+        )
+        first.start()
+        fetch_started.wait(timeout=5)
+        second = threading.Thread(
+            target=lambda: results.update(
+                second=loader.load_many(["b", "unknown"], fetch)
+            )
+        )
+        second.start()
+        release_fetch.set()
+        first.join()
+        second.join()
+
+        assert fetched == [["a", "b"], ["unknown"]]
+        assert results == {
+            "first": {"a": "A", "b": "B"},
+            "second": {"b": "B", "unknown": None},
+        }
+
+    def test_keys_of_the_same_tick_are_fetched_together(self):
+        """
+        Test that coroutines asking for keys at the same time are answered
+          with a single deduplicated fetch.
+        """
+        loader = AsyncBatchLoader()
+        fetch = AsyncMock(side_effect=lambda keys: {key: key for key in keys})
+
+        async def load():
+            return await asyncio.gather(
+                loader.load_many(["a", "b"], fetch),
+                loader.load_many(["b", "c"], fetch),
+            )
+
+        first, second = asyncio.run(load())
+
+        fetch.assert_awaited_once_with(["a", "b", "c"])
+        assert first == {"a": "a", "b": "b"}
+        assert second == {"b": "b", "c": "c"}
+
+    @pytest.mark.skip_mock_suppliers
+    def test_concurrent_requests_share_one_rpc_call(self):
+        """
+        Test that concurrent product lookups send a single RPC call.
+        """
+        product_ids = [uuid4(), uuid4()]
+        client = AsyncSuppliersClient()
+        client.call_broker = AsyncMock(
+            return_value={
+                "products": [
+                    {
+                        "id": str(product_id),
+                        "product_code": "P001",
+                        "name": fake.word(),
+                        "price": 10,
+                        "images": [],
+                    }
+                    for product_id in product_ids
+                ]
+            }
+        )
+
+        async def fan_out():
+            return await asyncio.gather(
+                client.get_products(product_ids),
+                client.get_products(product_ids[:1]),
+            )
+
+        all_products, first_product = asyncio.run(fan_out())
+
+        client.call_broker.assert_awaited_once()
+        assert [product.id for product in all_products] == product_ids
+        assert [product.id for product in first_product] == product_ids[:1]
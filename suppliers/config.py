@@ -12,6 +12,32 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "suppliers_db")
 USERS_PATH = os.getenv("USERS_PATH")
 BROKER_HOST = os.getenv("BROKER_HOST", "localhost")
+# Messages processed in parallel by each broker consumer and messages
+# delivered to it before they are acked
+CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", "4"))
+CONSUMER_PREFETCH_COUNT = int(os.getenv("CONSUMER_PREFETCH_COUNT", "8"))
+# Seconds the broker consumers wait before reconnecting, doubled after
+# every failed attempt up to the max
+CONSUMER_RECONNECT_DELAY = float(os.getenv("CONSUMER_RECONNECT_DELAY", "1"))
+CONSUMER_RECONNECT_MAX_DELAY = float(
+    os.getenv("CONSUMER_RECONNECT_MAX_DELAY", "30")
+)
+# RPC bodies larger than this many bytes are compressed with zstd when
+# the peer accepts it, 0 disables the compression
+RPC_COMPRESSION_THRESHOLD = int(
+    os.getenv("RPC_COMPRESSION_THRESHOLD", "16384")
+)
+# Lookups merged into one query by the batching consumers and how long
+# they wait for a batch to fill up
+CONSUMER_BATCH_SIZE = int(os.getenv("CONSUMER_BATCH_SIZE", "50"))
+CONSUMER_BATCH_WINDOW_MS = float(os.getenv("CONSUMER_BATCH_WINDOW_MS", "5"))
+# Times a batch consumer publishes again a message whose processing
+# failed on a transient error, and seconds before the first retry, doubled
+# on every retry
+CONSUMER_MAX_RETRIES = int(os.getenv("CONSUMER_MAX_RETRIES", "5"))
+CONSUMER_RETRY_DELAY = float(os.getenv("CONSUMER_RETRY_DELAY", "1"))
+# Fanout exchange where product and seller changes are published
+CHANGE_EVENTS_EXCHANGE = os.getenv("CHANGE_EVENTS_EXCHANGE", "ccp.changes")
 GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "ccp-files-storage")
 
 
@@ -1,54 +1,153 @@
-from typing import Dict
+from typing import Dict, List
 
 from pydantic import ValidationError
 
 from database import SessionLocal
+from seedwork.base_batch_consumer import BaseBatchConsumer
 from seedwork.base_consumer import BaseConsumer
 
-from .mappers import product_to_schema
-from .schemas import GetProductsResponseSchema, GetProductsSchema
-from .services import get_products
+from .mappers import product_to_projection, product_to_schema
+from .schemas import (
+    GetProductsResponseSchema,
+    GetProductsSchema,
+    ListProductsResponseSchema,
+    ListProductsSchema,
+)
+from .services import get_products, list_products
 
 
-class GetProductsConsumer(BaseConsumer):
+class GetProductsConsumer(BaseBatchConsumer):
     """
-    Consumer for getting sellers.
+    Consumer for getting products.
     """
 
     def __init__(self):
         super().__init__(queue="suppliers.get_products")
 
-    def process_payload(self, payload: Dict) -> str | Dict:
+    def process_batch(self, payloads: List[Dict]) -> List[Dict]:
         """
-        Consume the data and get all sellers.
+        Consume a batch of requests and get their products with a single
+        query.
 
         Args:
-            data (Dict): The incoming seller ids.
+            payloads (List[Dict]): The incoming product ids and fields of
+              each request.
         """
+        responses: List[Dict] = [None] * len(payloads)
+        requests = {}
+        for index, payload in enumerate(payloads):
+            try:
+                requests[index] = GetProductsSchema.model_validate(payload)
+            except ValidationError as e:
+                responses[index] = {"error": e.errors(include_context=False)}
+        if not requests:
+            return responses
+
         db = SessionLocal()
         try:
-            products_schema = GetProductsSchema.model_validate(payload)
-            products = get_products(
-                db, productsIds=products_schema.product_ids
+            fetch_all = any(
+                request.product_ids is None for request in requests.values()
             )
-            # Sort sellers by id position in payload
-            if products_schema.product_ids:
-                products.sort(
-                    key=lambda x: (
-                        products_schema.product_ids.index(x.id)
-                        if x.id in products_schema.product_ids
-                        else -1
+            product_ids = {
+                product_id
+                for request in requests.values()
+                if request.product_ids
+                for product_id in request.product_ids
+            }
+            # Load the fields requested by any of the requests
+            fields = (
+                None
+                if any(request.fields is None for request in requests.values())
+                else list(
+                    dict.fromkeys(
+                        field
+                        for request in requests.values()
+                        for field in request.fields
                     )
                 )
-            return GetProductsResponseSchema.model_validate(
-                {
-                    "products": [
-                        product_to_schema(product) for product in products
+            )
+            products = (
+                get_products(
+                    db,
+                    productsIds=None if fetch_all else list(product_ids),
+                    fields=fields,
+                )
+                if fetch_all or product_ids
+                else []
+            )
+            products_by_id = {product.id: product for product in products}
+            for index, request in requests.items():
+                # Return the products in the order of the requested ids
+                selected = (
+                    products
+                    if request.product_ids is None
+                    else [
+                        products_by_id[product_id]
+                        for product_id in dict.fromkeys(request.product_ids)
+                        if product_id in products_by_id
                     ]
-                }
-            ).model_dump_json()
+                )
+                responses[index] = GetProductsResponseSchema(
+                    products=[
+                        (
+                            product_to_schema(product)
+                            if request.fields is None
+                            else product_to_projection(product, request.fields)
+                        )
+                        for product in selected
+                    ]
+                ).model_dump(mode="json")
+        except Exception as e:
+            for index in requests:
+                responses[index] = {"error": str(e)}
+        finally:
+            db.close()
+        return responses
+
+
+class ListProductsConsumer(BaseConsumer):
+    """
+    Consumer for listing the products catalog page by page.
+    """
+
+    def __init__(self):
+        super().__init__(queue="suppliers.list_products")
+
+    def process_payload(self, payload: Dict) -> Dict:
+        """
+        Consume the data and get a page of products.
+
+        Args:
+            payload (Dict): The page size, the cursor of the page and the
+              fields of the products.
+        """
+        try:
+            request = ListProductsSchema.model_validate(payload)
         except ValidationError as e:
-            return {"error": e.errors()}
+            return {"error": e.errors(include_context=False)}
+        db = SessionLocal()
+        try:
+            # One more product tells if there is a next page
+            products = list_products(
+                db,
+                limit=request.limit + 1,
+                after=request.cursor,
+                fields=request.fields,
+            )
+            page = products[: request.limit]
+            return ListProductsResponseSchema(
+                products=[
+                    (
+                        product_to_schema(product)
+                        if request.fields is None
+                        else product_to_projection(product, request.fields)
+                    )
+                    for product in page
+                ],
+                next_cursor=(
+                    page[-1].id if len(products) > request.limit else None
+                ),
+            ).model_dump(mode="json")
         except Exception as e:
             return {"error": str(e)}
         finally:
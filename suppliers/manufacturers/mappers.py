@@ -1,5 +1,27 @@
+from typing import List, Set, Tuple
+
 from . import models, schemas
 
+# Model columns read for each field of a product and its manufacturer
+PRODUCT_COLUMNS = {
+    "id": models.ManufacturerProduct.id,
+    "product_code": models.ManufacturerProduct.code,
+    "name": models.ManufacturerProduct.name,
+    "price": models.ManufacturerProduct.price,
+    "updated_at": models.ManufacturerProduct.updated_at,
+}
+MANUFACTURER_COLUMNS = {
+    "id": models.Manufacturer.id,
+    "manufacturer_name": models.Manufacturer.name,
+    "identification_type": models.Manufacturer.identification_type,
+    "identification_number": models.Manufacturer.identification_number,
+    "address": models.Manufacturer.address,
+    "contact_phone": models.Manufacturer.contact_phone,
+    "email": models.Manufacturer.email,
+    "created_at": models.Manufacturer.created_at,
+    "updated_at": models.Manufacturer.updated_at,
+}
+
 
 def manufacturer_to_schema(
     manufacturer: models.Manufacturer,
@@ -27,9 +49,55 @@ def product_to_schema(
         price=product.price,
         images=[image.url for image in product.images],
         manufacturer=manufacturer_to_schema(product.manufacturer),
+        updated_at=product.updated_at,
     )
 
 
+def split_product_fields(fields: List[str]) -> Tuple[Set[str], Set[str]]:
+    """
+    Split the requested fields in product and manufacturer fields, the
+    product id is always included.
+    """
+    product_fields, manufacturer_fields = {"id"}, set()
+    for field in fields:
+        name, _, manufacturer_field = field.partition(".")
+        if name != "manufacturer":
+            product_fields.add(name)
+        elif manufacturer_field:
+            manufacturer_fields.add(manufacturer_field)
+        else:
+            manufacturer_fields.update(MANUFACTURER_COLUMNS)
+    return product_fields, manufacturer_fields
+
+
+def product_to_projection(
+    product: models.ManufacturerProduct, fields: List[str]
+) -> schemas.ResponseProductDetailSchema:
+    """
+    Build a product schema with only the requested fields, the rest of
+    them are left unset and are not serialized.
+    """
+    product_fields, manufacturer_fields = split_product_fields(fields)
+    values = {
+        field: getattr(product, column.key)
+        for field, column in PRODUCT_COLUMNS.items()
+        if field in product_fields
+    }
+    if "images" in product_fields:
+        values["images"] = [image.url for image in product.images]
+    if manufacturer_fields:
+        values["manufacturer"] = (
+            schemas.ManufacturerDetailSchema.model_construct(
+                **{
+                    field: getattr(product.manufacturer, column.key)
+                    for field, column in MANUFACTURER_COLUMNS.items()
+                    if field in manufacturer_fields
+                }
+            )
+        )
+    return schemas.ResponseProductDetailSchema.model_construct(**values)
+
+
 def operation_to_schema(
     operation: models.ProductImage,
 ) -> schemas.ImageUploadResponse:
@@ -110,6 +110,8 @@ class ResponseProductDetailSchema(ProductCreateSchema):
     id: uuid.UUID
     images: List[str]
     manufacturer: ManufacturerDetailSchema
+    # Version of the product for the services replicating it
+    updated_at: Optional[datetime.datetime]
     model_config = ConfigDict(from_attributes=True)
 
 
@@ -121,16 +123,47 @@ class ResetResponse(BaseModel):
     msg: str = "Todos los datos fueron eliminados"
 
 
-class GetProductsSchema(BaseModel):
+class ProductFieldsSchema(BaseModel):
+    # Fields returned for every product, all of them if not given. Single
+    # manufacturer fields are selected as "manufacturer.<field>"
+    fields: Optional[List[str]] = None
+
+    @field_validator("fields")
+    @classmethod
+    def validate_fields(cls, value):
+        if value is None:
+            return value
+        allowed = set(ResponseProductDetailSchema.model_fields) | {
+            f"manufacturer.{field}"
+            for field in ManufacturerDetailSchema.model_fields
+        }
+        for field in value:
+            if field not in allowed:
+                raise ValueError(f"Unknown product field '{field}'")
+        return value
+
+
+class GetProductsSchema(ProductFieldsSchema):
     product_ids: Optional[List[uuid.UUID]]
 
 
+class ListProductsSchema(ProductFieldsSchema):
+    limit: int = Field(100, ge=1, le=1000)
+    # Id of the last product of the previous page
+    cursor: Optional[uuid.UUID] = None
+
+
 class GetProductsResponseSchema(BaseModel):
     products: List[ResponseProductDetailSchema]
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class ListProductsResponseSchema(GetProductsResponseSchema):
+    # Cursor of the next page, None on the last page
+    next_cursor: Optional[uuid.UUID]
+
+
 class ImageUploadResponse(BaseModel):
     operation_id: uuid.UUID
     product_id: uuid.UUID
@@ -3,12 +3,21 @@ from uuid import UUID, uuid4
 
 from fastapi import UploadFile
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload
 
 from config import GCS_BUCKET_NAME
 from database import Base
+from seedwork.base_publisher import EventPublisher
 
-from . import models, schemas
+from . import mappers, models, schemas
+
+
+def publish_products_changed(product_ids: List[UUID]):
+    """Notify the services caching products that they changed."""
+    EventPublisher().publish(
+        "product.changed",
+        {"product_ids": [str(product_id) for product_id in product_ids]},
+    )
 
 
 def create_manufacturer(
@@ -70,12 +79,49 @@ def get_manufacturers(
     )
 
 
+def _product_load_options(fields: Optional[List[str]]) -> List:
+    if fields is None:
+        # Load what product_to_schema reads up front, one query for the
+        # products with their manufacturer and one for all their images
+        return [
+            joinedload(models.ManufacturerProduct.manufacturer),
+            selectinload(models.ManufacturerProduct.images),
+        ]
+    # Only the columns and relations of the requested fields
+    product_fields, manufacturer_fields = mappers.split_product_fields(fields)
+    options = [
+        load_only(
+            *(
+                column
+                for field, column in mappers.PRODUCT_COLUMNS.items()
+                if field in product_fields
+            )
+        )
+    ]
+    if manufacturer_fields:
+        options.append(
+            joinedload(models.ManufacturerProduct.manufacturer).load_only(
+                *(
+                    column
+                    for field, column in mappers.MANUFACTURER_COLUMNS.items()
+                    if field in manufacturer_fields
+                )
+            )
+        )
+    if "images" in product_fields:
+        options.append(selectinload(models.ManufacturerProduct.images))
+    return options
+
+
 def get_products(
     db: Session,
     productsIds: Optional[List[str]] = None,
     manufacturer_id: Optional[UUID] = None,
+    fields: Optional[List[str]] = None,
 ) -> List[models.ManufacturerProduct]:
-    query = db.query(models.ManufacturerProduct)
+    query = db.query(models.ManufacturerProduct).options(
+        *_product_load_options(fields)
+    )
     if productsIds is not None:
         query = query.filter(models.ManufacturerProduct.id.in_(productsIds))
     if manufacturer_id:
@@ -85,6 +131,21 @@ def get_products(
     return query.order_by(models.ManufacturerProduct.updated_at.desc()).all()
 
 
+def list_products(
+    db: Session,
+    limit: int,
+    after: Optional[UUID] = None,
+    fields: Optional[List[str]] = None,
+) -> List[models.ManufacturerProduct]:
+    """List a page of the products ordered by id, after the given id."""
+    query = db.query(models.ManufacturerProduct).options(
+        *_product_load_options(fields)
+    )
+    if after is not None:
+        query = query.filter(models.ManufacturerProduct.id > after)
+    return query.order_by(models.ManufacturerProduct.id).limit(limit).all()
+
+
 def get_product(
     db: Session,
     product_id: UUID,
@@ -109,6 +170,7 @@ def save_image_product_uri(
     db.add(db_image)
     db.commit()
     db.refresh(db_image)
+    publish_products_changed([product_id])
     return db_image
 
 
@@ -120,6 +182,7 @@ def create_bulk_products(
     total_successful_records: int = 0
     total_errors_records: int = 0
     details: List[schemas.ErrorDetailResponseSchema] = []
+    created_product_ids: List[UUID] = []
     for index, product in enumerate(products, start=2):
         db_product = models.ManufacturerProduct(
             id=uuid4(),
@@ -133,6 +196,7 @@ def create_bulk_products(
             db.flush()
             db.commit()
             db.refresh(db_product)
+            created_product_ids.append(db_product.id)
 
             images_data = []
             for image in product.images:
@@ -159,6 +223,8 @@ def create_bulk_products(
             details.append(
                 schemas.ErrorDetailResponseSchema(row_file=index, detail=error)
             )
+    if created_product_ids:
+        publish_products_changed(created_product_ids)
     return schemas.BatchProductResponseSchema(
         total_successful_records=total_successful_records,
         total_errors_records=total_errors_records,
@@ -0,0 +1,55 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# Header with the absolute time, in epoch milliseconds, after which the
+# caller no longer waits for the response. Services must keep their
+# clocks in sync for it to be meaningful.
+DEADLINE_HEADER = "x-deadline"
+
+_deadline: ContextVar[Optional[float]] = ContextVar(
+    "rpc_deadline", default=None
+)
+
+
+def message_deadline(headers: Optional[Dict]) -> Optional[float]:
+    """
+    Return the deadline of a message in epoch seconds, if it has one.
+    """
+    value = (headers or {}).get(DEADLINE_HEADER)
+    return int(value) / 1000 if value is not None else None
+
+
+def deadline_headers(timeout: float) -> Dict[str, int]:
+    """
+    Headers with the deadline of a call that waits ``timeout`` seconds.
+    """
+    return {DEADLINE_HEADER: int((time.time() + timeout) * 1000)}
+
+
+def is_expired(deadline: Optional[float]) -> bool:
+    return deadline is not None and deadline <= time.time()
+
+
+def remaining_timeout(timeout: float) -> float:
+    """
+    Return the time a call can wait, which is the given timeout bounded by
+    the deadline of the message being processed.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return timeout
+    return min(timeout, deadline - time.time())
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[float]):
+    """
+    Bound the RPC calls made inside the block by the given deadline.
+    """
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
@@ -13,6 +13,7 @@ from sqlalchemy.pool import StaticPool
 from database import Base
 from db_dependency import get_db
 from main import app as init_app
+from seedwork.base_publisher import EventPublisher
 from storage_dependency import get_storage_bucket
 
 SQLALCHEMY_DATABASE_URL = "sqlite://"
@@ -116,3 +117,5 @@ def mock_rabbitmq_client(request):
         # Mock the connection.channel() to return the mock channel
         mock_connection.channel.return_value = mock_channel
         yield mock_channel
+    # Do not share the mocked connection with the next test
+    EventPublisher.close()
@@ -1,18 +1,20 @@
-import json
 import uuid
 from typing import List
 from unittest import mock
 
 import pytest
 from faker import Faker
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
-from manufacturers.consumers import GetProductsConsumer
+from manufacturers.consumers import GetProductsConsumer, ListProductsConsumer
 from manufacturers.models import (
     IdentificationType,
     Manufacturer,
     ManufacturerProduct,
+    ProductImage,
 )
+from manufacturers.services import get_products
 
 fake = Faker()
 
@@ -96,9 +98,7 @@ class TestGetProductsConsumer:
 
         with mock.patch("manufacturers.consumers.SessionLocal") as get_session:
             get_session.return_value = db_session
-            # Parse the JSON response
             products_data = consumer.process_payload(valid_payload)
-            products_data = json.loads(products_data)
 
         assert "products" in products_data
         products_data = products_data["products"]
@@ -110,6 +110,166 @@ class TestGetProductsConsumer:
             assert product.name == product_data["name"]
             assert str(product.price) == product_data["price"]
 
+    def test_products_are_returned_in_requested_order(
+        self, db_session: Session, products_in_db: List[ManufacturerProduct]
+    ):
+        """
+        Test that products follow the order of the requested ids and
+          unknown ids are skipped.
+        """
+        consumer = GetProductsConsumer()
+        requested = [products_in_db[2], products_in_db[0], products_in_db[1]]
+        product_ids = [str(product.id) for product in requested]
+        product_ids.insert(1, str(uuid.uuid4()))
+
+        with mock.patch("manufacturers.consumers.SessionLocal") as get_session:
+            get_session.return_value = db_session
+            products_data = consumer.process_payload(
+                {"product_ids": product_ids}
+            )
+
+        assert [product["id"] for product in products_data["products"]] == [
+            str(product.id) for product in requested
+        ]
+
+    def test_statement_count_does_not_grow_with_products(
+        self, db_session: Session, manufacturer: Manufacturer
+    ):
+        """
+        Test that products, manufacturers and images are loaded with a
+          fixed number of statements whatever the number of products.
+        """
+        products = [
+            ManufacturerProduct(
+                id=uuid.uuid4(),
+                manufacturer_id=manufacturer.id,
+                code=f"P{index:04d}",
+                name=f"{fake.word()} {index}",
+                price=fake.random_number(digits=5),
+                images=[
+                    ProductImage(id=uuid.uuid4(), url=fake.image_url())
+                    for _ in range(2)
+                ],
+            )
+            for index in range(50)
+        ]
+        db_session.add_all(products)
+        db_session.commit()
+        db_session.expire_all()
+
+        statements = []
+
+        def count_statement(*args):
+            statements.append(args[2])
+
+        consumer = GetProductsConsumer()
+        payload = {"product_ids": [str(product.id) for product in products]}
+        engine = db_session.get_bind().engine
+        event.listen(engine, "before_cursor_execute", count_statement)
+        try:
+            with mock.patch(
+                "manufacturers.consumers.SessionLocal"
+            ) as get_session:
+                get_session.return_value = db_session
+                products_data = consumer.process_payload(payload)
+        finally:
+            event.remove(engine, "before_cursor_execute", count_statement)
+
+        assert len(products_data["products"]) == 50
+        assert all(
+            len(product["images"]) == 2
+            for product in products_data["products"]
+        )
+        # One query for products and manufacturers, one for the images
+        assert len(statements) == 2
+
+    def test_batch_of_requests_is_resolved_with_one_query(
+        self, db_session: Session, products_in_db: List[ManufacturerProduct]
+    ):
+        """
+        Test that a batch of requests is answered with a single products
+          query and every request gets its own products.
+        """
+        consumer = GetProductsConsumer()
+        first, second, third = [str(product.id) for product in products_in_db]
+        payloads = [
+            {"product_ids": [first, second]},
+            {"invalid_key": "invalid_value"},
+            {"product_ids": [third, first]},
+        ]
+        db_session.expire_all()
+
+        with (
+            mock.patch(
+                "manufacturers.consumers.SessionLocal",
+                return_value=db_session,
+            ),
+            mock.patch(
+                "manufacturers.consumers.get_products",
+                wraps=get_products,
+            ) as mock_get_products,
+        ):
+            responses = consumer.process_batch(payloads)
+
+        mock_get_products.assert_called_once()
+        assert [product["id"] for product in responses[0]["products"]] == [
+            first,
+            second,
+        ]
+        assert responses[1]["error"][0]["loc"] == ("product_ids",)
+        assert [product["id"] for product in responses[2]["products"]] == [
+            third,
+            first,
+        ]
+
+    def test_fields_projection(
+        self, db_session: Session, products_in_db: List[ManufacturerProduct]
+    ):
+        """
+        Test that only the requested fields are loaded and returned.
+        """
+        db_session.expire_all()
+        statements = []
+
+        def count_statement(*args):
+            statements.append(args[2])
+
+        consumer = GetProductsConsumer()
+        payload = {
+            "product_ids": [str(product.id) for product in products_in_db],
+            "fields": ["name", "price", "manufacturer.manufacturer_name"],
+        }
+        engine = db_session.get_bind().engine
+        event.listen(engine, "before_cursor_execute", count_statement)
+        try:
+            with mock.patch(
+                "manufacturers.consumers.SessionLocal"
+            ) as get_session:
+                get_session.return_value = db_session
+                products_data = consumer.process_payload(payload)
+        finally:
+            event.remove(engine, "before_cursor_execute", count_statement)
+
+        assert len(products_data["products"]) == 3
+        for product in products_data["products"]:
+            assert set(product) == {"id", "name", "price", "manufacturer"}
+            assert set(product["manufacturer"]) == {"manufacturer_name"}
+        # No images query and no unused manufacturer columns
+        assert len(statements) == 1
+        assert "address" not in statements[0]
+
+    def test_unknown_field(self):
+        """
+        Test that an unknown field is rejected.
+        """
+        consumer = GetProductsConsumer()
+
+        response = consumer.process_payload(
+            {"product_ids": None, "fields": ["manufacturer.secret"]}
+        )
+
+        assert response["error"][0]["loc"] == ("fields",)
+
     def test_list_missing_products(self, db_session: Session):
         """
         Test GetProductsConsumer with a valid payload and verify the data.
@@ -124,9 +284,7 @@ class TestGetProductsConsumer:
         }
         with mock.patch("manufacturers.consumers.SessionLocal") as get_session:
             get_session.return_value = db_session
-            # Parse the JSON response
             products_data = consumer.process_payload(valid_payload)
-            products_data = json.loads(products_data)
 
         assert "products" in products_data
         assert len(products_data["products"]) == 0
@@ -141,9 +299,49 @@ class TestGetProductsConsumer:
 
         with mock.patch("manufacturers.consumers.SessionLocal") as get_session:
             get_session.return_value = db_session
-            # Parse the JSON response
             products_data = consumer.process_payload(valid_payload)
-            products_data = json.loads(products_data)
 
         assert "products" in products_data
         assert len(products_data["products"]) == 0
+
+
+class TestListProductsConsumer:
+    """
+    Test suite for the ListProductsConsumer class.
+    """
+
+    def test_catalog_is_listed_page_by_page(
+        self, db_session: Session, products_in_db: List[ManufacturerProduct]
+    ):
+        """
+        Test that following the cursors returns every product once and the
+          last page has no cursor.
+        """
+        consumer = ListProductsConsumer()
+        pages = []
+        payload = {"limit": 2, "fields": ["name"]}
+
+        with mock.patch("manufacturers.consumers.SessionLocal") as get_session:
+            get_session.return_value = db_session
+            while True:
+                page = consumer.process_payload(payload)
+                pages.append(page["products"])
+                if page["next_cursor"] is None:
+                    break
+                payload["cursor"] = page["next_cursor"]
+
+        assert [len(page) for page in pages] == [2, 1]
+        assert [product["id"] for page in pages for product in page] == sorted(
+            str(product.id) for product in products_in_db
+        )
+        assert set(pages[0][0]) == {"id", "name"}
+
+    def test_invalid_limit(self):
+        """
+        Test that the page size is validated.
+        """
+        consumer = ListProductsConsumer()
+
+        response = consumer.process_payload({"limit": 0})
+
+        assert response["error"][0]["loc"] == ("limit",)
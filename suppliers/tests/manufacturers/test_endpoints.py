@@ -1,3 +1,4 @@
+import json
 from typing import Dict, List
 from uuid import UUID
 
@@ -6,6 +7,8 @@ from faker import Faker
 from fastapi.testclient import TestClient
 import io
 
+from config import CHANGE_EVENTS_EXCHANGE
+
 fake = Faker()
 fake.seed_instance(0)
 
@@ -187,6 +190,32 @@ def test_create_batch_products(
     assert response.status_code == 200
 
 
+def test_create_batch_products_publishes_product_changed(
+    client: TestClient,
+    manufacturer_payload: Dict,
+    csv_file,
+    mock_rabbitmq_client,
+):
+    create_response = client.post(
+        "/suppliers/manufacturers/", json=manufacturer_payload
+    )
+    manufacturer_id = create_response.json()["id"]
+    response = client.post(
+        f"/suppliers/manufacturers/{manufacturer_id}/products/batch/",
+        files={"file": ("products.csv", csv_file, "text/csv")},
+    )
+
+    assert response.status_code == 200
+    mock_rabbitmq_client.basic_publish.assert_called_once()
+    publish_kwargs = mock_rabbitmq_client.basic_publish.call_args.kwargs
+    event = json.loads(publish_kwargs["body"])
+    assert publish_kwargs["exchange"] == CHANGE_EVENTS_EXCHANGE
+    assert event["event"] == "product.changed"
+    assert len(event["product_ids"]) == (
+        response.json()["total_successful_records"]
+    )
+
+
 def test_create_batch_products_no_headers(
     client: TestClient, manufacturer_payload: Dict, csv_file
 ):
@@ -0,0 +1,326 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from unittest.mock import MagicMock, patch
+
+import msgpack
+import pika
+import pytest
+
+from seedwork.base_batch_consumer import RETRIES_HEADER, BaseBatchConsumer
+from seedwork.base_consumer import BaseConsumer
+from seedwork.base_publisher import EventPublisher
+from seedwork.deadline import deadline_headers, remaining_timeout
+from seedwork.serialization import MSGPACK_CONTENT_TYPE, accept_headers
+
+
+class EchoConsumer(BaseConsumer):
+    """
+    Consumer that answers with the received payload.
+    """
+
+    def __init__(self, barrier: threading.Barrier = None, workers: int = 2):
+        super().__init__(queue="test.echo", workers=workers)
+        self.barrier = barrier
+
+    def process_payload(self, payload: Dict) -> Dict:
+        if payload.get("fail"):
+            raise ValueError("Invalid payload")
+        if self.barrier:
+            self.barrier.wait(timeout=5)
+        return payload
+
+
+class EchoBatchConsumer(BaseBatchConsumer):
+    """
+    Batch consumer that answers every payload with the batch size.
+    """
+
+    def __init__(self):
+        super().__init__(queue="test.echo", batch_size=3, batch_window=0.01)
+        self.batches = []
+
+    def process_batch(self, payloads: List[Dict]) -> List[Dict]:
+        self.batches.append(payloads)
+        return [{"batch_size": len(payloads)} for _ in payloads]
+
+
+def run_in_pool(consumer: BaseConsumer, messages: list) -> MagicMock:
+    """
+    Deliver the messages to the consumer worker pool and wait until they
+    are processed. Returns the channel used to reply.
+    """
+    channel = MagicMock()
+    consumer.connection = MagicMock()
+    consumer.connection.add_callback_threadsafe.side_effect = (
+        lambda callback: callback()
+    )
+    with ThreadPoolExecutor(max_workers=consumer.workers) as executor:
+        consumer.executor = executor
+        for delivery_tag, body in enumerate(messages, start=1):
+            consumer.callback(
+                channel,
+                MagicMock(delivery_tag=delivery_tag),
+                pika.BasicProperties(
+                    reply_to="reply-queue", correlation_id=str(body)
+                ),
+                json.dumps(body),
+            )
+    return channel
+
+
+def test_messages_are_processed_concurrently():
+    """
+    Test that the workers process several messages at the same time and
+    every message is answered and acked.
+    """
+    # Both messages must be in process at the same time to pass the barrier
+    consumer = EchoConsumer(barrier=threading.Barrier(2))
+
+    channel = run_in_pool(consumer, [{"id": 1}, {"id": 2}])
+
+    assert consumer.connection.add_callback_threadsafe.call_count == 2
+    replies = sorted(
+        json.loads(call.kwargs["body"])["id"]
+        for call in channel.basic_publish.call_args_list
+    )
+    assert replies == [1, 2]
+    assert sorted(
+        call.kwargs["delivery_tag"]
+        for call in channel.basic_ack.call_args_list
+    ) == [1, 2]
+
+
+def test_failed_messages_are_answered_with_the_error():
+    """
+    Test that an error processing a message is returned to the caller
+    and the message is acked.
+    """
+    channel = run_in_pool(EchoConsumer(), [{"fail": True}])
+
+    body = channel.basic_publish.call_args.kwargs["body"]
+    assert json.loads(body) == {"error": "Invalid payload"}
+    channel.basic_ack.assert_called_once_with(delivery_tag=1)
+
+
+def test_replies_use_the_content_type_accepted_by_the_caller():
+    """
+    Test that callers asking for msgpack get a msgpack reply and callers
+    without preference get JSON.
+    """
+    consumer = EchoConsumer()
+    channel = MagicMock()
+    for headers in (accept_headers(MSGPACK_CONTENT_TYPE), None):
+        consumer.callback(
+            channel,
+            MagicMock(delivery_tag=1),
+            pika.BasicProperties(reply_to="reply-queue", headers=headers),
+            json.dumps({"id": 1}),
+        )
+
+    msgpack_reply, json_reply = [
+        call.kwargs for call in channel.basic_publish.call_args_list
+    ]
+    assert msgpack_reply["properties"].content_type == MSGPACK_CONTENT_TYPE
+    assert msgpack.unpackb(msgpack_reply["body"]) == {"id": 1}
+    assert json_reply["properties"].content_type == "application/json"
+    assert json.loads(json_reply["body"]) == {"id": 1}
+
+
+def test_expired_messages_are_dropped():
+    """
+    Test that messages whose caller already gave up are acked without
+    being processed nor answered.
+    """
+    consumer = EchoConsumer()
+    consumer.process_payload = MagicMock()
+    channel = MagicMock()
+
+    consumer.callback(
+        channel,
+        MagicMock(delivery_tag=1),
+        pika.BasicProperties(
+            reply_to="reply-queue", headers=deadline_headers(-1)
+        ),
+        json.dumps({"id": 1}),
+    )
+
+    consumer.process_payload.assert_not_called()
+    channel.basic_publish.assert_not_called()
+    channel.basic_ack.assert_called_once_with(delivery_tag=1)
+
+
+def test_nested_calls_get_the_remaining_time():
+    """
+    Test that the calls made while processing a message are bounded by
+    its deadline.
+    """
+    consumer = EchoConsumer()
+    consumer.process_payload = MagicMock(
+        side_effect=lambda payload: {"timeout": remaining_timeout(30)}
+    )
+    channel = MagicMock()
+
+    consumer.callback(
+        channel,
+        MagicMock(delivery_tag=1),
+        pika.BasicProperties(
+            reply_to="reply-queue", headers=deadline_headers(5)
+        ),
+        json.dumps({"id": 1}),
+    )
+
+    body = channel.basic_publish.call_args.kwargs["body"]
+    assert 0 < json.loads(body)["timeout"] <= 5
+    # The deadline does not leak out of the message
+    assert remaining_timeout(30) == 30
+
+
+def test_prefetch_count_is_at_least_the_number_of_workers():
+    """
+    Test that every worker can have a message to process.
+    """
+    assert EchoConsumer(workers=32).prefetch_count == 32
+
+
+def test_messages_are_batched_until_the_window_ends():
+    """
+    Test that messages are buffered until the batch window ends and are
+    then processed together, each one with its own reply.
+    """
+    consumer = EchoBatchConsumer()
+    channel = MagicMock()
+    consumer.connection = MagicMock()
+    consumer.connection.add_callback_threadsafe.side_effect = (
+        lambda callback: callback()
+    )
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        consumer.executor = executor
+        for delivery_tag in (1, 2):
+            consumer.callback(
+                channel,
+                MagicMock(delivery_tag=delivery_tag),
+                pika.BasicProperties(reply_to="reply-queue"),
+                json.dumps({"id": delivery_tag}),
+            )
+        assert consumer.batches == []
+        consumer.connection.call_later.assert_called_once()
+
+        # The window ends
+        delay, flush = consumer.connection.call_later.call_args.args
+        assert delay == 0.01
+        flush()
+
+    assert consumer.batches == [[{"id": 1}, {"id": 2}]]
+    assert [
+        json.loads(call.kwargs["body"])
+        for call in channel.basic_publish.call_args_list
+    ] == [{"batch_size": 2}, {"batch_size": 2}]
+    assert channel.basic_ack.call_count == 2
+
+
+def test_full_batches_are_processed_without_waiting():
+    """
+    Test that a batch is processed as soon as it is full.
+    """
+    consumer = EchoBatchConsumer()
+    channel = run_in_pool(consumer, [{"id": 1}, {"id": 2}, {"id": 3}])
+
+    assert consumer.batches == [[{"id": 1}, {"id": 2}, {"id": 3}]]
+    consumer.connection.remove_timeout.assert_called_once()
+    assert channel.basic_ack.call_count == 3
+    assert consumer.prefetch_count >= 3
+
+
+def test_consumer_reconnects_after_losing_the_connection():
+    """
+    Test that the consumer reconnects when the broker is unreachable or
+    the connection is lost, backing off between attempts.
+    """
+    consumer = EchoConsumer()
+    consumer.on_connected = MagicMock()
+    connection = MagicMock()
+    channel = connection.channel.return_value
+    # Lost once, the second run ends the test
+    channel.start_consuming.side_effect = [
+        pika.exceptions.ConnectionClosedByBroker(320, "shutdown"),
+        SystemExit,
+    ]
+    broker_down = pika.exceptions.AMQPConnectionError()
+
+    with (
+        patch(
+            "pika.BlockingConnection",
+            side_effect=[broker_down, broker_down, connection, connection],
+        ),
+        patch("seedwork.base_consumer.time.sleep") as sleep,
+    ):
+        with pytest.raises(SystemExit):
+            consumer.run()
+
+    assert [call.args[0] for call in sleep.call_args_list] == [1, 2, 1]
+    assert consumer.on_connected.call_count == 2
+    assert channel.basic_consume.call_count == 2
+
+
+def test_event_publisher_reuses_the_connection(mock_rabbitmq_client):
+    """
+    Test that the events are published on one shared connection.
+    """
+    with patch("pika.BlockingConnection") as connection:
+        connection.return_value.channel.return_value = mock_rabbitmq_client
+        EventPublisher().publish("product.changed", {"product_ids": []})
+        EventPublisher().publish("product.changed", {"product_ids": []})
+
+    connection.assert_called_once()
+    assert mock_rabbitmq_client.basic_publish.call_count == 2
+
+
+def test_messages_without_retries_left_are_dead_lettered():
+    """
+    Test that a message that failed ``max_retries`` times is moved to the
+    dead letter queue instead of being published again.
+    """
+    consumer = EchoBatchConsumer()
+    channel = MagicMock()
+
+    consumer.retry(
+        channel,
+        MagicMock(delivery_tag=1, routing_key="test.echo"),
+        pika.BasicProperties(headers={RETRIES_HEADER: consumer.max_retries}),
+        b"{}",
+    )
+
+    publish = channel.basic_publish.call_args.kwargs
+    assert publish["routing_key"] == "test.echo.dead_letter"
+    channel.basic_ack.assert_called_once_with(delivery_tag=1)
+
+
+def test_batches_are_bounded_by_the_earliest_deadline():
+    """
+    Test that the calls made while processing a batch get the remaining
+    time of the message that expires first.
+    """
+    consumer = EchoBatchConsumer()
+    consumer.process_batch = MagicMock(
+        side_effect=lambda payloads: [
+            {"timeout": remaining_timeout(30)} for _ in payloads
+        ]
+    )
+    batch = [
+        (
+            MagicMock(),
+            MagicMock(delivery_tag=delivery_tag),
+            pika.BasicProperties(headers=headers),
+            json.dumps({"id": delivery_tag}),
+        )
+        for delivery_tag, headers in enumerate(
+            [deadline_headers(20), None, deadline_headers(5)], start=1
+        )
+    ]
+
+    responses = consumer.handle_batch(batch)
+
+    assert all(0 < response["timeout"] <= 5 for response in responses)
+    assert remaining_timeout(30) == 30
@@ -0,0 +1,195 @@
+from abc import abstractmethod
+from functools import partial
+from typing import Dict, List, Optional, Tuple, Type
+
+import pika
+
+from config import (
+    CONSUMER_BATCH_SIZE,
+    CONSUMER_BATCH_WINDOW_MS,
+    CONSUMER_MAX_RETRIES,
+    CONSUMER_RETRY_DELAY,
+)
+from seedwork.base_consumer import BaseConsumer
+from seedwork.deadline import deadline_scope, message_deadline
+from seedwork.serialization import decode
+
+# Header with the times a message was published again after a failure
+RETRIES_HEADER = "x-retries"
+
+# Response of the messages that must be processed again
+_RETRY = object()
+
+
+class BaseBatchConsumer(BaseConsumer):
+    """
+    Consumer that processes the messages in batches. Messages are buffered
+    until ``batch_size`` messages arrive or ``batch_window`` seconds pass
+    since the first one, then the whole batch is processed at once and
+    every message gets its own reply.
+
+    When processing a batch fails with one of the ``retry_on`` errors the
+    messages are not answered, they are published again after a delay
+    that doubles every time. After ``max_retries`` attempts they are moved
+    to the ``<queue>.dead_letter`` queue.
+    """
+
+    retry_on: Tuple[Type[Exception], ...] = ()
+
+    def __init__(
+        self,
+        queue: str,
+        batch_size: int = CONSUMER_BATCH_SIZE,
+        batch_window: float = CONSUMER_BATCH_WINDOW_MS / 1000,
+        max_retries: int = CONSUMER_MAX_RETRIES,
+        retry_delay: float = CONSUMER_RETRY_DELAY,
+        **kwargs,
+    ):
+        super().__init__(queue=queue, **kwargs)
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.dead_letter_queue = f"{queue}.dead_letter"
+        # A batch can only fill up if enough messages are delivered
+        self.prefetch_count = max(self.prefetch_count, batch_size)
+        self._batch = []
+        self._flush_timer = None
+
+    @abstractmethod
+    def process_batch(
+        self, payloads: List[Dict]
+    ) -> List[Optional[Dict | str]]: ...
+
+    def connect(self):
+        channel, queue = super().connect()
+        if self.retry_on:
+            channel.queue_declare(queue=self.dead_letter_queue)
+        return channel, queue
+
+    def on_connected(self):
+        # Buffered messages belonged to the previous channel, the broker
+        # delivers them again
+        self._batch = []
+        self._flush_timer = None
+
+    def process_payload(self, payload: Dict) -> Optional[Dict | str]:
+        return self.process_batch([payload])[0]
+
+    def callback(self, ch, method, props, body):
+        print(f" [x] Received {body}")
+        if self.expired(props):
+            self.drop(ch, method, props)
+            return
+        self._batch.append((ch, method, props, body))
+        if self.executor is None or len(self._batch) >= self.batch_size:
+            self.flush()
+        elif self._flush_timer is None:
+            self._flush_timer = self.connection.call_later(
+                self.batch_window, self._on_flush_timer
+            )
+
+    def _on_flush_timer(self):
+        self._flush_timer = None
+        self.flush()
+
+    def flush(self):
+        """
+        Process the buffered messages as one batch.
+        """
+        if self._flush_timer is not None:
+            self.connection.remove_timeout(self._flush_timer)
+            self._flush_timer = None
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        if self.executor is None:
+            self.reply_batch(batch, self.handle_batch(batch))
+            return
+        self.executor.submit(self.handle_batch_in_worker, batch)
+
+    def handle_batch(self, batch: List) -> List[Optional[Dict | str]]:
+        responses = [None] * len(batch)
+        payloads = {}
+        deadlines = []
+        for index, (_ch, _method, props, body) in enumerate(batch):
+            try:
+                payloads[index] = decode(
+                    body, props.content_type, props.content_encoding
+                )
+                deadlines.append(message_deadline(props.headers))
+            except Exception as e:
+                responses[index] = {"error": str(e)}
+        if payloads:
+            # The RPC calls of the batch are bounded by the earliest deadline
+            # of its messages
+            deadline = min(
+                (deadline for deadline in deadlines if deadline is not None),
+                default=None,
+            )
+            try:
+                with deadline_scope(deadline):
+                    results = self.process_batch(list(payloads.values()))
+            except self.retry_on as e:
+                print(f" [x] Batch failed, it will be retried: {e!r}")
+                results = [_RETRY] * len(payloads)
+            except Exception as e:
+                results = [{"error": str(e)}] * len(payloads)
+            for index, result in zip(payloads, results):
+                responses[index] = result
+        return responses
+
+    def handle_batch_in_worker(self, batch: List):
+        # Messages may have expired while waiting for a worker
+        live, expired = [], []
+        for delivery in batch:
+            (expired if self.expired(delivery[2]) else live).append(delivery)
+        responses = self.handle_batch(live) if live else []
+
+        def finish():
+            for ch, method, props, _body in expired:
+                self.drop(ch, method, props)
+            self.reply_batch(live, responses)
+
+        self.connection.add_callback_threadsafe(finish)
+
+    def reply_batch(self, batch: List, responses: List):
+        for (ch, method, props, body), response in zip(batch, responses):
+            if response is _RETRY:
+                retries = (props.headers or {}).get(RETRIES_HEADER, 0)
+                # Kept unacked while waiting, so the broker does not
+                # deliver more messages than the consumer can hold
+                self.connection.call_later(
+                    self.retry_delay * 2**retries,
+                    partial(self.retry, ch, method, props, body),
+                )
+            else:
+                self.reply(ch, method, props, response)
+
+    def retry(self, ch, method, props, body):
+        """
+        Publish a message again with its retries count increased, or to
+        the dead letter queue when it has no retries left.
+        """
+        headers = dict(props.headers or {})
+        retries = headers.get(RETRIES_HEADER, 0)
+        if retries >= self.max_retries:
+            print(f" [x] Dead lettered message {props.correlation_id}")
+            routing_key = self.dead_letter_queue
+        else:
+            headers[RETRIES_HEADER] = retries + 1
+            routing_key = method.routing_key
+        ch.basic_publish(
+            exchange="",
+            routing_key=routing_key,
+            properties=pika.BasicProperties(
+                content_type=props.content_type,
+                content_encoding=props.content_encoding,
+                headers=headers,
+                reply_to=props.reply_to,
+                correlation_id=props.correlation_id,
+                message_id=props.message_id,
+            ),
+            body=body,
+        )
+        ch.basic_ack(delivery_tag=method.delivery_tag)
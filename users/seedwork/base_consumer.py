@@ -1,47 +1,175 @@
-import json
 import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Optional
 
 import pika
 
-from config import BROKER_HOST
+from config import (
+    BROKER_HOST,
+    CONSUMER_PREFETCH_COUNT,
+    CONSUMER_RECONNECT_DELAY,
+    CONSUMER_RECONNECT_MAX_DELAY,
+    CONSUMER_WORKERS,
+)
+from seedwork.deadline import deadline_scope, is_expired, message_deadline
+from seedwork.serialization import decode, encode, negotiate
 
 
 class BaseConsumer(threading.Thread, ABC):
-    def __init__(self, queue):
+    """
+    Consume the messages of a queue in a thread. When an exchange is given
+    the consumer gets its own exclusive queue bound to that fanout
+    exchange, so every running consumer receives every message.
+
+    Messages are processed by a pool of worker threads, up to
+    ``prefetch_count`` messages are delivered without being acked. Pika
+    channels are not thread-safe, so replies and acks are handed back to
+    the connection thread.
+
+    Request bodies are decoded with their ``content_type`` and replies use
+    the content type accepted by the caller, JSON by default. Messages
+    whose deadline passed are dropped without being processed, and the RPC
+    calls made while processing a message are bounded by its deadline.
+
+    When the connection to the broker is lost the consumer reconnects,
+    waiting longer after each failed attempt. Unacked messages are
+    redelivered by the broker, but fanout messages published while
+    disconnected are lost, ``on_connected`` lets subclasses catch up.
+    """
+
+    def __init__(
+        self,
+        queue: str = "",
+        exchange: Optional[str] = None,
+        workers: int = CONSUMER_WORKERS,
+        prefetch_count: Optional[int] = None,
+    ):
         threading.Thread.__init__(self)
         self.queue = queue
+        self.exchange = exchange
+        self.workers = workers
+        self.prefetch_count = prefetch_count or max(
+            workers, CONSUMER_PREFETCH_COUNT
+        )
+        self.connection: Optional[pika.BlockingConnection] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
 
     def run(self):
-        connection = pika.BlockingConnection(
+        delay = CONSUMER_RECONNECT_DELAY
+        while True:
+            try:
+                channel, queue = self.connect()
+                delay = CONSUMER_RECONNECT_DELAY
+                self.on_connected()
+                self.consume(channel, queue)
+            except pika.exceptions.AMQPError as e:
+                print(f" [x] Broker connection lost: {e!r}")
+            finally:
+                self.disconnect()
+            time.sleep(delay)
+            delay = min(delay * 2, CONSUMER_RECONNECT_MAX_DELAY)
+
+    def connect(self):
+        self.connection = pika.BlockingConnection(
             pika.ConnectionParameters(host=BROKER_HOST)
         )
-        channel = connection.channel()
-        channel.queue_declare(queue=self.queue)
-        channel.basic_qos(prefetch_count=1)
-        channel.basic_consume(
-            queue=self.queue, on_message_callback=self.callback
-        )
-        channel.start_consuming()
+        channel = self.connection.channel()
+        queue = self.queue
+        if self.exchange:
+            channel.exchange_declare(
+                exchange=self.exchange, exchange_type="fanout"
+            )
+            # The server names a new exclusive queue on every connection
+            result = channel.queue_declare(queue=queue, exclusive=True)
+            queue = result.method.queue
+            channel.queue_bind(exchange=self.exchange, queue=queue)
+        else:
+            channel.queue_declare(queue=queue)
+        channel.basic_qos(prefetch_count=self.prefetch_count)
+        channel.basic_consume(queue=queue, on_message_callback=self.callback)
+        return channel, queue
+
+    def consume(self, channel, queue: str):
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix=queue
+        ) as self.executor:
+            channel.start_consuming()
+
+    def disconnect(self):
+        self.executor = None
+        if self.connection is not None and self.connection.is_open:
+            try:
+                self.connection.close()
+            except pika.exceptions.AMQPError:
+                pass
+        self.connection = None
+
+    def on_connected(self):
+        """
+        Called every time the consumer connects to the broker, before it
+        starts consuming.
+        """
 
     @abstractmethod
-    def process_payload(self, payload: Dict) -> Dict: ...
+    def process_payload(self, payload: Dict) -> Optional[Dict]: ...
 
     def callback(self, ch, method, props, body):
         print(f" [x] Received {body}")
-        json_body = json.loads(body)
-        response = self.process_payload(json_body)
-        ch.basic_publish(
-            exchange="",
-            routing_key=props.reply_to,
-            properties=pika.BasicProperties(
-                correlation_id=props.correlation_id
-            ),
-            body=(
-                json.dumps(response)
-                if isinstance(response, dict)
-                else response
-            ),
+        if self.expired(props):
+            self.drop(ch, method, props)
+            return
+        if self.executor is None:
+            self.reply(ch, method, props, self.handle(body, props))
+            return
+        self.executor.submit(self.handle_in_worker, ch, method, props, body)
+
+    def handle(
+        self, body: bytes, props: pika.BasicProperties
+    ) -> Optional[Dict | str]:
+        try:
+            with deadline_scope(message_deadline(props.headers)):
+                return self.process_payload(
+                    decode(body, props.content_type, props.content_encoding)
+                )
+        except Exception as e:
+            return {"error": str(e)}
+
+    def handle_in_worker(self, ch, method, props, body):
+        # The message may have expired while waiting for a worker
+        if self.expired(props):
+            self.connection.add_callback_threadsafe(
+                partial(self.drop, ch, method, props)
+            )
+            return
+        response = self.handle(body, props)
+        self.connection.add_callback_threadsafe(
+            partial(self.reply, ch, method, props, response)
         )
+
+    def reply(self, ch, method, props, response: Optional[Dict | str]):
+        # Events published to an exchange do not expect a response
+        if props.reply_to:
+            content_type, compress = negotiate(props.headers)
+            body, content_encoding = encode(response, content_type, compress)
+            ch.basic_publish(
+                exchange="",
+                routing_key=props.reply_to,
+                properties=pika.BasicProperties(
+                    correlation_id=props.correlation_id,
+                    content_type=content_type,
+                    content_encoding=content_encoding,
+                ),
+                body=body,
+            )
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+
+    def expired(self, props: pika.BasicProperties) -> bool:
+        return is_expired(message_deadline(props.headers))
+
+    def drop(self, ch, method, props):
+        # Nobody waits for the response anymore
+        print(f" [x] Dropped expired message {props.correlation_id}")
         ch.basic_ack(delivery_tag=method.delivery_tag)
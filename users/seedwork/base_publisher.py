@@ -0,0 +1,84 @@
+import json
+import threading
+from typing import Dict, Optional
+
+import pika
+
+from config import BROKER_HOST, CHANGE_EVENTS_EXCHANGE
+
+
+class EventPublisher:
+    """
+    Publish events to a fanout exchange so every subscribed service
+    receives them.
+
+    All the publishers of the process share one broker connection, opened
+    on the first event and reopened when the broker closed it. Pika
+    connections are not thread-safe, so publishing is serialized.
+    """
+
+    _lock = threading.Lock()
+    _connection: Optional[pika.BlockingConnection] = None
+    _channel = None
+    _declared = set()
+
+    def __init__(self, exchange: str = CHANGE_EVENTS_EXCHANGE):
+        self.exchange = exchange
+
+    def publish(self, event: str, payload: Dict):
+        """
+        Publish an event. Events are notifications, a broker failure is
+        logged and does not fail the operation that produced the event.
+        """
+        body = json.dumps({"event": event, **payload})
+        with self._lock:
+            try:
+                try:
+                    self._publish(body)
+                except pika.exceptions.AMQPError:
+                    # The shared connection may have been closed by the
+                    # broker while idle, retry once on a new one
+                    EventPublisher._reset()
+                    self._publish(body)
+            except Exception as e:
+                EventPublisher._reset()
+                print(f"Error publishing event {event}: {e}")
+
+    def _publish(self, body: str):
+        cls = EventPublisher
+        if cls._connection is None or not cls._connection.is_open:
+            cls._connection = pika.BlockingConnection(
+                pika.ConnectionParameters(host=BROKER_HOST)
+            )
+            cls._channel = cls._connection.channel()
+            cls._declared = set()
+        if self.exchange not in cls._declared:
+            cls._channel.exchange_declare(
+                exchange=self.exchange, exchange_type="fanout"
+            )
+            cls._declared.add(self.exchange)
+        cls._channel.basic_publish(
+            exchange=self.exchange, routing_key="", body=body
+        )
+
+    @classmethod
+    def close(cls):
+        """
+        Close the shared connection.
+        """
+        with cls._lock:
+            cls._reset()
+
+    @classmethod
+    def _reset(cls):
+        connection, cls._connection, cls._channel = (
+            cls._connection,
+            None,
+            None,
+        )
+        cls._declared = set()
+        if connection is not None and connection.is_open:
+            try:
+                connection.close()
+            except Exception:
+                pass
@@ -0,0 +1,95 @@
+import json
+from typing import Any, Dict, Optional, Tuple
+
+import msgpack
+import zstandard
+
+from config import RPC_COMPRESSION_THRESHOLD
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+SUPPORTED_CONTENT_TYPES = (MSGPACK_CONTENT_TYPE, JSON_CONTENT_TYPE)
+ZSTD_ENCODING = "zstd"
+
+# Headers of the requests that want a compact response
+ACCEPT_HEADER = "accept"
+ACCEPT_ENCODING_HEADER = "accept-encoding"
+
+
+def accept_headers(content_type: str) -> Dict[str, str]:
+    """
+    Headers asking the peer to answer with the given content type,
+    compressed when it is large. Peers that do not know these headers
+    keep answering with plain JSON.
+    """
+    return {
+        ACCEPT_HEADER: f"{content_type}, {JSON_CONTENT_TYPE}",
+        ACCEPT_ENCODING_HEADER: ZSTD_ENCODING,
+    }
+
+
+def negotiate(headers: Optional[Dict]) -> Tuple[str, bool]:
+    """
+    Choose the content type of a response from the headers of the request.
+
+    Returns:
+        Tuple[str, bool]: The content type and whether the response can be
+          compressed.
+    """
+    headers = headers or {}
+    accepted = [
+        content_type.strip()
+        for content_type in str(headers.get(ACCEPT_HEADER, "")).split(",")
+    ]
+    content_type = next(
+        (ct for ct in accepted if ct in SUPPORTED_CONTENT_TYPES),
+        JSON_CONTENT_TYPE,
+    )
+    compress = ZSTD_ENCODING in str(headers.get(ACCEPT_ENCODING_HEADER, ""))
+    return content_type, compress
+
+
+def encode(
+    data: Any,
+    content_type: str = JSON_CONTENT_TYPE,
+    compress: bool = False,
+) -> Tuple[bytes, Optional[str]]:
+    """
+    Serialize a message body. Strings are taken as already serialized
+    JSON.
+
+    Returns:
+        Tuple[bytes, Optional[str]]: The body and its content encoding.
+    """
+    if content_type == MSGPACK_CONTENT_TYPE:
+        if isinstance(data, (str, bytes)):
+            data = json.loads(data)
+        body = msgpack.packb(data)
+    elif isinstance(data, str):
+        body = data.encode()
+    elif isinstance(data, bytes):
+        body = data
+    else:
+        body = json.dumps(data).encode()
+    if (
+        compress
+        and RPC_COMPRESSION_THRESHOLD
+        and len(body) > RPC_COMPRESSION_THRESHOLD
+    ):
+        return zstandard.ZstdCompressor().compress(body), ZSTD_ENCODING
+    return body, None
+
+
+def decode(
+    body: bytes,
+    content_type: Optional[str] = None,
+    content_encoding: Optional[str] = None,
+) -> Any:
+    """
+    Deserialize a message body. Messages without content type are JSON.
+    """
+    if content_encoding == ZSTD_ENCODING:
+        body = zstandard.ZstdDecompressor().decompress(body)
+    if content_type == MSGPACK_CONTENT_TYPE:
+        return msgpack.unpackb(body)
+    return json.loads(body)
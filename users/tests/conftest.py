@@ -1,5 +1,6 @@
 # Mock database
 from typing import Any, Generator
+from unittest import mock
 
 import pytest
 from fastapi import FastAPI
@@ -12,6 +13,7 @@ from sqlalchemy.pool import StaticPool
 from database import Base
 from db_dependency import get_db
 from main import app as init_app
+from seedwork.base_publisher import EventPublisher
 
 SQLALCHEMY_DATABASE_URL = "sqlite://"
 
@@ -90,3 +92,25 @@ def client(
     with TestClient(app) as client:
         # Set authorization token
         yield client
+
+
+@pytest.fixture(autouse=True)
+def mock_rabbitmq_client(request):
+    """
+    Mock the RabbitMQ client (pika) to avoid actual RabbitMQ calls.
+    """
+    if request.node.get_closest_marker("skip_mock_rabbitmq"):
+        yield  # Skip the fixture
+        return
+
+    # Mock the pika connection and channel
+    mock_connection = mock.MagicMock()
+    mock_channel = mock.MagicMock()
+
+    # Mock pika.BlockingConnection to return the mock connection
+    with mock.patch("pika.BlockingConnection", return_value=mock_connection):
+        # Mock the connection.channel() to return the mock channel
+        mock_connection.channel.return_value = mock_channel
+        yield mock_channel
+    # Do not share the mocked connection with the next test
+    EventPublisher.close()
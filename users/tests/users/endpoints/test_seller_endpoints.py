@@ -1,8 +1,11 @@
+import json
+
 import pytest
 from faker import Faker
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+from config import CHANGE_EVENTS_EXCHANGE
 from users.auth import get_password_hash
 from users.models import RoleEnum, User
 
@@ -133,6 +136,29 @@ def test_create_seller(
     assert seller.role == RoleEnum.SELLER
 
 
+def test_create_seller_publishes_seller_changed(
+    client: TestClient,
+    headers: dict,
+    seller_payload: dict,
+    mock_rabbitmq_client,
+) -> None:
+    """
+    Test that creating a seller notifies the services caching sellers.
+    """
+    response = client.post(
+        "/api/v1/users/sellers", json=seller_payload, headers=headers
+    )
+    assert response.status_code == 201
+
+    mock_rabbitmq_client.basic_publish.assert_called_once()
+    publish_kwargs = mock_rabbitmq_client.basic_publish.call_args.kwargs
+    assert publish_kwargs["exchange"] == CHANGE_EVENTS_EXCHANGE
+    assert json.loads(publish_kwargs["body"]) == {
+        "event": "seller.changed",
+        "seller_ids": [response.json()["id"]],
+    }
+
+
 def test_create_seller_with_existing_fields(
     client: TestClient,
     headers: dict,
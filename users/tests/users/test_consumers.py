@@ -1,12 +1,16 @@
-import json
 import uuid
 from unittest import mock
 
 import pytest
 from faker import Faker
 from sqlalchemy.orm import Session
-from users.consumers import GetSellersConsumer
+from users.consumers import (
+    GetSellersConsumer,
+    ListSellersConsumer,
+    SearchSellersConsumer,
+)
 from users.models import RoleEnum, User
+from users.services import get_sellers_with_ids
 
 fake = Faker()
 
@@ -70,9 +74,7 @@ class TestGetSellersConsumer:
 
         with mock.patch("users.consumers.SessionLocal") as get_session:
             get_session.return_value = db_session
-            # Parse the JSON response
             sellers_data = consumer.process_payload(valid_payload)
-            sellers_data = json.loads(sellers_data)
 
         assert "sellers" in sellers_data
         sellers_data = sellers_data["sellers"]
@@ -100,9 +102,7 @@ class TestGetSellersConsumer:
         }
         with mock.patch("users.consumers.SessionLocal") as get_session:
             get_session.return_value = db_session
-            # Parse the JSON response
             sellers_data = consumer.process_payload(valid_payload)
-            sellers_data = json.loads(sellers_data)
 
         assert "sellers" in sellers_data
         assert len(sellers_data["sellers"]) == 0
@@ -117,9 +117,147 @@ class TestGetSellersConsumer:
 
         with mock.patch("users.consumers.SessionLocal") as get_session:
             get_session.return_value = db_session
-            # Parse the JSON response
             sellers_data = consumer.process_payload(valid_payload)
-            sellers_data = json.loads(sellers_data)
 
         assert "sellers" in sellers_data
         assert len(sellers_data["sellers"]) == 0
+
+    def test_batch_of_requests_is_resolved_with_one_query(
+        self, db_session: Session, sellers_in_db: list[User]
+    ):
+        """
+        Test that a batch of requests is answered with a single sellers
+          query and every request gets its own sellers.
+        """
+        consumer = GetSellersConsumer()
+        first, second, third = [str(seller.id) for seller in sellers_in_db]
+        payloads = [
+            {"seller_ids": [second, first]},
+            {"seller_ids": [third]},
+        ]
+
+        with (
+            mock.patch(
+                "users.consumers.SessionLocal", return_value=db_session
+            ),
+            mock.patch(
+                "users.consumers.get_sellers_with_ids",
+                wraps=get_sellers_with_ids,
+            ) as mock_get_sellers,
+        ):
+            responses = consumer.process_batch(payloads)
+
+        mock_get_sellers.assert_called_once()
+        assert [seller["id"] for seller in responses[0]["sellers"]] == [
+            second,
+            first,
+        ]
+        assert [seller["id"] for seller in responses[1]["sellers"]] == [third]
+
+    def test_fields_projection(
+        self, db_session: Session, sellers_in_db: list[User]
+    ):
+        """
+        Test that a batch with different fields gets only the requested
+          fields for every request.
+        """
+        consumer = GetSellersConsumer()
+        first, second, _ = [str(seller.id) for seller in sellers_in_db]
+        payloads = [
+            {"seller_ids": [first], "fields": ["full_name"]},
+            {"seller_ids": [second], "fields": ["email", "created_at"]},
+        ]
+
+        with mock.patch(
+            "users.consumers.SessionLocal", return_value=db_session
+        ):
+            responses = consumer.process_batch(payloads)
+
+        assert responses[0]["sellers"] == [
+            {"id": first, "full_name": sellers_in_db[0].full_name}
+        ]
+        assert set(responses[1]["sellers"][0]) == {
+            "id",
+            "email",
+            "created_at",
+        }
+
+    def test_unknown_field(self):
+        """
+        Test that an unknown field is rejected.
+        """
+        consumer = GetSellersConsumer()
+
+        response = consumer.process_payload(
+            {"seller_ids": None, "fields": ["hashed_password"]}
+        )
+
+        assert response["error"][0]["loc"] == ("fields",)
+
+
+class TestSearchSellersConsumer:
+    """
+    Test suite for the SearchSellersConsumer class.
+    """
+
+    def test_search_sellers_by_name(
+        self, db_session: Session, sellers_in_db: list[User]
+    ):
+        """
+        Test that only the sellers whose name contains the text are
+          returned, ignoring case.
+        """
+        consumer = SearchSellersConsumer()
+        seller = sellers_in_db[0]
+        seller.full_name = "Zoe Quintana"
+        db_session.commit()
+
+        with mock.patch("users.consumers.SessionLocal") as get_session:
+            get_session.return_value = db_session
+            sellers_data = consumer.process_payload({"name": "QUINT"})
+
+        assert [
+            seller_data["id"] for seller_data in sellers_data["sellers"]
+        ] == [str(seller.id)]
+
+    def test_invalid_payload(self):
+        """
+        Test SearchSellersConsumer with an invalid payload.
+        """
+        consumer = SearchSellersConsumer()
+
+        response = consumer.process_payload({"invalid_key": "invalid_value"})
+
+        assert response["error"][0]["loc"] == ("name",)
+
+
+class TestListSellersConsumer:
+    """
+    Test suite for the ListSellersConsumer class.
+    """
+
+    def test_sellers_are_listed_page_by_page(
+        self, db_session: Session, sellers_in_db: list[User]
+    ):
+        """
+        Test that following the cursors returns every seller once and the
+          last page has no cursor.
+        """
+        consumer = ListSellersConsumer()
+        pages = []
+        payload = {"limit": 2, "fields": ["full_name"]}
+
+        with mock.patch("users.consumers.SessionLocal") as get_session:
+            get_session.return_value = db_session
+            while True:
+                page = consumer.process_payload(payload)
+                pages.append(page["sellers"])
+                if page["next_cursor"] is None:
+                    break
+                payload["cursor"] = page["next_cursor"]
+
+        assert [len(page) for page in pages] == [2, 1]
+        assert [seller["id"] for page in pages for seller in page] == sorted(
+            str(seller.id) for seller in sellers_in_db
+        )
+        assert set(pages[0][0]) == {"id", "full_name"}
@@ -1,15 +1,27 @@
-from typing import Dict
+from typing import Dict, List
 
 from pydantic import ValidationError
 
 from database import SessionLocal
+from seedwork.base_batch_consumer import BaseBatchConsumer
 from seedwork.base_consumer import BaseConsumer
 
-from .schemas import GetSellersResponseSchema, GetSellersSchema
-from .services import get_sellers_with_ids
+from .mappers import user_to_projection, user_to_schema
+from .schemas import (
+    GetSellersResponseSchema,
+    GetSellersSchema,
+    ListSellersResponseSchema,
+    ListSellersSchema,
+    SearchSellersSchema,
+)
+from .services import (
+    get_sellers_with_ids,
+    list_sellers,
+    search_sellers_by_name,
+)
 
 
-class GetSellersConsumer(BaseConsumer):
+class GetSellersConsumer(BaseBatchConsumer):
     """
     Consumer for getting sellers.
     """
@@ -17,32 +29,160 @@ class GetSellersConsumer(BaseConsumer):
     def __init__(self):
         super().__init__(queue="users.get_sellers")
 
-    def process_payload(self, payload: Dict) -> str | Dict:
+    def process_batch(self, payloads: List[Dict]) -> List[Dict]:
         """
-        Consume the data and get all sellers.
+        Consume a batch of requests and get their sellers with a single
+        query.
 
         Args:
-            data (Dict): The incoming seller ids.
+            payloads (List[Dict]): The incoming seller ids and fields of
+              each request.
         """
+        responses: List[Dict] = [None] * len(payloads)
+        requests = {}
+        for index, payload in enumerate(payloads):
+            try:
+                requests[index] = GetSellersSchema.model_validate(payload)
+            except ValidationError as e:
+                responses[index] = {"error": e.errors(include_context=False)}
+        if not requests:
+            return responses
+
         db = SessionLocal()
         try:
-            sellers_schema = GetSellersSchema.model_validate(payload)
-            sellers = get_sellers_with_ids(db, sellers_schema.seller_ids)
-            # Sort sellers by id position in payload
-            if sellers_schema.seller_ids:
-                sellers.sort(
-                    key=lambda x: (
-                        sellers_schema.seller_ids.index(x.id)
-                        if x.id in sellers_schema.seller_ids
-                        else -1
+            fetch_all = any(
+                request.seller_ids is None for request in requests.values()
+            )
+            seller_ids = {
+                seller_id
+                for request in requests.values()
+                if request.seller_ids
+                for seller_id in request.seller_ids
+            }
+            # Load the fields requested by any of the requests
+            fields = (
+                None
+                if any(
+                    request.fields is None for request in requests.values()
+                )
+                else list(
+                    dict.fromkeys(
+                        field
+                        for request in requests.values()
+                        for field in request.fields
                     )
                 )
+            )
+            sellers = (
+                get_sellers_with_ids(
+                    db, None if fetch_all else list(seller_ids), fields=fields
+                )
+                if fetch_all or seller_ids
+                else []
+            )
+            sellers_by_id = {seller.id: seller for seller in sellers}
+            for index, request in requests.items():
+                # Return the sellers in the order of the requested ids
+                selected = (
+                    sellers
+                    if request.seller_ids is None
+                    else [
+                        sellers_by_id[seller_id]
+                        for seller_id in dict.fromkeys(request.seller_ids)
+                        if seller_id in sellers_by_id
+                    ]
+                )
+                responses[index] = GetSellersResponseSchema(
+                    sellers=[
+                        (
+                            user_to_schema(seller)
+                            if request.fields is None
+                            else user_to_projection(seller, request.fields)
+                        )
+                        for seller in selected
+                    ]
+                ).model_dump(mode="json")
+        except Exception as e:
+            for index in requests:
+                responses[index] = {"error": str(e)}
+        finally:
+            db.close()
+        return responses
+
+
+class SearchSellersConsumer(BaseConsumer):
+    """
+    Consumer for searching sellers by name.
+    """
+
+    def __init__(self):
+        super().__init__(queue="users.search_sellers")
+
+    def process_payload(self, payload: Dict) -> Dict:
+        """
+        Consume the data and get the sellers whose name matches.
+
+        Args:
+            data (Dict): The incoming name to search.
+        """
+        db = SessionLocal()
+        try:
+            search_schema = SearchSellersSchema.model_validate(payload)
+            sellers = search_sellers_by_name(db, search_schema.name)
             return GetSellersResponseSchema.model_validate(
                 {"sellers": sellers}
-            ).model_dump_json()
+            ).model_dump(mode="json")
         except ValidationError as e:
             return {"error": e.errors()}
         except Exception as e:
             return {"error": str(e)}
         finally:
             db.close()
+
+
+class ListSellersConsumer(BaseConsumer):
+    """
+    Consumer for listing the sellers page by page.
+    """
+
+    def __init__(self):
+        super().__init__(queue="users.list_sellers")
+
+    def process_payload(self, payload: Dict) -> Dict:
+        """
+        Consume the data and get a page of sellers.
+
+        Args:
+            payload (Dict): The page size, the cursor of the page and the
+              fields of the sellers.
+        """
+        db = SessionLocal()
+        try:
+            request = ListSellersSchema.model_validate(payload)
+            # One more seller tells if there is a next page
+            sellers = list_sellers(
+                db,
+                limit=request.limit + 1,
+                after=request.cursor,
+                fields=request.fields,
+            )
+            page = sellers[: request.limit]
+            return ListSellersResponseSchema(
+                sellers=[
+                    (
+                        user_to_schema(seller)
+                        if request.fields is None
+                        else user_to_projection(seller, request.fields)
+                    )
+                    for seller in page
+                ],
+                next_cursor=(
+                    page[-1].id if len(sellers) > request.limit else None
+                ),
+            ).model_dump(mode="json")
+        except ValidationError as e:
+            return {"error": e.errors(include_context=False)}
+        except Exception as e:
+            return {"error": str(e)}
+        finally:
+            db.close()
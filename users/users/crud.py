@@ -1,7 +1,7 @@
 import uuid
 from typing import List, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 
 from . import models
 
@@ -109,19 +109,84 @@ def get_all_users(
 
 
 def get_users_by_ids(
-    db: Session, ids: Optional[List[uuid.UUID]], role: Optional[str] = None
+    db: Session,
+    ids: Optional[List[uuid.UUID]],
+    role: Optional[str] = None,
+    columns: Optional[List[str]] = None,
 ) -> list[models.User]:
     """
     Get users by their IDs.
     Args:
         db (Session): The database session to use for the query.
         ids (list[str]): A lisIDt of user IDs to retrieve.
+        columns (list[str]): The only columns to load, all if not given.
     Returns:
         list[models.User]: A list of user objects.
     """
     query = db.query(models.User)
+    if columns is not None:
+        query = query.options(
+            load_only(
+                *(getattr(models.User, column) for column in ["id", *columns])
+            )
+        )
     if role:
         query = query.filter(models.User.role == role)
     if ids is not None:
         query = query.filter(models.User.id.in_(ids))
     return query.all()
+
+
+def list_users(
+    db: Session,
+    limit: int,
+    after: Optional[uuid.UUID] = None,
+    role: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+) -> list[models.User]:
+    """
+    Get a page of users ordered by ID.
+    Args:
+        db (Session): The database session to use for the query.
+        limit (int): The maximum number of users to return.
+        after (Optional[uuid.UUID]): The ID of the last user of the
+          previous page. Defaults to None.
+        role (Optional[str]): The role of the users to filter by.
+          Defaults to None.
+        columns (list[str]): The only columns to load, all if not given.
+    Returns:
+        list[models.User]: A list of user objects.
+    """
+    query = db.query(models.User)
+    if columns is not None:
+        query = query.options(
+            load_only(
+                *(getattr(models.User, column) for column in ["id", *columns])
+            )
+        )
+    if role:
+        query = query.filter(models.User.role == role)
+    if after is not None:
+        query = query.filter(models.User.id > after)
+    return query.order_by(models.User.id).limit(limit).all()
+
+
+def search_users_by_name(
+    db: Session, name: str, role: Optional[str] = None
+) -> list[models.User]:
+    """
+    Get users whose full name contains the given text, ignoring case.
+    Args:
+        db (Session): The database session to use for the query.
+        name (str): The text to search in the full name.
+        role (Optional[str]): The role of the users to filter by.
+          Defaults to None.
+    Returns:
+        list[models.User]: A list of user objects.
+    """
+    query = db.query(models.User).filter(
+        models.User.full_name.icontains(name, autoescape=True)
+    )
+    if role:
+        query = query.filter(models.User.role == role)
+    return query.all()
@@ -1,3 +1,5 @@
+from typing import List
+
 from .models import User
 from .schemas import UserDetailSchema
 
@@ -13,3 +15,20 @@ def user_to_schema(user: User) -> UserDetailSchema:
         UserDetailSchema: The converted UserDetailSchema instance.
     """
     return UserDetailSchema.model_validate(user)
+
+
+def user_to_projection(user: User, fields: List[str]) -> UserDetailSchema:
+    """
+    Build a UserDetailSchema with only the requested fields, the rest of
+    them are left unset and are not serialized. The id is always included.
+
+    Args:
+        user (User): The User model instance to convert.
+        fields (List[str]): The fields to include.
+
+    Returns:
+        UserDetailSchema: The partial UserDetailSchema instance.
+    """
+    return UserDetailSchema.model_construct(
+        **{field: getattr(user, field) for field in ["id", *fields]}
+    )
@@ -116,9 +116,42 @@ class CreateSellerSchema(UserBaseSchema):
         return value
 
 
-class GetSellersSchema(BaseModel):
+class SellerFieldsSchema(BaseModel):
+    # Fields returned for every seller, all of them if not given
+    fields: Optional[List[str]] = None
+
+    @field_validator("fields")
+    @classmethod
+    def validate_fields(cls, value):
+        """
+        Validate that every requested field is a seller field.
+        """
+        if value is None:
+            return value
+        for field in value:
+            if field not in UserDetailSchema.model_fields:
+                raise ValueError(f"Unknown seller field '{field}'")
+        return value
+
+
+class GetSellersSchema(SellerFieldsSchema):
     seller_ids: Optional[List[uuid.UUID]]
 
 
+class ListSellersSchema(SellerFieldsSchema):
+    limit: int = Field(100, ge=1, le=1000)
+    # Id of the last seller of the previous page
+    cursor: Optional[uuid.UUID] = None
+
+
+class SearchSellersSchema(BaseModel):
+    name: str
+
+
 class GetSellersResponseSchema(BaseModel):
     sellers: List[UserDetailSchema]
+
+
+class ListSellersResponseSchema(GetSellersResponseSchema):
+    # Cursor of the next page, None on the last page
+    next_cursor: Optional[uuid.UUID]
@@ -3,6 +3,8 @@ from typing import List, Optional
 
 from sqlalchemy.orm import Session
 
+from seedwork.base_publisher import EventPublisher
+
 from . import auth, crud, models, schemas
 
 
@@ -64,11 +66,15 @@ def create_seller(
     Returns:
         models.User: The created user object.
     """
-    return create_user(
+    seller = create_user(
         db,
         payload=payload,
         role=models.RoleEnum.SELLER,
     )
+    EventPublisher().publish(
+        "seller.changed", {"seller_ids": [str(seller.id)]}
+    )
+    return seller
 
 
 def get_all_sellers(db: Session) -> list[models.User]:
@@ -85,7 +91,9 @@ def get_all_sellers(db: Session) -> list[models.User]:
 
 
 def get_sellers_with_ids(
-    db: Session, seller_ids: Optional[List[uuid.UUID]]
+    db: Session,
+    seller_ids: Optional[List[uuid.UUID]],
+    fields: Optional[List[str]] = None,
 ) -> list[models.User]:
     """
     Get sellers by their IDs.
@@ -93,9 +101,52 @@ def get_sellers_with_ids(
         db (Session): The database session to use for the query.
         seller_ids (list[schemas.UUIDSchema]): A list of seller IDs
           to retrieve.
+        fields (list[str]): The only seller fields to load, all if not
+          given.
     Returns:
         list[models.User]: A list of seller user objects.
     """
     return crud.get_users_by_ids(
-        db, ids=seller_ids, role=models.RoleEnum.SELLER
+        db, ids=seller_ids, role=models.RoleEnum.SELLER, columns=fields
+    )
+
+
+def search_sellers_by_name(db: Session, name: str) -> list[models.User]:
+    """
+    Get the sellers whose full name contains the given text.
+    Args:
+        db (Session): The database session to use for the query.
+        name (str): The text to search in the full name, ignoring case.
+    Returns:
+        list[models.User]: A list of seller user objects.
+    """
+    return crud.search_users_by_name(
+        db, name=name, role=models.RoleEnum.SELLER
+    )
+
+
+def list_sellers(
+    db: Session,
+    limit: int,
+    after: Optional[uuid.UUID] = None,
+    fields: Optional[List[str]] = None,
+) -> list[models.User]:
+    """
+    Get a page of sellers ordered by ID.
+    Args:
+        db (Session): The database session to use for the query.
+        limit (int): The maximum number of sellers to return.
+        after (Optional[uuid.UUID]): The ID of the last seller of the
+          previous page.
+        fields (list[str]): The only seller fields to load, all if not
+          given.
+    Returns:
+        list[models.User]: A list of seller user objects.
+    """
+    return crud.list_users(
+        db,
+        limit=limit,
+        after=after,
+        role=models.RoleEnum.SELLER,
+        columns=fields,
     )